@@ -2,15 +2,22 @@ r"""
 By Dylon Edwards and Brian Beckman
 """
 
-from open_belex.literal import (GGL, GL, INV_GL, INV_RL, INV_RSP16, NRL, RL,
-                                RN_REG_FLAGS, RN_REG_G0, RN_REG_G1, RN_REG_G2,
-                                RN_REG_G3, RN_REG_T0, RN_REG_T1, RN_REG_T2,
-                                RN_REG_T3, RN_REG_T4, RN_REG_T5, RN_REG_T6,
-                                RSP16, SM_0X000F, SM_0X0001, SM_0X1111,
-                                SM_0X3333, SM_0XFFFF, SM_REG0, SM_REG1, SRL,
-                                VR, Mask, apl_commands, apl_set_rn_reg,
+from typing import Sequence
+
+from open_belex.literal import (GGL, GL, INV_GGL, INV_GL, INV_RL, INV_RSP16,
+                                NRL, RL, RN_REG_FLAGS, RN_REG_G0, RN_REG_G1,
+                                RN_REG_G2, RN_REG_G3, RN_REG_G4, RN_REG_T0,
+                                RN_REG_T1, RN_REG_T2, RN_REG_T3, RN_REG_T4,
+                                RN_REG_T5, RN_REG_T6, RSP16, SM_0X000F,
+                                SM_0X0001, SM_0X1111, SM_0X3333, SM_0XFFFF,
+                                SM_REG0, SM_REG1, SM_REG2, SM_REG3, SM_REG4,
+                                SM_REG5, SM_REG6, SM_REG7, SRL, VR, Mask,
+                                Section, apl_commands, apl_set_rn_reg,
                                 apl_set_sm_reg, belex_apl)
 
+from open_belex_libs.common import (cpy_imm_16, reset_16, rl_from_sb,
+                                    sb_from_rl, src_vr_to_dst_vr)
+
 #   ___                         ___       _   _       _           _
 #  / __|_  _ _ __  ___ _ _ ___ / _ \ _ __| |_(_)_ __ (_)______ __| |
 #  \__ \ || | '_ \/ -_) '_|___| (_) | '_ \  _| | '  \| |_ / -_) _` |
@@ -436,7 +443,148 @@ def sub_u16(Belex, res: VR, x: VR, y: VR) -> None:
     with apl_commands("instruction 11"):
         RL[SM_0X0001<<1] <= GGL()
         RL[SM_0X000F<<12] |= cout1() & GL()
+        GL[SM_0X0001<<15] <= RL()
+    with apl_commands("instruction 12"):
+        RL[SM_0XFFFF<<2] <= x_xor_noty() ^ NRL()
+        RN_REG_FLAGS[SM_0X0001<<B_FLAG] <= INV_GL()
+        RL[SM_0X0001<<B_FLAG] <= INV_GL()
+        GL[SM_0X0001<<B_FLAG] <= RL()
+    with apl_commands("instruction 13"):
+        res[SM_0XFFFF<<2] <= RL()
+
+
+#  __  __      _ _   _     ___         _    _
+# |  \/  |_  _| | |_(_)___| _ \_ _ ___ __(_)___(_)___ _ _
+# | |\/| | || | |  _| |___|  _/ '_/ -_) _| (_-< / _ \ ' \
+# |_|  |_|\_,_|_|\__|_|   |_| |_| \___\__|_/__/_\___/_||_|
+
+
+@belex_apl
+def _add_u16_carry_in(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""add_u16 with the carry-in taken from GL, which must hold it on
+    entry. On exit GL holds the carry-out, so calls chain from the least
+    significant limb upward. The carry-in is folded into the generate of
+    bit 0 (g0 | p0 & cin) before it enters the carry-prediction network,
+    which costs one clock over add_u16."""
+    os = SM_0X0001
+    fs = SM_0XFFFF
+    threes = SM_0X3333
+    ones = SM_0X1111
+    one_f = SM_0X000F
+
+    x_xor_y = RN_REG_T0
+    cout1 = RN_REG_T1
+    flags = RN_REG_FLAGS
+
+    # Carry in/out flag
+    C_FLAG = 0
+
+    with apl_commands("instruction 1"):
+        RL[fs] <= x()
+    with apl_commands("instruction 2"):
+        RL[fs] ^= y()
+        GGL[threes] <= RL()
+    with apl_commands("instruction 3"):
+        x_xor_y[fs] <= RL()
+    with apl_commands("instruction 4"):
+        cout1[ones] <= RL()
+        cout1[ones<<1] <= GGL()
+        RL[ones<<2] <= x_xor_y() & GGL()
+        RL[threes] <= x() & y()
+    with apl_commands("instruction 5"):
+        RL[os] |= x_xor_y() & GL()  # carry-in
+    with apl_commands("instruction 6"):
+        cout1[ones<<2] <= RL()
+        RL[ones<<3] <= x_xor_y() & NRL()
+        RL[ones<<1] |= x_xor_y() & NRL()
+        RL[ones<<2] <= x() & y()
+    with apl_commands("instruction 7"):
+        cout1[ones<<3] <= RL()
+        RL[ones<<3] <= x() & y()
+        RL[ones<<2] |= x_xor_y() & NRL()
+        GGL[os] <= RL()
+    with apl_commands("instruction 8"):
+        RL[ones<<3] |= x_xor_y() & NRL()
+        GL[os<<3] <= RL()
+        RL[os] <= x_xor_y() ^ GL()  # GL still holds the carry-in
+    with apl_commands("instruction 9"):
+        RL[one_f<<4] |= cout1() & GL()
+        GL[os<<7] <= RL()
+        res[os] <= RL()
+    with apl_commands("instruction 10"):
+        RL[one_f<<8] |= cout1() & GL()
+        GL[os<<11] <= RL()
+        RL[os] <= GGL()
+    with apl_commands("instruction 11"):
+        RL[one_f<<12] |= cout1() & GL()
+        GL[os<<15] <= RL()
+    with apl_commands("instruction 12"):
+        flags[os<<C_FLAG] <= GL()
+        RL[~os] <= x_xor_y() ^ NRL()
+    with apl_commands("instruction 13"):
+        res[~os] <= RL()
+
+
+@belex_apl
+def _sub_u16_borrow_in(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""sub_u16 with the borrow-in taken from GL, which must hold it on
+    entry. On exit GL holds the borrow-out, as it does after sub_u16, so
+    calls chain from the least significant limb upward. x - y - b is
+    computed as x + ~y + ~b: the hard-wired carry-in of sub_u16 becomes
+    INV_GL, and bit 0 of the difference is assembled in RL section 0 while
+    the carries ripple through the higher groups."""
+    x_xor_noty = RN_REG_T0
+    cout1 = RN_REG_T1
+    noty = RN_REG_T2
+
+    # Borrow in/out flag
+    B_FLAG = 1
+
+    with apl_commands("instruction 1"):
+        RL[SM_0XFFFF] <= y()
+    with apl_commands("instruction 2"):
+        noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0XFFFF] ^= x()
+    with apl_commands("instruction 3"):
+        x_xor_noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0X3333] <= INV_RL()
+        GGL[SM_0X3333] <= RL()
+    with apl_commands("instruction 4"):
+        cout1[SM_0X1111] <= RL()
+        cout1[SM_0X1111<<1] <= GGL()
+        RL[SM_0X1111<<2] <= x_xor_noty() & GGL()
+        RL[SM_0X3333] <= x() & noty()
+    with apl_commands("instruction 5"):
+        noty[SM_0X0001] <= INV_GL()  # carry-in; noty[0] is dead from here
+        cout1[SM_0X1111<<2] <= RL()
+        RL[SM_0X1111<<3] <= x_xor_noty() & NRL()
+        RL[SM_0X1111<<1] |= x_xor_noty() & NRL()
+        RL[SM_0X1111<<2] <= x() & noty()
+    with apl_commands("instruction 6"):
+        cout1[SM_0X1111<<3] <= RL()
+        RL[SM_0X1111<<3] <= x() & noty()
+        RL[SM_0X1111<<2] |= x_xor_noty() & NRL()
+    with apl_commands("instruction 7"):
+        RL[SM_0X1111<<3] |= x_xor_noty() & NRL()
+    with apl_commands("instruction 8"):
+        RL[SM_0X000F] |= cout1() & INV_GL()
+        GGL[SM_0X0001<<1] <= RL()
+        GL[SM_0X0001<<3] <= RL()
+    with apl_commands("instruction 9"):
+        RL[SM_0X0001] <= noty()
+        RL[SM_0X0001<<1] <= x_xor_noty() ^ NRL()
+        RL[SM_0X000F<<4] |= cout1() & GL()
+        GL[SM_0X0001<<7] <= RL()
+    with apl_commands("instruction 10"):
+        res[SM_0X0001<<1] <= RL()
+        RL[SM_0X0001] ^= x_xor_noty()
+        RL[SM_0X000F<<8] |= cout1() & GL()
         GL[SM_0X0001<<11] <= RL()
+    with apl_commands("instruction 11"):
+        res[SM_0X0001] <= RL()
+        RL[SM_0X0001<<1] <= GGL()
+        RL[SM_0X000F<<12] |= cout1() & GL()
+        GL[SM_0X0001<<15] <= RL()
     with apl_commands("instruction 12"):
         RL[SM_0XFFFF<<2] <= x_xor_noty() ^ NRL()
         RN_REG_FLAGS[SM_0X0001<<B_FLAG] <= INV_GL()
@@ -446,6 +594,86 @@ def sub_u16(Belex, res: VR, x: VR, y: VR) -> None:
         res[SM_0XFFFF<<2] <= RL()
 
 
+@belex_apl
+def adc_u16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""x + y + carry, where the carry-in is RN_REG_FLAGS bit C_FLAG, as
+    left there by add_u16, add_u32 or an earlier adc_u16. The carry-out
+    replaces it, so accumulate loops need no separate correction add."""
+    # Carry in/out flag
+    C_FLAG = 0
+
+    with apl_commands():
+        RL[SM_0X0001<<C_FLAG] <= RN_REG_FLAGS()
+        GL[SM_0X0001<<C_FLAG] <= RL()
+    _add_u16_carry_in(res, x, y)
+
+
+@belex_apl
+def sbb_u16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""x - y - borrow, where the borrow-in is RN_REG_FLAGS bit B_FLAG, as
+    left there by sub_u16, sub_u32 or an earlier sbb_u16. The borrow-out
+    replaces it."""
+    # Borrow in/out flag
+    B_FLAG = 1
+
+    with apl_commands():
+        RL[SM_0X0001<<B_FLAG] <= RN_REG_FLAGS()
+        GL[SM_0X0001<<B_FLAG] <= RL()
+    _sub_u16_borrow_in(res, x, y)
+
+
+@belex_apl
+def add_u32(Belex,
+            res_hi: VR, res_lo: VR,
+            x_hi: VR, x_lo: VR,
+            y_hi: VR, y_lo: VR) -> None:
+    r"""32-bit sum of (x_hi:x_lo) and (y_hi:y_lo) in one fragment; the
+    carry passes between the limbs in GL. The carry-out lands in
+    RN_REG_FLAGS bit C_FLAG, as with add_u16. Result limbs may alias the
+    corresponding input limbs."""
+    add_u16(res_lo, x_lo, y_lo)
+    _add_u16_carry_in(res_hi, x_hi, y_hi)
+
+
+@belex_apl
+def add_u64(Belex,
+            res_3: VR, res_2: VR, res_1: VR, res_0: VR,
+            x_3: VR, x_2: VR, x_1: VR, x_0: VR,
+            y_3: VR, y_2: VR, y_1: VR, y_0: VR) -> None:
+    r"""64-bit sum of (x_3:x_2:x_1:x_0) and (y_3:y_2:y_1:y_0), limb 0 the
+    least significant; see add_u32."""
+    add_u16(res_0, x_0, y_0)
+    _add_u16_carry_in(res_1, x_1, y_1)
+    _add_u16_carry_in(res_2, x_2, y_2)
+    _add_u16_carry_in(res_3, x_3, y_3)
+
+
+@belex_apl
+def sub_u32(Belex,
+            res_hi: VR, res_lo: VR,
+            x_hi: VR, x_lo: VR,
+            y_hi: VR, y_lo: VR) -> None:
+    r"""32-bit difference (x_hi:x_lo) - (y_hi:y_lo) in one fragment; the
+    borrow passes between the limbs in GL. The borrow-out lands in
+    RN_REG_FLAGS bit B_FLAG, as with sub_u16. Result limbs may alias the
+    corresponding input limbs."""
+    sub_u16(res_lo, x_lo, y_lo)
+    _sub_u16_borrow_in(res_hi, x_hi, y_hi)
+
+
+@belex_apl
+def sub_u64(Belex,
+            res_3: VR, res_2: VR, res_1: VR, res_0: VR,
+            x_3: VR, x_2: VR, x_1: VR, x_0: VR,
+            y_3: VR, y_2: VR, y_1: VR, y_0: VR) -> None:
+    r"""64-bit difference (x_3:x_2:x_1:x_0) - (y_3:y_2:y_1:y_0), limb 0
+    the least significant; see sub_u32."""
+    sub_u16(res_0, x_0, y_0)
+    _sub_u16_borrow_in(res_1, x_1, y_1)
+    _sub_u16_borrow_in(res_2, x_2, y_2)
+    _sub_u16_borrow_in(res_3, x_3, y_3)
+
+
 @belex_apl
 def init_mul_16_7tmp(Belex, x: VR, y: VR, s0: VR, s1: VR, _2x: VR, m0: VR,
                      m1: VR, t_y_res_lsb: VR):
@@ -586,38 +814,1403 @@ def mul_u16_u16xu16_7t(Belex, t_y_z_lsb: VR, c: VR, z_lsb: VR, m0: VR, y: VR):
     RN_REG_FLAGS[SM_0X0001 << C_FLAG] <= INV_GL()
 
 
-def mul_u16(res: int, x: int, y: int) -> None:
-    apl_set_rn_reg(RN_REG_G0, x)
-    apl_set_rn_reg(RN_REG_G1, y)
-    init_mul_16_7tmp(x=RN_REG_G0, y=RN_REG_G1, s0=RN_REG_T4, s1=RN_REG_T0,
-                     _2x=RN_REG_T1, m0=RN_REG_T2, m1=RN_REG_T5,
-                     t_y_res_lsb=RN_REG_T6)
+@belex_apl
+def mul_u32_u16xu16_7t(Belex, t_y_z_lsb: VR, c: VR, z_lsb: VR, z_msb: VR,
+                       m0: VR, y: VR, sum_vr: VR):
+    # input: RL + (y & m0 in section 15) = (x * y) >> 15
+    #        t_y_z_lsb[14..0] = (x * y)[14..0]
+    # output: z_msb:z_lsb = x * y
+    #         C_FLAG = z_msb != 0, as with mul_u16_u16xu16_7t
+    C_FLAG = 0
+    with apl_commands():
+        c[SM_0XFFFF] <= RL()
+        RL[~(SM_0X0001 << 15)] <= t_y_z_lsb()
+        RL[SM_0X0001 << 15] <= y() & m0()
+    with apl_commands():
+        z_lsb[~(SM_0X0001 << 15)] <= RL()
+        y[SM_0X0001 << 15] <= RL()
+    add_u16(sum_vr, c, y)  # leaves the carry-out, bit 16 of the sum, in GL
+    with apl_commands():
+        z_msb[SM_0X0001 << 15] <= GL()
+        RL[SM_0XFFFF] <= sum_vr()
+        GL[SM_0X0001] <= RL()
+    with apl_commands():
+        z_msb[~(SM_0X0001 << 15)] <= SRL()
+        z_lsb[SM_0X0001 << 15] <= GL()
+        RL[SM_0XFFFF] <= z_msb()
+    with apl_commands():
+        RL[SM_0XFFFF] <= INV_RL()
+        GL[SM_0XFFFF] <= RL()
+    RN_REG_FLAGS[SM_0X0001 << C_FLAG] <= INV_GL()
+
+
+@belex_apl
+def mac_u16_u16xu16_7t(Belex, t_y_z_lsb: VR, acc: VR, y: VR):
+    # input: RL + y = (x * y) >> 15, up to section 15 of y
+    #        t_y_z_lsb[14..0] = (x * y)[14..0]
+    # output: acc += x * y
+    # Only bit 0 of the carry-save pair reaches the low word: it is bit 15
+    # of the product, and the pair is never added.
+    with apl_commands():
+        RL[SM_0X0001] ^= y()
+        GL[SM_0X0001] <= RL()
+    t_y_z_lsb[SM_0X0001 << 15] <= GL()
+    add_u16(acc, acc, t_y_z_lsb)
+
+
+@belex_apl
+def _mul_u16_3to2(Belex, scratch: VR, x: VR, y: VR) -> None:
+    r"""Shared front end of mul_u16, mul_u16_wide and mac_u16: reduces the
+    partial products of x * y with the 3-to-2 compressors, using scratch
+    as scratch. Leaves bits 14..0 of the product in RN_REG_T6, and the
+    rest, shifted right by 15, in carry-save form in RL and RN_REG_T4
+    (section 15 of the latter still to be masked with RN_REG_T5).
+
+    The compressor loop is unrolled with literal section masks, so the
+    whole network is one fragment: the drivers issue a single dispatch
+    and no apl_set_sm_reg per iteration."""
+    sm_0x3fff = ~(SM_0XFFFF << 14)
+
+    init_mul_16_7tmp(x=x, y=y, s0=RN_REG_T4, s1=RN_REG_T0, _2x=RN_REG_T1,
+                     m0=RN_REG_T2, m1=RN_REG_T5, t_y_res_lsb=RN_REG_T6)
 
-    apl_set_rn_reg(RN_REG_G3, res)
-    apl_set_sm_reg(SM_REG1, 0x3fff)
-    apl_set_sm_reg(SM_REG0, 1 << 1)
     for i in range(1, 13, 2):
-        apl_set_sm_reg(SM_REG0, 1 << i)
-        _3to2_mul_16_7tmp(c=RN_REG_T3, s0=RN_REG_T4, s1=RN_REG_T0, _2x=RN_REG_T1,
-                          m0=RN_REG_T2, m1=RN_REG_T5, c_xor_s=RN_REG_G3,
-                          t_y_res_lsb=RN_REG_T6, iter_msk=SM_REG0,
-                          sm_0x3fff=SM_REG1)
-        apl_set_sm_reg(SM_REG0, 2 << i)
-        _3to2_mul_16_7tmp(c=RN_REG_T3, s0=RN_REG_T0, s1=RN_REG_T4, _2x=RN_REG_T1,
-                          m0=RN_REG_T5, m1=RN_REG_T2, c_xor_s=RN_REG_G3,
-                          t_y_res_lsb=RN_REG_T6, iter_msk=SM_REG0,
-                          sm_0x3fff=SM_REG1)
+        _3to2_mul_16_7tmp(c=RN_REG_T3, s0=RN_REG_T4, s1=RN_REG_T0,
+                          _2x=RN_REG_T1, m0=RN_REG_T2, m1=RN_REG_T5,
+                          c_xor_s=scratch, t_y_res_lsb=RN_REG_T6,
+                          iter_msk=SM_0X0001 << i, sm_0x3fff=sm_0x3fff)
+        _3to2_mul_16_7tmp(c=RN_REG_T3, s0=RN_REG_T0, s1=RN_REG_T4,
+                          _2x=RN_REG_T1, m0=RN_REG_T5, m1=RN_REG_T2,
+                          c_xor_s=scratch, t_y_res_lsb=RN_REG_T6,
+                          iter_msk=SM_0X0001 << (i + 1), sm_0x3fff=sm_0x3fff)
 
     _3to2_mul_16_7tmp_iter_msk_13(c=RN_REG_T3, s0=RN_REG_T4, s1=RN_REG_T0,
                                   _2x=RN_REG_T1, m0=RN_REG_T2, m1=RN_REG_T5,
-                                  c_xor_s=RN_REG_G3, t_y_res_lsb=RN_REG_T6,
-                                  sm_0x3fff=SM_REG1)
-    apl_set_sm_reg(SM_REG0, 2 << i)
+                                  c_xor_s=scratch, t_y_res_lsb=RN_REG_T6,
+                                  sm_0x3fff=sm_0x3fff)
     _3to2_mul_16_7tmp_last(c=RN_REG_T3, s0=RN_REG_T0, s1=RN_REG_T4,
                            _2x=RN_REG_T1, m0=RN_REG_T5, m1=RN_REG_T2,
-                           c_xor_s=RN_REG_G3, t_y_res_lsb=RN_REG_T6,
-                           sm_0x3fff=SM_REG1)
+                           c_xor_s=scratch, t_y_res_lsb=RN_REG_T6,
+                           sm_0x3fff=sm_0x3fff)
 
-    apl_set_rn_reg(RN_REG_G2, res)
-    mul_u16_u16xu16_7t(t_y_z_lsb=RN_REG_T6, c=RN_REG_T3, z_lsb=RN_REG_G2,
+
+@belex_apl
+def _mul_u16(Belex, res: VR, x: VR, y: VR) -> None:
+    _mul_u16_3to2(res, x, y)
+    mul_u16_u16xu16_7t(t_y_z_lsb=RN_REG_T6, c=RN_REG_T3, z_lsb=res,
                        m0=RN_REG_T5, y=RN_REG_T4)
+
+
+@belex_apl
+def _mul_u16_wide(Belex, res_hi: VR, res_lo: VR, x: VR, y: VR) -> None:
+    _mul_u16_3to2(res_lo, x, y)
+    mul_u32_u16xu16_7t(t_y_z_lsb=RN_REG_T6, c=RN_REG_T3, z_lsb=res_lo,
+                       z_msb=res_hi, m0=RN_REG_T5, y=RN_REG_T4,
+                       sum_vr=RN_REG_T2)
+
+
+@belex_apl
+def _mac_u16(Belex, acc: VR, x: VR, y: VR) -> None:
+    tmp = Belex.VR()
+
+    _mul_u16_3to2(tmp, x, y)
+    mac_u16_u16xu16_7t(t_y_z_lsb=RN_REG_T6, acc=acc, y=RN_REG_T4)
+
+
+def mul_u16(res: int, x: int, y: int) -> None:
+    apl_set_rn_reg(RN_REG_G0, x)
+    apl_set_rn_reg(RN_REG_G1, y)
+    apl_set_rn_reg(RN_REG_G2, res)
+    _mul_u16(RN_REG_G2, RN_REG_G0, RN_REG_G1)
+
+
+def mul_u16_wide(res_hi: int, res_lo: int, x: int, y: int) -> None:
+    r"""Full 32-bit product of x and y: the high word goes to res_hi and
+    the low word to res_lo, which must be different VRs. Bit C_FLAG of
+    RN_REG_FLAGS is set where the high word is nonzero, as with
+    mul_u16."""
+    apl_set_rn_reg(RN_REG_G0, x)
+    apl_set_rn_reg(RN_REG_G1, y)
+    apl_set_rn_reg(RN_REG_G2, res_lo)
+    apl_set_rn_reg(RN_REG_G3, res_hi)
+    _mul_u16_wide(RN_REG_G3, RN_REG_G2, RN_REG_G0, RN_REG_G1)
+
+
+#   ___             _            _     ___ _    _  __ _
+#  / __|___ _ _  __| |_ __ _ _ _| |_  / __| |_ (_)/ _| |_ ___
+# | (__/ _ \ ' \(_-<  _/ _` | ' \  _| \__ \ ' \| |  _|  _(_-<
+#  \___\___/_||_/__/\__\__,_|_||_\__| |___/_||_|_|_|  \__/__/
+
+# Shifts by a count known when the kernel is generated, in one dispatch
+# whatever the count. A fragment cannot loop count times, so, as in
+# bitwise._shl_rl, the loop is unrolled into stages that shift by 1, 2, 4
+# and 8 sections; a stage writes the sections of its mask, which
+# _stage_masks sets to all of them where count has the stage's bit and
+# to none otherwise. A shift by up to 2**n - 1 costs 2**n - 1 clocks.
+
+
+_STAGE_REGS = (SM_REG0, SM_REG1, SM_REG2, SM_REG3,
+               SM_REG4, SM_REG5, SM_REG6, SM_REG7)
+
+
+def _stage_masks(count: int, stages: int = 4, sections: int = 0xFFFF,
+                 first: int = 0) -> tuple:
+    r"""Set the masks of a shift by count over the given number of stages,
+    in SM_REG<first> onwards, and return those SM_REGs. sections restricts
+    the sections that every stage writes."""
+    if not 0 <= count < 1 << stages:
+        raise ValueError(f"count out of range: {count}")
+    regs = _STAGE_REGS[first:first + stages]
+    for k, reg in enumerate(regs):
+        apl_set_sm_reg(reg, sections if count >> k & 1 else 0x0000)
+    return regs
+
+
+@belex_apl
+def _nrl_rl_by3(Belex, by1: Mask, by2: Mask) -> None:
+    r"""RL <<= count for a count of 0 to 3, shifting in zeros; 3 clocks."""
+    RL[by1] <= NRL()
+    for _ in range(2):
+        RL[by2] <= NRL()
+
+
+@belex_apl
+def _nrl_rl_by15(Belex, by1: Mask, by2: Mask, by4: Mask, by8: Mask) -> None:
+    r"""RL <<= count for a count of 0 to 15, shifting in zeros; 15
+    clocks."""
+    _nrl_rl_by3(by1, by2)
+    for _ in range(4):
+        RL[by4] <= NRL()
+    for _ in range(8):
+        RL[by8] <= NRL()
+
+
+@belex_apl
+def _srl_rl_by15(Belex, by1: Mask, by2: Mask, by4: Mask, by8: Mask) -> None:
+    r"""RL >>= count for a count of 0 to 15, shifting in zeros where the
+    masks include section 15; 15 clocks."""
+    for k, by in enumerate((by1, by2, by4, by8)):
+        for _ in range(1 << k):
+            RL[by] <= SRL()
+
+
+@belex_apl
+def _shl_u16_by3(Belex, res: VR, x: VR, by1: Mask, by2: Mask) -> None:
+    r"""res = x << count for a count of 0 to 3; res may alias x."""
+    RL[SM_0XFFFF] <= x()
+    _nrl_rl_by3(by1, by2)
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def _shl_u16_by15(Belex, res: VR, x: VR,
+                  by1: Mask, by2: Mask, by4: Mask, by8: Mask) -> None:
+    r"""res = x << count for a count of 0 to 15; res may alias x."""
+    RL[SM_0XFFFF] <= x()
+    _nrl_rl_by15(by1, by2, by4, by8)
+    res[SM_0XFFFF] <= RL()
+
+
+#  __  __      _ _   _      _        ___                    _ _      _
+# |  \/  |_  _| | |_(_)_ __| |_  _  |_ _|_ __  _ __  ___ __| (_)__ _| |_ ___
+# | |\/| | || | |  _| | '_ \ | || |  | || '  \| '  \/ -_) _` | / _` |  _/ -_)
+# |_|  |_|\_,_|_|\__|_| .__/_|\_, | |___|_|_|_|_|_|_\___\__,_|_\__,_|\__\___|
+#                     |_|     |__/
+
+
+@belex_apl
+def _shl_add_u16(Belex, res: VR, x: VR, y: VR, by1: Mask, by2: Mask) -> None:
+    r"""res = (x << count) + y for a count of 0 to 3; res may alias x but
+    not y."""
+    _shl_u16_by3(res, x, by1, by2)
+    add_u16(res, res, y)
+
+
+@belex_apl
+def _shl_sub_u16(Belex, res: VR, x: VR, y: VR, by1: Mask, by2: Mask) -> None:
+    r"""res = (x << count) - y for a count of 0 to 3; res may alias x but
+    not y."""
+    _shl_u16_by3(res, x, by1, by2)
+    sub_u16(res, res, y)
+
+
+def _shl_u16_imm(res: int, x: int, count: int) -> None:
+    r"""res = x << count, in the 3-clock barrel where count allows."""
+    if count < 4:
+        _shl_u16_by3(res, x, *_stage_masks(count, stages=2))
+    else:
+        _shl_u16_by15(res, x, *_stage_masks(count))
+
+
+def _naf_u16(const: int) -> list:
+    r"""Non-adjacent form of const modulo 2**16, as (position, digit)
+    pairs with digits +1 or -1, most significant first. No two digits are
+    adjacent, so a constant with n bits set has at most n // 2 + 1 of
+    them. A digit at position 16 vanishes modulo 2**16 and is dropped;
+    e.g. 0xFFFF recodes to the single digit (0, -1)."""
+    const &= 0xFFFF
+    digits = []
+    position = 0
+    while const != 0:
+        if const & 1:
+            digit = 2 - (const & 3)  # +1 if const % 4 == 1 else -1
+            const -= digit
+            if position < 16:
+                digits.append((position, digit))
+        const >>= 1
+        position += 1
+    return digits[::-1]
+
+
+def mul_u16_imm(res: int, x: int, const: int) -> None:
+    r"""res = x * const (mod 2**16) for a constant known when the kernel
+    is generated. The constant is recoded into non-adjacent form and the
+    product is evaluated Horner-style, most significant digit first,
+    instead of the full 3-to-2 compressor loop of mul_u16. Each digit
+    after the first shifts the partial product by the gap to it and adds
+    or subtracts x, in one dispatch where the gap is at most 3 (the
+    common case, as digits are never adjacent) and in two otherwise. res
+    may alias x. RN_REG_FLAGS holds the flags of the last add_u16 or
+    sub_u16, not the overflow of the product."""
+    digits = _naf_u16(const)
+    apl_set_rn_reg(RN_REG_G1, res)
+    if not digits:
+        reset_16(RN_REG_G1)
+        return
+
+    apl_set_rn_reg(RN_REG_G0, x)
+    acc = RN_REG_G1 if res != x else RN_REG_T3
+
+    # Every digit adds or subtracts x; partial holds the sum so far.
+    position, digit = digits[0]
+    if digit > 0:
+        partial = RN_REG_G0
+    else:
+        reset_16(acc)
+        sub_u16(acc, acc, RN_REG_G0)
+        partial = acc
+
+    for next_position, digit in digits[1:]:
+        gap = position - next_position
+        if gap < 4:
+            shl_add = _shl_add_u16 if digit > 0 else _shl_sub_u16
+            shl_add(acc, partial, RN_REG_G0, *_stage_masks(gap, stages=2))
+        else:
+            _shl_u16_imm(acc, partial, gap)
+            if digit > 0:
+                add_u16(acc, acc, RN_REG_G0)
+            else:
+                sub_u16(acc, acc, RN_REG_G0)
+        partial = acc
+        position = next_position
+
+    if position > 0:
+        _shl_u16_imm(acc, partial, position)
+        partial = acc
+
+    if partial != RN_REG_G1 and not (res == x and partial == RN_REG_G0):
+        src_vr_to_dst_vr(RN_REG_G1, partial)
+
+
+def mac_u16(acc: int, x: int, y: int) -> None:
+    r"""acc += x * y (mod 2**16), without writing the product back: the
+    low 15 bits of the product and bit 0 of the multiplier's carry-save
+    pair go straight into add_u16, the only carry-propagate adder. That
+    is 93 clocks in one dispatch, against 97 in two for mul_u16 and then
+    add_u16. RN_REG_FLAGS bit C_FLAG holds the carry-out of the
+    accumulation."""
+    apl_set_rn_reg(RN_REG_G0, x)
+    apl_set_rn_reg(RN_REG_G1, y)
+    apl_set_rn_reg(RN_REG_G2, acc)
+    _mac_u16(RN_REG_G2, RN_REG_G0, RN_REG_G1)
+
+
+#  ___  _      _    _
+# |   \(_)_ __(_)__(_)___ _ _
+# | |) | \ V /| (_-< / _ \ ' \
+# |___/|_|\_/ |_/__/_\___/_||_|
+
+
+@belex_apl
+def divmod_u16(Belex, quo: VR, rem: VR, x: VR, d: VR) -> None:
+    r"""Restoring division of x by d in every plat, one quotient bit per
+    step, most significant first. Each step shifts the next bit of x into
+    the partial remainder, trial-subtracts d with sub_u16 and keeps the
+    difference where it did not borrow, or where the shift carried out of
+    section 15 (the remainder then exceeds any u16 d). Division by zero
+    gives quo = 0xFFFF and rem = x. quo may alias x; rem may alias
+    neither x nor d, and quo not d."""
+    diff = RN_REG_T3
+    top = RN_REG_T4
+
+    RL[SM_0XFFFF] <= 0
+    for i in range(15, -1, -1):
+        sec = SM_0X0001 << i
+        with apl_commands("rem <<= 1, keeping the bit shifted out"):
+            rem[SM_0XFFFF] <= RL()
+            GL[SM_0X0001 << 15] <= RL()
+        with apl_commands("fetch bit i of x"):
+            rem[~SM_0X0001] <= NRL()
+            top[SM_0X0001] <= GL()
+            RL[sec] <= x()
+            GL[sec] <= RL()
+        rem[SM_0X0001] <= GL()
+        sub_u16(diff, rem, d)  # leaves the borrow in GL
+        with apl_commands("take the difference?"):
+            RL[SM_0X0001] <= top() | INV_GL()
+            GL[SM_0X0001] <= RL()
+        with apl_commands():
+            quo[sec] <= GL()
+            RL[SM_0XFFFF] <= diff() & GL()
+        RL[SM_0XFFFF] |= rem() & INV_GL()
+    rem[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def div_u16(Belex, res: VR, x: VR, d: VR) -> None:
+    r"""res = x // d; see divmod_u16."""
+    rem = Belex.VR()
+    divmod_u16(res, rem, x, d)
+
+
+@belex_apl
+def mod_u16(Belex, res: VR, x: VR, d: VR) -> None:
+    r"""res = x % d; res may alias neither x nor d. See divmod_u16."""
+    quo = Belex.VR()
+    divmod_u16(quo, res, x, d)
+
+
+@belex_apl
+def _shr1_u16(Belex, res: VR, x: VR) -> None:
+    r"""res = x >> 1; res may alias x."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        res[~(SM_0X0001 << 15)] <= SRL()
+        res[SM_0X0001 << 15] <= RSP16()
+
+
+@belex_apl
+def _shr1_u17(Belex, res: VR, x: VR) -> None:
+    r"""res = (GL:x) >> 1, shifting bit 16 in from GL, e.g. the
+    carry-out of add_u16. res may alias x."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        res[~(SM_0X0001 << 15)] <= SRL()
+        res[SM_0X0001 << 15] <= GL()
+
+
+def _magic_u16(const: int) -> tuple:
+    r"""Multiplier m and shift p with x // const == (x * m) >> p for all
+    u16 x (Granlund and Montgomery). m may take 17 bits."""
+    for p in range(16, 33):
+        m = -(-(1 << p) // const)
+        if m * const - (1 << p) <= 1 << (p - 16):
+            return m, p
+    raise AssertionError(f"No multiplier for {const}")
+
+
+def _div_u16_imm(res: int, x: int, const: int, tmp0: int,
+                 tmp1: int) -> None:
+    apl_set_rn_reg(RN_REG_G0, x)
+    apl_set_rn_reg(RN_REG_G1, res)
+    apl_set_rn_reg(RN_REG_G2, tmp0)
+
+    if const & (const - 1) == 0:
+        shift = const.bit_length() - 1
+        partial = RN_REG_G0
+    else:
+        m, p = _magic_u16(const)
+        cpy_imm_16(RN_REG_G2, m & 0xFFFF)
+        mul_u16_wide(tmp0, tmp1, x, tmp0)  # tmp0 = (x * m) >> 16, 17 bits
+        apl_set_rn_reg(RN_REG_G0, x)
+        apl_set_rn_reg(RN_REG_G1, res)
+        apl_set_rn_reg(RN_REG_G2, tmp0)
+        shift = p - 16
+        if m >> 16:  # add back x * 0x10000
+            add_u16(RN_REG_G2, RN_REG_G2, RN_REG_G0)
+            _shr1_u17(RN_REG_G2, RN_REG_G2)
+            shift -= 1
+        partial = RN_REG_G2
+
+    for _ in range(shift):
+        _shr1_u16(RN_REG_G1, partial)
+        partial = RN_REG_G1
+    if partial != RN_REG_G1:
+        src_vr_to_dst_vr(RN_REG_G1, partial)
+
+
+def div_u16_imm(res: int, x: int, const: int, tmp0: int, tmp1: int) -> None:
+    r"""res = x // const for a constant known when the kernel is
+    generated, by multiplication with a precomputed reciprocal (one
+    mul_u16_wide and a few shifts) instead of the 16 steps of div_u16.
+    Powers of two are plain shifts. tmp0 and tmp1 are scratch and must
+    differ from each other and from res and x; res may alias x."""
+    if not 0 < const < 0x10000:
+        raise ValueError(f"Divisor out of range: {const}")
+    _div_u16_imm(res, x, const, tmp0, tmp1)
+
+
+def mod_u16_imm(res: int, x: int, const: int, tmp0: int, tmp1: int) -> None:
+    r"""res = x % const, as x - (x // const) * const; see div_u16_imm."""
+    if not 0 < const < 0x10000:
+        raise ValueError(f"Divisor out of range: {const}")
+    _div_u16_imm(tmp0, x, const, tmp0, tmp1)
+    mul_u16_imm(tmp0, tmp0, const)
+    apl_set_rn_reg(RN_REG_G0, x)
+    apl_set_rn_reg(RN_REG_G1, res)
+    apl_set_rn_reg(RN_REG_G2, tmp0)
+    sub_u16(RN_REG_G1, RN_REG_G0, RN_REG_G2)
+
+
+@belex_apl
+def recip_u16(Belex, res: VR, x: VR) -> None:
+    r"""res = 0x10000 // x, saturating to 0xFFFF where x is 0 or 1: the
+    restoring division of divmod_u16 with the constant dividend folded
+    in. Its bits below the leading one are all zero, so each step only
+    shifts the remainder and trial-subtracts x, one clock less than a
+    divmod_u16 step. res may not alias x."""
+    diff = RN_REG_T3
+    top = RN_REG_T4
+    rem = RN_REG_T5
+
+    with apl_commands("rem = 1, the leading one of the dividend"):
+        RL[SM_0X0001] <= INV_RSP16()
+        RL[~SM_0X0001] <= RSP16()
+        GL[SM_0X0001 << 15] <= RL()
+    for i in range(15, -1, -1):
+        sec = SM_0X0001 << i
+        with apl_commands("rem <<= 1, keeping the bit shifted out"):
+            rem[~SM_0X0001] <= NRL()
+            rem[SM_0X0001] <= RSP16()
+            top[SM_0X0001] <= GL()
+        sub_u16(diff, rem, x)  # leaves the borrow in GL
+        with apl_commands("take the difference?"):
+            RL[SM_0X0001] <= top() | INV_GL()
+            GL[SM_0X0001] <= RL()
+        with apl_commands():
+            res[sec] <= GL()
+            RL[SM_0XFFFF] <= diff() & GL()
+        with apl_commands():
+            RL[SM_0XFFFF] |= rem() & INV_GL()
+            GL[SM_0X0001 << 15] <= RL()
+
+
+#  ___                           ___          _
+# / __| __ _ _  _ __ _ _ _ ___  | _ \___  ___| |_
+# \__ \/ _` | || / _` | '_/ -_) |   / _ \/ _ \  _|
+# |___/\__, |\_,_\__,_|_| \___| |_|_\___/\___/\__|
+#         |_|
+
+
+@belex_apl
+def isqrt_u16(Belex, res: VR, x: VR) -> None:
+    r"""res = floor(sqrt(x)), digit by digit, most significant first. Step
+    k trial-subtracts the root so far, shifted into place, with bit 2k
+    set; where sub_u16 does not borrow, the difference becomes the
+    remainder and bit k of the root is set. The root so far never
+    overlaps bit 2k, so the trial value is a masked write rather than an
+    add. res may alias x."""
+    num = RN_REG_T3
+    trial = RN_REG_T4
+    diff = RN_REG_T5
+
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        num[SM_0XFFFF] <= RL()
+        RL[SM_0XFFFF] <= RSP16()
+    for k in range(7, -1, -1):
+        bit = SM_0X0001 << (2 * k)
+        with apl_commands("trial = root | bit"):
+            res[SM_0XFFFF] <= RL()
+            trial[~bit] <= RL()
+            trial[bit] <= INV_RSP16()
+        sub_u16(diff, num, trial)  # leaves the borrow in GL
+        RL[SM_0XFFFF] <= diff() & INV_GL()
+        RL[SM_0XFFFF] |= num() & GL()
+        with apl_commands():
+            num[SM_0XFFFF] <= RL()
+            RL[SM_0XFFFF] <= res()
+        with apl_commands("root >>= 1, setting bit 2k where it fit"):
+            RL[~bit] <= SRL()
+            RL[bit] <= INV_GL()
+    res[SM_0XFFFF] <= RL()
+
+
+#   ___                          _
+#  / __|___ _ __  _ __  __ _ _ _(_)___ ___ _ _
+# | (__/ _ \ '  \| '_ \/ _` | '_| (_-</ _ \ ' \
+#  \___\___/_|_|_| .__/\__,_|_| |_/__/\___/_||_|
+#                |_|
+
+# The comparisons write a marker bit into section mrks of mrk, in every
+# plat, and leave the other sections of mrk alone. The markers can be
+# passed as-is to tartan.write_to_marked and tartan.read_from_marked.
+
+
+@belex_apl
+def _sub_u16_carry_out(Belex, x: VR, y: VR) -> None:
+    r"""The carry network of sub_u16 without the difference: leaves the
+    carry-out of x + ~y + 1 in GL, i.e. 1 where x >= y."""
+    x_xor_noty = RN_REG_T0
+    cout1 = RN_REG_T1
+    noty = RN_REG_T2
+
+    with apl_commands("instruction 1"):
+        RL[SM_0XFFFF] <= y()
+    with apl_commands("instruction 2"):
+        noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0XFFFF] ^= x()
+    with apl_commands("instruction 3"):
+        x_xor_noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0X3333] <= INV_RL()
+        GGL[SM_0X3333] <= RL()
+    with apl_commands("instruction 4"):
+        cout1[SM_0X1111] <= RL()
+        cout1[SM_0X1111<<1] <= GGL()
+        RL[SM_0X1111<<2] <= x_xor_noty() & GGL()
+        RL[SM_0X3333] <= x() & noty()
+    with apl_commands("instruction 5"):
+        cout1[SM_0X1111<<2] <= RL()
+        RL[SM_0X1111<<3] <= x_xor_noty() & NRL()
+        RL[SM_0X1111<<1] |= x_xor_noty() & NRL()
+        RL[SM_0X1111<<2] <= x() & noty()
+    with apl_commands("instruction 6"):
+        cout1[SM_0X1111<<3] <= RL()
+        RL[SM_0X1111<<3] <= x() & noty()
+        RL[SM_0X1111<<2] |= x_xor_noty() & NRL()
+    with apl_commands("instruction 7"):
+        RL[SM_0X1111<<3] |= x_xor_noty() & NRL()
+    with apl_commands("instruction 8"):
+        RL[SM_0X0001<<3] |= cout1()
+        GL[SM_0X0001<<3] <= RL()
+    with apl_commands("instruction 9"):
+        RL[SM_0X0001<<7] |= cout1() & GL()
+        GL[SM_0X0001<<7] <= RL()
+    with apl_commands("instruction 10"):
+        RL[SM_0X0001<<11] |= cout1() & GL()
+        GL[SM_0X0001<<11] <= RL()
+    with apl_commands("instruction 11"):
+        RL[SM_0X0001<<15] |= cout1() & GL()
+        GL[SM_0X0001<<15] <= RL()
+
+
+@belex_apl
+def lt_u16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x < y."""
+    _sub_u16_carry_out(x, y)
+    mrk[mrks] <= INV_GL()
+
+
+@belex_apl
+def ge_u16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x >= y."""
+    _sub_u16_carry_out(x, y)
+    mrk[mrks] <= GL()
+
+
+@belex_apl
+def gt_u16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x > y."""
+    _sub_u16_carry_out(y, x)
+    mrk[mrks] <= INV_GL()
+
+
+@belex_apl
+def le_u16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x <= y."""
+    _sub_u16_carry_out(y, x)
+    mrk[mrks] <= GL()
+
+
+@belex_apl
+def eq_u16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x == y: the AND over all sections of
+    ~(x ^ y), broadcast to GL."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        RL[SM_0XFFFF] <= y() ^ ~RL()
+        GL[SM_0XFFFF] <= RL()
+    mrk[mrks] <= GL()
+
+
+@belex_apl
+def ne_u16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x != y."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        RL[SM_0XFFFF] <= y() ^ ~RL()
+        GL[SM_0XFFFF] <= RL()
+    mrk[mrks] <= INV_GL()
+
+
+#  __  __ _      ____  __
+# |  \/  (_)_ _ / /  \/  |__ ___ __
+# | |\/| | | ' \/ /| |\/| / _` \ \ /
+# |_|  |_|_|_||_/_/ |_|  |_\__,_/_\_\
+
+
+@belex_apl
+def _select_u16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = GL ? x : y, plat by plat; res may alias x or y."""
+    RL[SM_0XFFFF] <= x() & GL()
+    RL[SM_0XFFFF] |= y() & INV_GL()
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def min_u16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = min(x, y), selecting with the carry-out of x - y while it
+    is still in GL."""
+    _sub_u16_carry_out(x, y)
+    _select_u16(res, y, x)
+
+
+@belex_apl
+def max_u16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = max(x, y); see min_u16."""
+    _sub_u16_carry_out(x, y)
+    _select_u16(res, x, y)
+
+
+@belex_apl
+def absdiff_u16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = |x - y|. With b = (x <= y) as borrow-in, x - y - b is x - y
+    where x > y and ~(y - x) elsewhere (for x == y, 0xFFFF = ~0), and it
+    borrows exactly where b is set, so XOR-ing the difference with the
+    borrow-out left in GL gives the magnitude."""
+    _sub_u16_carry_out(y, x)  # GL = (x <= y)
+    _sub_u16_borrow_in(res, x, y)
+    RL[SM_0XFFFF] <= res() ^ GL()
+    res[SM_0XFFFF] <= RL()
+
+
+#  ___      _                _   _
+# / __| __ _| |_ _  _ _ _ __ _| |_(_)_ _  __ _
+# \__ \/ _` |  _| || | '_/ _` |  _| | ' \/ _` |
+# |___/\__,_|\__|\_,_|_| \__,_|\__|_|_||_\__, |
+#                                        |___/
+
+
+@belex_apl
+def add_u16_sat(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Saturating add_u16: res = min(x + y, 0xFFFF). The carry-out is
+    still broadcast in GL after the last carry-prediction step, so it is
+    OR-ed into the sum before the write-back, for one clock over
+    add_u16. C_FLAG marks the plats that saturated."""
+    os = SM_0X0001
+    fs = SM_0XFFFF
+    threes = SM_0X3333
+    ones = SM_0X1111
+    one_f = SM_0X000F
+
+    x_xor_y = RN_REG_T0
+    cout1 = RN_REG_T1
+    flags = RN_REG_FLAGS
+
+    # Carry in/out flag
+    C_FLAG = 0
+
+    with apl_commands("instruction 1"):
+        RL[fs] <= x()
+    with apl_commands("instruction 2"):
+        RL[fs] ^= y()
+        GGL[threes] <= RL()
+    with apl_commands("instruction 3"):
+        x_xor_y[fs] <= RL()
+    with apl_commands("instruction 4"):
+        cout1[ones] <= RL()
+        cout1[ones<<1] <= GGL()
+        RL[ones<<2] <= x_xor_y() & GGL()
+        RL[threes] <= x() & y()
+    with apl_commands("instruction 5"):
+        cout1[ones<<2] <= RL()
+        RL[ones<<3] <= x_xor_y() & NRL()
+        RL[ones<<1] |= x_xor_y() & NRL()
+        RL[ones<<2] <= x() & y()
+    with apl_commands("instruction 6"):
+        cout1[ones<<3] <= RL()
+        RL[ones<<3] <= x() & y()
+        RL[ones<<2] |= x_xor_y() & NRL()
+        GGL[os] <= RL()
+    with apl_commands("instruction 7"):
+        RL[ones<<3] |= x_xor_y() & NRL()
+        GL[os<<3] <= RL()
+        RL[os] <= cout1()
+    with apl_commands("instruction 8"):
+        RL[one_f<<4] |= cout1() & GL()
+        GL[os<<7] <= RL()
+        res[os] <= RL()
+    with apl_commands("instruction 9"):
+        RL[one_f<<8] |= cout1() & GL()
+        GL[os<<11] <= RL()
+        RL[os] <= GGL()
+    with apl_commands("instruction 10"):
+        RL[one_f<<12] |= cout1() & GL()
+        GL[os<<15] <= RL()
+    with apl_commands("instruction 11"):
+        flags[os<<C_FLAG] <= GL()
+        RL[~os] <= x_xor_y() ^ NRL()
+    with apl_commands("instruction 12"):
+        RL[~os] |= GL()
+        RL[os] <= res() | GL()
+    with apl_commands("instruction 13"):
+        res[fs] <= RL()
+
+
+@belex_apl
+def sub_u16_sat(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Saturating sub_u16: res = max(x - y, 0). The borrow is broadcast
+    to GL by the last step of sub_u16 and clears the difference before
+    the write-back, for one clock over sub_u16. B_FLAG marks the plats
+    that saturated."""
+    x_xor_noty = RN_REG_T0
+    cout1 = RN_REG_T1
+    noty = RN_REG_T2
+
+    # Borrow in/out flag
+    B_FLAG = 1
+
+    with apl_commands("instruction 1"):
+        RL[SM_0XFFFF] <= y()
+    with apl_commands("instruction 2"):
+        noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0XFFFF] ^= x()
+    with apl_commands("instruction 3"):
+        x_xor_noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0X3333] <= INV_RL()
+        GGL[SM_0X3333] <= RL()
+    with apl_commands("instruction 4"):
+        cout1[SM_0X1111] <= RL()
+        cout1[SM_0X1111<<1] <= GGL()
+        RL[SM_0X1111<<2] <= x_xor_noty() & GGL()
+        RL[SM_0X3333] <= x() & noty()
+    with apl_commands("instruction 5"):
+        cout1[SM_0X1111<<2] <= RL()
+        RL[SM_0X1111<<3] <= x_xor_noty() & NRL()
+        RL[SM_0X1111<<1] |= x_xor_noty() & NRL()
+        RL[SM_0X1111<<2] <= x() & noty()
+    with apl_commands("instruction 6"):
+        cout1[SM_0X1111<<3] <= RL()
+        RL[SM_0X1111<<3] <= x() & noty()
+        RL[SM_0X1111<<2] |= x_xor_noty() & NRL()
+    with apl_commands("instruction 7"):
+        RL[SM_0X1111<<3] |= x_xor_noty() & NRL()
+    with apl_commands("instruction 8"):
+        RL[SM_0X000F] |= cout1()
+        GGL[SM_0X0001<<1] <= RL()
+        GL[SM_0X0001<<3] <= RL()
+    with apl_commands("instruction 9"):
+        RL[SM_0X0001] <= ~x_xor_noty() & INV_RSP16()
+        RL[SM_0X0001<<1] <= x_xor_noty() ^ NRL()
+        RL[SM_0X000F<<4] |= cout1() & GL()
+        GL[SM_0X0001<<7] <= RL()
+    with apl_commands("instruction 10"):
+        res[~(SM_0XFFFF<<2)] <= RL()
+        RL[SM_0X000F<<8] |= cout1() & GL()
+        GL[SM_0X0001<<11] <= RL()
+    with apl_commands("instruction 11"):
+        RL[SM_0X0001<<1] <= GGL()
+        RL[SM_0X000F<<12] |= cout1() & GL()
+        GL[SM_0X0001<<15] <= RL()
+    with apl_commands("instruction 12"):
+        RL[SM_0XFFFF<<2] <= x_xor_noty() ^ NRL()
+        RN_REG_FLAGS[SM_0X0001<<B_FLAG] <= INV_GL()
+        RL[SM_0X0001<<B_FLAG] <= INV_GL()
+        GL[SM_0X0001<<B_FLAG] <= RL()
+    with apl_commands("instruction 13"):
+        RL[~(SM_0X0001<<1)] &= INV_GL()
+        RL[SM_0X0001<<1] <= res() & INV_GL()
+    with apl_commands("instruction 14"):
+        res[SM_0XFFFF] <= RL()
+
+
+#  ___ _                  _
+# / __(_)__ _ _ _  ___ __| |
+# \__ \ / _` | ' \/ -_) _` |
+# |___/_\__, |_||_\___\__,_|
+#       |___/
+
+# Two's-complement i16 kernels. Sums, differences and the low word of
+# products are the same bits as for u16, so these run the unsigned networks
+# and derive the signed flags from what those leave behind in RL, GL and
+# the RN_REG_T0 temporary. eq_u16 and ne_u16 serve i16 as they are.
+
+
+@belex_apl
+def add_i16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x + y, setting RN_REG_FLAGS bit OF_FLAG where the sum
+    overflows i16: the carry into section 15, p15 ^ res15, differs from
+    the carry out of it, which add_u16 leaves in GL."""
+    # Signed overflow flag
+    OF_FLAG = 2
+
+    x_xor_y = RN_REG_T0
+
+    add_u16(res, x, y)
+    RL[SM_0X0001<<15] <= x_xor_y() ^ GL()
+    with apl_commands():
+        RL[SM_0X0001<<15] ^= res()
+        GL[SM_0X0001<<15] <= RL()
+    RN_REG_FLAGS[SM_0X0001<<OF_FLAG] <= GL()
+
+
+@belex_apl
+def sub_i16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x - y, setting RN_REG_FLAGS bit OF_FLAG where the
+    difference overflows i16. sub_u16 leaves the borrow, the inverted
+    carry out of section 15, in GL."""
+    # Signed overflow flag
+    OF_FLAG = 2
+
+    x_xor_noty = RN_REG_T0
+
+    sub_u16(res, x, y)
+    RL[SM_0X0001<<15] <= x_xor_noty() ^ GL()
+    with apl_commands():
+        RL[SM_0X0001<<15] ^= res()
+        GL[SM_0X0001<<15] <= RL()
+    RN_REG_FLAGS[SM_0X0001<<OF_FLAG] <= INV_GL()
+
+
+@belex_apl
+def _mul_i16_hi(Belex, hi: VR, x: VR, y: VR) -> None:
+    r"""Turn the unsigned high word of x * y into the signed one, by
+    subtracting y where x is negative and x where y is negative."""
+    addend = Belex.VR()
+
+    with apl_commands():
+        RL[SM_0X0001<<15] <= x()
+        GL[SM_0X0001<<15] <= RL()
+    RL[SM_0XFFFF] <= y() & GL()
+    addend[SM_0XFFFF] <= RL()
+    sub_u16(hi, hi, addend)
+
+    with apl_commands():
+        RL[SM_0X0001<<15] <= y()
+        GL[SM_0X0001<<15] <= RL()
+    RL[SM_0XFFFF] <= x() & GL()
+    addend[SM_0XFFFF] <= RL()
+    sub_u16(hi, hi, addend)
+
+
+@belex_apl
+def _mul_i16_overflow(Belex, hi: VR, lo: VR, x: VR, y: VR) -> None:
+    r"""Turn hi, the unsigned high word of x * y, into the signed one, and
+    set OF_FLAG where it is not the sign extension of the low word."""
+    # Signed overflow flag
+    OF_FLAG = 2
+
+    _mul_i16_hi(hi, x, y)
+    with apl_commands():
+        RL[SM_0X0001<<15] <= lo()
+        GL[SM_0X0001<<15] <= RL()
+    RL[SM_0XFFFF] <= hi() ^ GL()
+    with apl_commands():
+        RL[SM_0XFFFF] <= INV_RL()
+        GL[SM_0XFFFF] <= RL()
+    RN_REG_FLAGS[SM_0X0001<<OF_FLAG] <= INV_GL()
+
+
+def mul_i16(res: int, x: int, y: int, tmp0: int, tmp1: int) -> None:
+    r"""res = x * y (mod 2**16) for i16 x and y, setting RN_REG_FLAGS bit
+    OF_FLAG where the product does not fit in i16. The low word is that of
+    mul_u16_wide; the flag needs the signed high word, which costs two
+    masked sub_u16s. tmp0 and tmp1 are scratch and must differ from each
+    other and from x and y; res may alias any of them."""
+    mul_u16_wide(tmp0, tmp1, x, y)
+    apl_set_rn_reg(RN_REG_G0, x)
+    apl_set_rn_reg(RN_REG_G1, y)
+    apl_set_rn_reg(RN_REG_G2, tmp0)
+    apl_set_rn_reg(RN_REG_G3, tmp1)
+    _mul_i16_overflow(RN_REG_G2, RN_REG_G3, RN_REG_G0, RN_REG_G1)
+    apl_set_rn_reg(RN_REG_G0, res)
+    src_vr_to_dst_vr(RN_REG_G0, RN_REG_G3)
+
+
+@belex_apl
+def _sub_i16_lt_to_gl(Belex, x: VR, y: VR) -> None:
+    r"""GL = (x < y) for i16 x and y: the unsigned x >= y from the carry
+    network, flipped where the signs of x and y differ."""
+    x_xor_noty = RN_REG_T0
+
+    _sub_u16_carry_out(x, y)
+    with apl_commands():
+        RL[SM_0X0001<<15] <= x_xor_noty() ^ GL()
+        GL[SM_0X0001<<15] <= RL()
+
+
+@belex_apl
+def lt_i16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x < y as i16; see lt_u16."""
+    _sub_i16_lt_to_gl(x, y)
+    mrk[mrks] <= GL()
+
+
+@belex_apl
+def ge_i16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x >= y as i16."""
+    _sub_i16_lt_to_gl(x, y)
+    mrk[mrks] <= INV_GL()
+
+
+@belex_apl
+def gt_i16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x > y as i16."""
+    _sub_i16_lt_to_gl(y, x)
+    mrk[mrks] <= GL()
+
+
+@belex_apl
+def le_i16(Belex, mrk: VR, mrks: Section, x: VR, y: VR) -> None:
+    r"""Mark the plats where x <= y as i16."""
+    _sub_i16_lt_to_gl(y, x)
+    mrk[mrks] <= INV_GL()
+
+
+@belex_apl
+def _sra_i16(Belex, res: VR, x: VR,
+             by1: Mask, by2: Mask, by4: Mask, by8: Mask) -> None:
+    r"""res = x >> count as i16, with masks that leave out section 15, so
+    the sign bit stays and is copied into the sections below it."""
+    RL[SM_0XFFFF] <= x()
+    _srl_rl_by15(by1, by2, by4, by8)
+    res[SM_0XFFFF] <= RL()
+
+
+def sra_i16(res: int, x: int, count: int) -> None:
+    r"""res = x >> count as i16, replicating the sign bit, for a count
+    known when the kernel is generated; one dispatch of 17 clocks
+    whatever the count. res may alias x."""
+    apl_set_rn_reg(RN_REG_G0, x)
+    apl_set_rn_reg(RN_REG_G1, res)
+    _sra_i16(RN_REG_G1, RN_REG_G0,
+             *_stage_masks(min(count, 15), sections=0x7FFF))
+
+
+#  ___ _            _   ___     _     _
+# | __(_)_ _____ __| | | _ \___(_)_ _| |_
+# | _|| \ \ / -_) _` | |  _/ _ \ | ' \  _|
+# |_| |_/_\_\___\__,_| |_| \___/_|_||_\__|
+
+# Products of i16 fixed-point numbers with frac_bits fractional bits, e.g.
+# 8 for Q8.8 or 15 for Q1.15. The 32-bit product of mul_u16_wide, with its
+# high word made signed, holds 2 * frac_bits fractional bits; the result is
+# its bits frac_bits through frac_bits + 15, gathered in one pass through
+# RL. Rounding to nearest (ties up) adds the highest bit shifted out.
+
+
+@belex_apl
+def _mul_q_rl(Belex, rnd: VR, x: VR, y: VR, hi: VR, lo: VR,
+              sr1: Mask, sr2: Mask, sr4: Mask, sr8: Mask,
+              nl1: Mask, nl2: Mask, nl4: Mask, nl8: Mask) -> None:
+    r"""RL = the signed product of x and y shifted right by frac_bits,
+    truncated, with the sr<k> masks shifting the low word by frac_bits -
+    1 and the nl<k> ones the high word by 16 - frac_bits. The bit shifted
+    out last goes to section 0 of rnd, whose other sections are zeroed;
+    rnd may alias x or y. hi and lo are left with the high word and the
+    low word's part of the result."""
+    _mul_u16_wide(hi, lo, x, y)
+    _mul_i16_hi(hi, x, y)
+
+    RL[SM_0XFFFF] <= lo()
+    _srl_rl_by15(sr1, sr2, sr4, sr8)
+    with apl_commands():
+        rnd[SM_0X0001] <= RL()
+        rnd[~SM_0X0001] <= RSP16()
+        RL[SM_0XFFFF] <= SRL()
+    lo[SM_0XFFFF] <= RL()
+    RL[SM_0XFFFF] <= hi()
+    _nrl_rl_by15(nl1, nl2, nl4, nl8)
+    RL[SM_0XFFFF] ^= lo()  # the bits do not overlap
+
+
+@belex_apl
+def _mul_q_round(Belex, res: VR, x: VR, y: VR, hi: VR, lo: VR,
+                 sr1: Mask, sr2: Mask, sr4: Mask, sr8: Mask,
+                 nl1: Mask, nl2: Mask, nl4: Mask, nl8: Mask) -> None:
+    _mul_q_rl(res, x, y, hi, lo, sr1, sr2, sr4, sr8, nl1, nl2, nl4, nl8)
+    lo[SM_0XFFFF] <= RL()
+    add_u16(res, res, lo)
+
+
+@belex_apl
+def _mul_q_trunc(Belex, res: VR, x: VR, y: VR, hi: VR, lo: VR,
+                 sr1: Mask, sr2: Mask, sr4: Mask, sr8: Mask,
+                 nl1: Mask, nl2: Mask, nl4: Mask, nl8: Mask) -> None:
+    rnd = Belex.VR()
+
+    _mul_q_rl(rnd, x, y, hi, lo, sr1, sr2, sr4, sr8, nl1, nl2, nl4, nl8)
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def _mul_q_saturate(Belex, res: VR, hi: VR, fit_msk: Mask) -> None:
+    r"""Clamp res to 0x7FFF or 0x8000, by the sign of hi (that of the
+    product), where the product does not fit: where the sections fit_msk
+    of hi are not all equal to its sign, or where rounding carried a
+    positive res into section 15. OF_FLAG marks the plats that
+    saturated."""
+    # Signed overflow flag
+    OF_FLAG = 2
+
+    limit = Belex.VR()
+
+    with apl_commands():
+        RL[SM_0X0001<<15] <= hi()
+        GL[SM_0X0001<<15] <= RL()
+    with apl_commands():
+        limit[~(SM_0X0001<<15)] <= INV_GL()
+        limit[SM_0X0001<<15] <= GL()
+        RL[~(SM_0X0001<<15)] <= hi() ^ GL()
+        RL[SM_0X0001<<15] <= res() & INV_GL()
+    with apl_commands():
+        RL[SM_0XFFFF] <= INV_RL()
+        GL[fit_msk] <= RL()
+    with apl_commands():
+        RN_REG_FLAGS[SM_0X0001<<OF_FLAG] <= INV_GL()
+        RL[SM_0XFFFF] <= res() & GL()
+    RL[SM_0XFFFF] |= limit() & INV_GL()
+    res[SM_0XFFFF] <= RL()
+
+
+def _mul_q(res: int, x: int, y: int, frac_bits: int, tmp0: int, tmp1: int,
+           rounding: bool, saturate: bool) -> None:
+    if not 0 < frac_bits < 16:
+        raise ValueError(f"frac_bits out of range: {frac_bits}")
+    apl_set_rn_reg(RN_REG_G0, res)
+    apl_set_rn_reg(RN_REG_G1, x)
+    apl_set_rn_reg(RN_REG_G2, y)
+    apl_set_rn_reg(RN_REG_G3, tmp0)
+    apl_set_rn_reg(RN_REG_G4, tmp1)
+    masks = (_stage_masks(frac_bits - 1)
+             + _stage_masks(16 - frac_bits, first=4))
+    mul_q_rl = _mul_q_round if rounding else _mul_q_trunc
+    mul_q_rl(RN_REG_G0, RN_REG_G1, RN_REG_G2, RN_REG_G3, RN_REG_G4, *masks)
+
+    if saturate:
+        apl_set_sm_reg(SM_REG0, (0xFFFF << (frac_bits - 1)) & 0xFFFF)
+        _mul_q_saturate(RN_REG_G0, RN_REG_G3, SM_REG0)
+
+
+def mul_q(res: int, x: int, y: int, frac_bits: int, tmp0: int, tmp1: int,
+          rounding: bool = True) -> None:
+    r"""res = x * y for i16 fixed-point x, y and res with frac_bits (1 to
+    15) fractional bits, rounded to nearest (ties up) or, without
+    rounding, towards minus infinity. Products out of range wrap modulo
+    2**16. tmp0 and tmp1 are scratch, as for mul_i16; res may alias x or
+    y."""
+    _mul_q(res, x, y, frac_bits, tmp0, tmp1, rounding, saturate=False)
+
+
+def mul_q_sat(res: int, x: int, y: int, frac_bits: int, tmp0: int,
+              tmp1: int, rounding: bool = True) -> None:
+    r"""As mul_q, but products out of range saturate to 0x7FFF or 0x8000
+    (e.g. -1.0 * -1.0 in Q1.15), and RN_REG_FLAGS bit OF_FLAG marks the
+    plats that saturated. The check costs 6 clocks over mul_q."""
+    _mul_q(res, x, y, frac_bits, tmp0, tmp1, rounding, saturate=True)
+
+
+#   ___                       ___
+#  / __|__ _ _ _ _ _ _  _ ___/ __| __ ___ _____
+# | (__/ _` | '_| '_| || |___\__ \/ _` \ V / -_)
+#  \___\__,_|_| |_|  \_, |   |___/\__,_|\_/\___|
+#                    |__/
+
+# Summing K operands with K - 1 add_u16s propagates carries K - 1 times.
+# sum_k_u16 instead keeps a redundant (sum, carry) pair, with the sum
+# resident in RL, folds every further operand in with a 5-clock 3:2
+# compressor, and propagates carries once at the end. The APU issues one
+# instruction at a time, so a chain of K - 2 compressors costs the same
+# clocks as a Wallace tree of them (a 4:2 compressor is two 3:2s).
+
+
+@belex_apl
+def _csa_rl_u16(Belex, c_out: VR, c_in: VR, z: VR) -> None:
+    r"""3:2 compressor with the sum in RL: RL' = RL ^ c_in ^ z and
+    c_out = majority(RL, c_in, z) << 1, so RL' + c_out = RL + c_in + z
+    (mod 2**16). c_out may alias c_in but not z."""
+    s = RN_REG_T0
+    s_xor_c = RN_REG_T1
+    s_out = RN_REG_T2
+
+    with apl_commands():
+        s[SM_0XFFFF] <= RL()
+        RL[SM_0XFFFF] ^= c_in()
+    with apl_commands():
+        s_xor_c[SM_0XFFFF] <= RL()
+        RL[SM_0XFFFF] ^= z()
+    with apl_commands():
+        s_out[SM_0XFFFF] <= RL()
+        RL[SM_0XFFFF] <= s() & c_in()
+    RL[SM_0XFFFF] |= s_xor_c() & z()
+    with apl_commands():
+        c_out[~SM_0X0001] <= NRL()
+        c_out[SM_0X0001] <= RSP16()
+        RL[SM_0XFFFF] <= s_out()
+
+
+def sum_k_u16(dst: int, vrs: Sequence[int]) -> None:
+    r"""dst = sum(vrs) (mod 2**16) in 5 clocks per operand past the
+    second plus one add_u16, against 12 clocks per operand for a chain of
+    add_u16s. dst may alias any of vrs, which are left alone. Uses
+    RN_REG_T0 to RN_REG_T4; RN_REG_FLAGS bit C_FLAG is the carry-out of
+    the final add and not that of the whole sum."""
+    apl_set_rn_reg(RN_REG_G0, dst)
+    if len(vrs) == 0:
+        reset_16(RN_REG_G0)
+        return
+    if len(vrs) == 1:
+        apl_set_rn_reg(RN_REG_G1, vrs[0])
+        src_vr_to_dst_vr(RN_REG_G0, RN_REG_G1)
+        return
+    apl_set_rn_reg(RN_REG_G1, vrs[0])
+    apl_set_rn_reg(RN_REG_G2, vrs[1])
+    if len(vrs) == 2:
+        add_u16(RN_REG_G0, RN_REG_G1, RN_REG_G2)
+        return
+    rl_from_sb(RN_REG_G1)
+    apl_set_rn_reg(RN_REG_G1, vrs[2])
+    _csa_rl_u16(RN_REG_T3, RN_REG_G2, RN_REG_G1)
+    for vr in vrs[3:]:
+        apl_set_rn_reg(RN_REG_G1, vr)
+        _csa_rl_u16(RN_REG_T3, RN_REG_T3, RN_REG_G1)
+    sb_from_rl(RN_REG_T4)
+    add_u16(RN_REG_G0, RN_REG_T4, RN_REG_T3)
+
+
+#  ___         _          _
+# | _ \__ _ __| |_____ __| |
+# |  _/ _` / _| / / -_) _` |
+# |_| \__,_\__|_\_\___\__,_|
+
+# Two u8 lanes (sections 0-7 and 8-15) or four u4 lanes (sections 4k to
+# 4k+3) per plat. Carries do not cross lane boundaries: the lowest section
+# of each lane starts without a carry-in, or with the +1 of the two's
+# complement for subtraction. Comparisons set every section of a lane
+# where the relation holds and clear the lane elsewhere, so the result can
+# be ANDed with a value to select it. gt and le are lt and ge with x and y
+# swapped.
+
+
+@belex_apl
+def add_u8x2(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x + y in each u8 lane: add_u16 without the carry from
+    section 7 into section 8, and without a carry flag."""
+    os = SM_0X0001
+    fs = SM_0XFFFF
+    threes = SM_0X3333
+    ones = SM_0X1111
+    one_f = SM_0X000F
+    lsbs = os | os<<8
+
+    x_xor_y = RN_REG_T0
+    cout1 = RN_REG_T1
+
+    RL[fs] <= x()
+    with apl_commands():
+        RL[fs] ^= y()
+        GGL[threes] <= RL()
+    x_xor_y[fs] <= RL()
+    with apl_commands():
+        cout1[ones] <= RL()
+        cout1[ones<<1] <= GGL()
+        RL[ones<<2] <= x_xor_y() & GGL()
+        RL[threes] <= x() & y()
+    with apl_commands():
+        cout1[ones<<2] <= RL()
+        RL[ones<<3] <= x_xor_y() & NRL()
+        RL[ones<<1] |= x_xor_y() & NRL()
+        RL[ones<<2] <= x() & y()
+    with apl_commands():
+        cout1[ones<<3] <= RL()
+        RL[ones<<3] <= x() & y()
+        RL[ones<<2] |= x_xor_y() & NRL()
+    with apl_commands():
+        RL[ones<<3] |= x_xor_y() & NRL()
+        GL[os<<3] <= RL()
+    with apl_commands():
+        RL[one_f<<4] |= cout1() & GL()
+        GL[os<<11] <= RL()
+    RL[one_f<<12] |= cout1() & GL()
+    with apl_commands():
+        RL[~lsbs] <= x_xor_y() ^ NRL()
+        RL[lsbs] <= x_xor_y()
+    res[fs] <= RL()
+
+
+@belex_apl
+def _sub_u8x2_carries(Belex, x: VR, y: VR) -> None:
+    r"""Ripple the carries of x + ~y + 1 through each u8 lane, leaving the
+    carry out of every section in RL, x ^ ~y in RN_REG_T0 and the
+    carry-out of the low lane, 1 where x >= y, in GL."""
+    lsbs = SM_0X0001 | SM_0X0001<<8
+
+    x_xor_noty = RN_REG_T0
+    noty = RN_REG_T1
+
+    RL[SM_0XFFFF] <= y()
+    with apl_commands():
+        noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0XFFFF] ^= x()
+    with apl_commands():
+        x_xor_noty[SM_0XFFFF] <= INV_RL()
+        RL[lsbs] <= x() | INV_RL()
+        RL[~lsbs] <= x() & noty()
+    for i in range(1, 7):
+        RL[lsbs<<i] |= x_xor_noty() & NRL()
+    with apl_commands():
+        RL[lsbs<<7] |= x_xor_noty() & NRL()
+        GL[SM_0X0001<<7] <= RL()
+
+
+@belex_apl
+def sub_u8x2(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x - y in each u8 lane."""
+    lsbs = SM_0X0001 | SM_0X0001<<8
+
+    x_xor_noty = RN_REG_T0
+
+    _sub_u8x2_carries(x, y)
+    with apl_commands():
+        RL[~lsbs] <= x_xor_noty() ^ NRL()
+        RL[lsbs] <= ~x_xor_noty() & INV_RSP16()
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def lt_u8x2(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u8 lanes of res where x < y and clear the others."""
+    _sub_u8x2_carries(x, y)
+    with apl_commands():
+        res[~(SM_0XFFFF<<8)] <= INV_GL()
+        GL[SM_0X0001<<15] <= RL()
+    res[SM_0XFFFF<<8] <= INV_GL()
+
+
+@belex_apl
+def ge_u8x2(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u8 lanes of res where x >= y and clear the others."""
+    _sub_u8x2_carries(x, y)
+    with apl_commands():
+        res[~(SM_0XFFFF<<8)] <= GL()
+        GL[SM_0X0001<<15] <= RL()
+    res[SM_0XFFFF<<8] <= GL()
+
+
+@belex_apl
+def eq_u8x2(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u8 lanes of res where x == y and clear the others."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        RL[SM_0XFFFF] <= y() ^ ~RL()
+        GL[~(SM_0XFFFF<<8)] <= RL()
+    with apl_commands():
+        res[~(SM_0XFFFF<<8)] <= GL()
+        GL[SM_0XFFFF<<8] <= RL()
+    res[SM_0XFFFF<<8] <= GL()
+
+
+@belex_apl
+def ne_u8x2(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u8 lanes of res where x != y and clear the others."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        RL[SM_0XFFFF] <= y() ^ ~RL()
+        GL[~(SM_0XFFFF<<8)] <= RL()
+    with apl_commands():
+        res[~(SM_0XFFFF<<8)] <= INV_GL()
+        GL[SM_0XFFFF<<8] <= RL()
+    res[SM_0XFFFF<<8] <= INV_GL()
+
+
+@belex_apl
+def add_u4x4(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x + y in each u4 lane, rippling the carries in RL."""
+    ones = SM_0X1111
+
+    x_xor_y = RN_REG_T0
+
+    RL[SM_0XFFFF] <= x()
+    RL[SM_0XFFFF] ^= y()
+    with apl_commands():
+        x_xor_y[SM_0XFFFF] <= RL()
+        RL[SM_0XFFFF] <= x() & y()
+    for i in range(1, 4):
+        RL[ones<<i] |= x_xor_y() & NRL()
+    with apl_commands():
+        RL[~ones] <= x_xor_y() ^ NRL()
+        RL[ones] <= x_xor_y()
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def _sub_u4x4_carries(Belex, x: VR, y: VR) -> None:
+    r"""Ripple the carries of x + ~y + 1 through each u4 lane, leaving the
+    carry out of every section in RL, x ^ ~y in RN_REG_T0 and the
+    carry-out of each lane, 1 where x >= y, in GGL."""
+    ones = SM_0X1111
+
+    x_xor_noty = RN_REG_T0
+    noty = RN_REG_T1
+
+    RL[SM_0XFFFF] <= y()
+    with apl_commands():
+        noty[SM_0XFFFF] <= INV_RL()
+        RL[SM_0XFFFF] ^= x()
+    with apl_commands():
+        x_xor_noty[SM_0XFFFF] <= INV_RL()
+        RL[ones] <= x() | INV_RL()
+        RL[~ones] <= x() & noty()
+    for i in range(1, 3):
+        RL[ones<<i] |= x_xor_noty() & NRL()
+    with apl_commands():
+        RL[ones<<3] |= x_xor_noty() & NRL()
+        GGL[ones<<3] <= RL()
+
+
+@belex_apl
+def sub_u4x4(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x - y in each u4 lane."""
+    ones = SM_0X1111
+
+    x_xor_noty = RN_REG_T0
+
+    _sub_u4x4_carries(x, y)
+    with apl_commands():
+        RL[~ones] <= x_xor_noty() ^ NRL()
+        RL[ones] <= ~x_xor_noty() & INV_RSP16()
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def lt_u4x4(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u4 lanes of res where x < y and clear the others."""
+    _sub_u4x4_carries(x, y)
+    res[SM_0XFFFF] <= INV_GGL()
+
+
+@belex_apl
+def ge_u4x4(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u4 lanes of res where x >= y and clear the others."""
+    _sub_u4x4_carries(x, y)
+    res[SM_0XFFFF] <= GGL()
+
+
+@belex_apl
+def eq_u4x4(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u4 lanes of res where x == y and clear the others."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        RL[SM_0XFFFF] <= y() ^ ~RL()
+        GGL[SM_0XFFFF] <= RL()
+    res[SM_0XFFFF] <= GGL()
+
+
+@belex_apl
+def ne_u4x4(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""Set the u4 lanes of res where x != y and clear the others."""
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        RL[SM_0XFFFF] <= y() ^ ~RL()
+        GGL[SM_0XFFFF] <= RL()
+    res[SM_0XFFFF] <= INV_GGL()
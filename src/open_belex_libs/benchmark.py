@@ -0,0 +1,321 @@
+r"""
+Benchmark suite for the kernels of open_belex_libs, with regression
+tracking against a stored baseline.
+
+Every benchmark runs a kernel from open_belex_libs.profiler on a full-size
+emulator (32768 plats) whose VRs were filled with random u16s, and records
+the emulator wall time together with the instruction counts of the
+profiler. Results are written as JSON and may be compared against a
+baseline written by an earlier run:
+
+    python -m open_belex_libs.benchmark --output results.json \
+        --baseline benchmarks/baseline.json
+
+The comparison fails (exit status 1) when a kernel issues more
+instructions, commands or dispatches than in the baseline. Instruction
+counts are exact and the same on every machine. Wall times are not, so
+they are only compared with --time: the comparison then also fails when a
+kernel's wall time grew by more than --time-tolerance (relative) and more
+than --time-floor seconds (absolute). Refresh the baseline with
+--update-baseline on the machine the wall times will be compared on.
+"""
+
+import argparse
+import contextlib
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from open_belex_libs.emulator import Emulator
+from open_belex_libs.profiler import KERNELS, Kernel, profile
+
+#  ___              _                   _
+# | _ ) ___ _ _  __| |_  _ __  __ _ _ _| |__ ___
+# | _ \/ -_) ' \/ _| ' \| '  \/ _` | '_| / /(_-<
+# |___/\___|_||_\__|_||_|_|_|_\__,_|_| |_\_\/__/
+
+BENCHMARK_NAMES = (
+    "arithmetic.add_u16",
+    "arithmetic.add_u16_literal_sections",
+    "arithmetic.add_u16_lifted_rn_regs",
+    "arithmetic.add_u16_lifted_rn_regs_one_lifted_sm_reg",
+    "arithmetic.add_u16_lifted_rn_regs_all_lifted_sm_regs",
+    "arithmetic.sub_u16",
+    "arithmetic.adc_u16",
+    "arithmetic.sbb_u16",
+    "arithmetic.add_u32",
+    "arithmetic.add_u64",
+    "arithmetic.sub_u32",
+    "arithmetic.sub_u64",
+    "arithmetic.mul_u16",
+    "arithmetic.mul_u16_wide",
+    "arithmetic.mul_u16_imm",
+    "arithmetic.mac_u16",
+    "arithmetic.div_u16",
+    "arithmetic.mod_u16",
+    "arithmetic.div_u16_imm",
+    "arithmetic.mod_u16_imm",
+    "arithmetic.recip_u16",
+    "arithmetic.isqrt_u16",
+    "arithmetic.lt_u16",
+    "arithmetic.le_u16",
+    "arithmetic.gt_u16",
+    "arithmetic.ge_u16",
+    "arithmetic.eq_u16",
+    "arithmetic.ne_u16",
+    "arithmetic.min_u16",
+    "arithmetic.max_u16",
+    "arithmetic.absdiff_u16",
+    "arithmetic.add_u16_sat",
+    "arithmetic.sub_u16_sat",
+    "arithmetic.add_i16",
+    "arithmetic.sub_i16",
+    "arithmetic.mul_i16",
+    "arithmetic.lt_i16",
+    "arithmetic.le_i16",
+    "arithmetic.gt_i16",
+    "arithmetic.ge_i16",
+    "arithmetic.sra_i16",
+    "arithmetic.mul_q",
+    "arithmetic.mul_q_sat",
+    "arithmetic.sum_k_u16",
+    "arithmetic.add_u8x2",
+    "arithmetic.sub_u8x2",
+    "arithmetic.lt_u8x2",
+    "arithmetic.ge_u8x2",
+    "arithmetic.eq_u8x2",
+    "arithmetic.ne_u8x2",
+    "arithmetic.add_u4x4",
+    "arithmetic.sub_u4x4",
+    "arithmetic.lt_u4x4",
+    "arithmetic.ge_u4x4",
+    "arithmetic.eq_u4x4",
+    "arithmetic.ne_u4x4",
+    "scan.scan_u16_hb",
+    "scan.exscan_u16_hb",
+    "scan.seg_scan_u16_hb",
+    "scan.seg_exscan_u16_hb",
+    "scan.scan_u16",
+    "scan.exscan_u16",
+    "scan.seg_scan_u16",
+    "scan.seg_exscan_u16",
+    "scan.reduce_sum_u16_hb",
+    "scan.reduce_min_u16",
+    "scan.reduce_max_u16",
+    "bitwise.shl_16",
+    "bitwise.shr_16",
+    "bitwise.rotl_16",
+    "bitwise.rotr_16",
+    "bitwise.popcnt_u16",
+    "bitwise.clz_u16",
+    "bitwise.ctz_u16",
+    "memory.load_16_many",
+    "memory.store_16_many",
+    "memory.store_load_16",
+    "tartan.write_to_marked",
+    "tartan.read_from_marked",
+    "tartan.tartan_assign",
+    "tartan.tartan_xor_equals",
+    "tartan.tartan_and_equals",
+    "tartan.tartan_or_equals",
+    "tartan.walk_marks_eastward",
+    "tartan.write_markers_in_plats_matching_value",
+    "hdc.hdc_ternary_majority_const_section",
+    "hdc.hdc_ternary_majority_groundpound_all_sections",
+    "hdc.hdc_ternary_majority_const_vr",
+    "hdc.hdc_9_maj_via_3_const_vr",
+    "hdc.hdc_15_maj_const_vr",
+    "hdc.hdc_hamming_sum",
+    "hdc.hdc_hamming_sum_tuning",
+    "game_of_life.gosper_gun_tick",
+    "game_of_life.gol_in_section_refactored",
+    "game_of_life.gol_in_section_defactored",
+    "game_of_life.gol_in_section_danilan",
+    "game_of_life.gol_in_section_danilan_2_manually_inlined_and_laned",
+    "game_of_life.gol_in_section_danilan_2",
+)
+
+_KERNELS_BY_NAME = {kernel.qualname: kernel for kernel in KERNELS}
+
+BENCHMARKS = tuple(_KERNELS_BY_NAME[name] for name in BENCHMARK_NAMES)
+
+# Counts that may not grow from one run to the next.
+COUNTERS = ("dispatches", "instructions", "commands")
+
+#  ___              _ _
+# | _ \___ ____  _| | |_ ___
+# |   / -_|_-< || | |  _(_-<
+# |_|_\___/__/\_,_|_|\__/__/
+
+
+@dataclass
+class Result:
+    kernel: str
+    wall_time_min: float
+    wall_time_median: float
+    repeat: int
+    dispatches: int
+    instructions: int
+    commands: int
+
+
+def _randomize(emu: Emulator, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    for vr in range(15):
+        emu.write_u16(vr, rng.integers(0, 1 << 16, emu.num_plats,
+                                       dtype=np.uint16))
+
+
+def run(kernel: Kernel, repeat: int = 5, seed: int = 0,
+        num_plats: int = 32768) -> Result:
+    r"""Time ``repeat`` runs of ``kernel`` on random data and count the
+    instructions it issued. Each run starts from the same VR contents."""
+    emu = Emulator(num_plats=num_plats)
+    emu.load(kernel.module)  # keep parsing out of the timings
+    times = []
+    for _ in range(repeat):
+        _randomize(emu, seed)
+        if kernel.setup is not None:
+            kernel.setup(emu)
+        with contextlib.redirect_stdout(sys.stderr):
+            start = time.perf_counter()
+            kernel(emu)
+            times.append(time.perf_counter() - start)
+    _randomize(emu, seed)
+    counts = profile(kernel, emu)
+    return Result(
+        kernel=kernel.qualname,
+        wall_time_min=min(times),
+        wall_time_median=statistics.median(times),
+        repeat=repeat,
+        dispatches=counts.dispatches,
+        instructions=counts.instructions,
+        commands=counts.commands)
+
+
+def run_all(kernels: Sequence[Kernel] = BENCHMARKS, repeat: int = 5,
+            seed: int = 0) -> List[Result]:
+    return [run(kernel, repeat=repeat, seed=seed) for kernel in kernels]
+
+
+def to_json(results: Sequence[Result]) -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "numpy": np.__version__,
+        "results": [asdict(result) for result in results],
+    }
+
+
+#  ___                       _
+# | _ \___ __ _ _ _ ___ _____(_)___ _ _  ___
+# |   / -_) _` | '_/ -_|_-<_-< / _ \ ' \(_-<
+# |_|_\___\__, |_| \___/__/__/_\___/_||_/__/
+#         |___/
+
+
+def compare(results: Sequence[Result], baseline: Dict[str, Any],
+            time_tolerance: Optional[float] = None,
+            time_floor: float = 0.001) -> List[str]:
+    r"""Return one message per regression of ``results`` against
+    ``baseline`` (as written by to_json). Kernels missing from the
+    baseline are not regressions. Wall times are only compared when
+    ``time_tolerance`` is given."""
+    previous = {entry["kernel"]: entry for entry in baseline["results"]}
+    regressions = []
+    for result in results:
+        entry = previous.get(result.kernel)
+        if entry is None:
+            continue
+        for counter in COUNTERS:
+            old, new = entry[counter], getattr(result, counter)
+            if new > old:
+                regressions.append(
+                    f"{result.kernel}: {counter} went from {old} to {new}")
+        if time_tolerance is None:
+            continue
+        old, new = entry["wall_time_min"], result.wall_time_min
+        if new > old * (1 + time_tolerance) and new - old > time_floor:
+            regressions.append(
+                f"{result.kernel}: wall time went from {old:.6f}s to "
+                f"{new:.6f}s ({new / old:.2f}x)")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark open_belex_libs kernels on the emulator")
+    parser.add_argument("--output", "-o", default="-",
+                        help="file to write the JSON results to "
+                             "(default: stdout)")
+    parser.add_argument("--baseline",
+                        help="JSON results of an earlier run to compare "
+                             "against")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="overwrite --baseline with these results "
+                             "instead of comparing against it")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time", action="store_true",
+                        help="also compare wall times, which are only "
+                             "meaningful against a baseline recorded on "
+                             "the same machine")
+    parser.add_argument("--time-tolerance", type=float, default=0.5,
+                        help="relative wall-time growth to tolerate "
+                             "with --time (default: 0.5)")
+    parser.add_argument("--time-floor", type=float, default=0.001,
+                        help="absolute wall-time growth in seconds to "
+                             "tolerate with --time (default: 0.001)")
+    parser.add_argument("kernels", nargs="*",
+                        help="kernels to benchmark, e.g. arithmetic.add_u16 "
+                             "(default: all)")
+    args = parser.parse_args(argv)
+
+    if args.update_baseline and args.baseline is None:
+        parser.error("--update-baseline requires --baseline")
+
+    kernels = BENCHMARKS
+    if args.kernels:
+        unknown = [name for name in args.kernels
+                   if name not in _KERNELS_BY_NAME]
+        if unknown:
+            parser.error(f"unknown kernels: {', '.join(unknown)}")
+        kernels = [_KERNELS_BY_NAME[name] for name in args.kernels]
+
+    results = run_all(kernels, repeat=args.repeat, seed=args.seed)
+    document = json.dumps(to_json(results), indent=2) + "\n"
+    if args.output == "-":
+        sys.stdout.write(document)
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(document)
+
+    if args.baseline is None:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as out:
+            out.write(document)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    time_tolerance = args.time_tolerance if args.time else None
+    regressions = compare(results, baseline, time_tolerance=time_tolerance,
+                          time_floor=args.time_floor)
+    if regressions:
+        print(f"{len(regressions)} PERFORMANCE REGRESSION(S) against "
+              f"{args.baseline}:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
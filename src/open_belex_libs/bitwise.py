@@ -2,7 +2,12 @@ r"""
 By Dylon Edwards and Brian Beckman
 """
 
-from open_belex.literal import INV_RL, RL, VR, belex_apl
+from open_belex.literal import (GL, INV_GL, INV_RL, INV_RSP16, NRL, RL,
+                                RSP16, SM_0X00FF, SM_0X0F0F, SM_0X0001,
+                                SM_0X3333, SM_0X5555, SM_0XFFFF, SRL, VR,
+                                apl_commands, belex_apl)
+
+from open_belex_libs.arithmetic import add_u16
 
 
 @belex_apl
@@ -29,3 +34,198 @@ def and_16(Belex, res: VR, x: VR, y: VR) -> None:
 def not_16(Belex, res: VR, x: VR) -> None:
     RL[:] <= x()
     res[:] <= INV_RL()
+
+
+#  ___ _    _  __ _
+# / __| |_ (_)/ _| |_ ___
+# \__ \ ' \| |  _|  _(_-<
+# |___/_||_|_|_|  \__/__/
+
+# Shifts by a per-plat amount y. NRL and SRL move RL by one section, so
+# the shifts run a 4-stage barrel network over RL: stage k shifts by 2**k
+# sections and keeps the shifted value only in the plats whose bit k of y
+# is set, which GL broadcasts from section k of y. shl_16 and shr_16 give
+# zero for amounts of 16 and more; the rotates take the amount mod 16.
+
+
+@belex_apl
+def _shl_rl(Belex, v: VR, s: VR, y: VR) -> None:
+    r"""RL <<= the low 4 bits of y."""
+    for k in range(4):
+        bit = SM_0X0001 << k
+        with apl_commands():
+            v[:] <= RL()
+            RL[:] <= NRL()
+        for _ in range((1 << k) - 1):
+            RL[:] <= NRL()
+        with apl_commands():
+            s[:] <= RL()
+            RL[bit] <= y()
+            GL[bit] <= RL()
+        RL[:] <= s() & GL()
+        RL[:] |= v() & INV_GL()
+
+
+@belex_apl
+def _shr_rl(Belex, v: VR, s: VR, y: VR) -> None:
+    r"""RL >>= the low 4 bits of y."""
+    for k in range(4):
+        bit = SM_0X0001 << k
+        with apl_commands():
+            v[:] <= RL()
+            RL[:] <= SRL()
+        for _ in range((1 << k) - 1):
+            RL[:] <= SRL()
+        with apl_commands():
+            s[:] <= RL()
+            RL[bit] <= y()
+            GL[bit] <= RL()
+        RL[:] <= s() & GL()
+        RL[:] |= v() & INV_GL()
+
+
+@belex_apl
+def _zero_if_16_or_more(Belex, res: VR, s: VR, y: VR) -> None:
+    r"""res = RL, or zero where y >= 16."""
+    high = SM_0XFFFF << 4
+    with apl_commands():
+        s[:] <= RL()
+        RL[high] <= ~y() & INV_RSP16()
+        GL[high] <= RL()
+    RL[:] <= s() & GL()
+    res[:] <= RL()
+
+
+@belex_apl
+def shl_16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x << y in each plat. res may alias x or y."""
+    v = Belex.VR()
+    s = Belex.VR()
+    RL[:] <= x()
+    _shl_rl(v, s, y)
+    _zero_if_16_or_more(res, s, y)
+
+
+@belex_apl
+def shr_16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x >> y in each plat. res may alias x or y."""
+    v = Belex.VR()
+    s = Belex.VR()
+    RL[:] <= x()
+    _shr_rl(v, s, y)
+    _zero_if_16_or_more(res, s, y)
+
+
+@belex_apl
+def rotl_16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x rotated left by y (mod 16) in each plat: x << y OR'd with
+    (x >> 1) >> (15 - y), where 15 - y is ~y in the low 4 bits. res may
+    alias x or y."""
+    v = Belex.VR()
+    s = Belex.VR()
+    w = Belex.VR()
+    not_y = Belex.VR()
+    RL[:] <= ~y() & INV_RSP16()
+    not_y[:] <= RL()
+    RL[:] <= x()
+    _shl_rl(v, s, y)
+    with apl_commands():
+        w[:] <= RL()
+        RL[:] <= x()
+    RL[:] <= SRL()
+    _shr_rl(v, s, not_y)
+    RL[:] |= w()
+    res[:] <= RL()
+
+
+@belex_apl
+def rotr_16(Belex, res: VR, x: VR, y: VR) -> None:
+    r"""res = x rotated right by y (mod 16) in each plat. res may alias x
+    or y."""
+    v = Belex.VR()
+    s = Belex.VR()
+    w = Belex.VR()
+    not_y = Belex.VR()
+    RL[:] <= ~y() & INV_RSP16()
+    not_y[:] <= RL()
+    RL[:] <= x()
+    _shr_rl(v, s, y)
+    with apl_commands():
+        w[:] <= RL()
+        RL[:] <= x()
+    RL[:] <= NRL()
+    _shl_rl(v, s, not_y)
+    RL[:] |= w()
+    res[:] <= RL()
+
+
+#  ___ _ _      ___              _
+# | _ |_) |_   / __|___ _  _ _ _| |_ ___
+# | _ \ |  _| | (__/ _ \ || | ' \  _(_-<
+# |___/_|\__|  \___\___/\_,_|_||_\__/__/
+
+# Counts over the 16 sections of each plat. popcnt is the SWAR tree of
+# field sums: a half adder per pair of sections (one clock, since both
+# halves read the old RL), then nibbles, bytes and the whole u16 with
+# add_u16 on fields masked by section and aligned with SRL. clz and ctz
+# smear the highest (lowest) set bit down (up) through RL and count the
+# zeros left.
+
+
+@belex_apl
+def _popcnt_rl(Belex, res: VR, a: VR, b: VR) -> None:
+    r"""res = the number of bits set in RL."""
+    with apl_commands():
+        RL[SM_0X5555] ^= SRL()
+        RL[SM_0X5555 << 1] &= NRL()
+    for shift, field in ((2, SM_0X3333), (4, SM_0X0F0F), (8, SM_0X00FF)):
+        with apl_commands():
+            a[field] <= RL()
+            RL[:] <= SRL()
+        a[~field] <= RSP16()
+        for _ in range(shift - 1):
+            RL[:] <= SRL()
+        b[field] <= RL()
+        b[~field] <= RSP16()
+        if shift < 8:
+            add_u16(a, a, b)
+            RL[:] <= a()
+        else:
+            add_u16(res, a, b)
+
+
+@belex_apl
+def popcnt_u16(Belex, res: VR, x: VR) -> None:
+    r"""res = the number of bits set in x. res may alias x."""
+    a = Belex.VR()
+    b = Belex.VR()
+    RL[:] <= x()
+    _popcnt_rl(res, a, b)
+
+
+@belex_apl
+def clz_u16(Belex, res: VR, x: VR) -> None:
+    r"""res = the number of leading zeros of x (16 for zero). res may
+    alias x."""
+    a = Belex.VR()
+    b = Belex.VR()
+    RL[:] <= x()
+    for _ in range(15):
+        RL[:] |= SRL()
+    a[:] <= INV_RL()
+    RL[:] <= a()
+    _popcnt_rl(res, a, b)
+
+
+@belex_apl
+def ctz_u16(Belex, res: VR, x: VR) -> None:
+    r"""res = the number of trailing zeros of x (16 for zero). res may
+    alias x."""
+    a = Belex.VR()
+    b = Belex.VR()
+    RL[:] <= x()
+    for _ in range(15):
+        RL[:] |= NRL()
+    a[:] <= INV_RL()
+    RL[:] <= a()
+    _popcnt_rl(res, a, b)
@@ -29,6 +29,18 @@ def rsp_out_in(Belex, mask: Mask) -> None:
     RSP16()     <= RSP256()
 
 
+@belex_apl
+def rsp32k_out_in(Belex, mask: Mask) -> None:
+    RSP16[mask] <= RL()
+    RSP256()    <= RSP16()
+    RSP2K()     <= RSP256()
+    RSP32K()    <= RSP2K()
+    RSP_START_RET()
+    RSP2K()     <= RSP32K()
+    RSP256()    <= RSP2K()
+    RSP16()     <= RSP256()
+
+
 @belex_apl
 def rsp_out(Belex, mask: Mask) -> None:
     RSP16[mask] <= RL()
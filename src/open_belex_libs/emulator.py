@@ -0,0 +1,1131 @@
+r"""
+Bit-exact NumPy emulator for the instruction subset used by the fragments
+of open_belex_libs.
+
+The emulator models the MMB as 24 VRs of 16 sections by 32768 plats of
+booleans, plus RL, GL, GGL (one wordline per group of four sections), the
+RSP16 -> RSP256 -> RSP2K -> RSP32K response chain, and a functional model
+of L1 (the VMRs). It does not depend on open_belex: library modules are
+loaded from their source, with the names they import from open_belex bound
+to emulated equivalents, so the exact instruction sequences of the library
+fragments are executed against the NumPy model.
+
+Usage:
+
+    import numpy as np
+    from open_belex_libs.emulator import Emulator
+
+    emu = Emulator()
+    arithmetic = emu.load("arithmetic")
+
+    emu.write_u16(1, np.arange(emu.num_plats, dtype=np.uint16))
+    emu.write_u16(2, np.full(emu.num_plats, 3, dtype=np.uint16))
+    arithmetic.add_u16(0, 1, 2)
+    assert (emu.read_u16(0) == emu.read_u16(1) + 3).all()
+
+Semantics of an instruction (the body of an ``apl_commands`` block, or a
+single command outside of one):
+
+    1. WRITE commands (``vr[msk] <= src``) read the RL, GL, GGL and RSP16
+       values from before the instruction.
+    2. READ commands (``RL[msk] <= expr``) then read the SBs (including the
+       values just written) and the RL, GL and GGL values from before the
+       instruction. All READs of one instruction see the same old RL.
+    3. BROADCAST commands (``GL[msk] <= RL()``) finally read the new RL.
+       Several broadcasts to the same latch within one instruction AND
+       together over the union of their sections.
+
+This is the read-before-broadcast lane grouping relied upon by the laned
+sequences of add_u16 and sub_u16.
+
+Fragments are deferred: the instructions of a top-level fragment call
+(including those of the fragments it inlines) are recorded and executed
+when the call returns, so that code which edits ``Belex.instructions``
+(see memory.swap_vr_vmr_16_t1) behaves as it does under Belex.
+"""
+
+import ast
+import importlib.util
+import inspect
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+NSECTIONS = 16
+NGROUPS = 4
+NSECTIONS_PER_GROUP = NSECTIONS // NGROUPS
+NPLATS = 32768
+NPLATS_PER_HALF_BANK = 2048
+NVRS = 24
+
+DEFAULT_RN_REGS = {
+    "RN_REG_FLAGS": 15,
+    "RN_REG_T0": 16,
+    "RN_REG_T1": 17,
+    "RN_REG_T2": 18,
+    "RN_REG_T3": 19,
+    "RN_REG_T4": 20,
+    "RN_REG_T5": 21,
+    "RN_REG_T6": 22,
+}
+
+#  __  __         _
+# |  \/  |__ _ __| |__ ___
+# | |\/| / _` (_-< / /(_-<
+# |_|  |_\__,_/__/_\_\/__/
+
+
+class EmulatorError(Exception):
+    pass
+
+
+class _Mask(int):
+    r"""16-bit section mask. Behaves like the SM_* literals of Belex:
+    shifts truncate to 16 bits, inversion complements within 16 bits, and
+    indexing with VRs, e.g. (SM_0X0001 << 15)[s0, s1], names a multi-VR
+    write target."""
+
+    def __new__(cls, value: int, emu: Optional["Emulator"] = None):
+        mask = super().__new__(cls, int(value) & 0xFFFF)
+        mask.emu = emu
+        return mask
+
+    def _wrap(self, value: int) -> "_Mask":
+        return _Mask(value, self.emu)
+
+    def __lshift__(self, other: int) -> "_Mask":
+        return self._wrap(int(self) << int(other))
+
+    def __rshift__(self, other: int) -> "_Mask":
+        return self._wrap(int(self) >> int(other))
+
+    def __invert__(self) -> "_Mask":
+        return self._wrap(~int(self))
+
+    def __and__(self, other: int) -> "_Mask":
+        return self._wrap(int(self) & int(other))
+
+    def __or__(self, other: int) -> "_Mask":
+        return self._wrap(int(self) | int(other))
+
+    def __xor__(self, other: int) -> "_Mask":
+        return self._wrap(int(self) ^ int(other))
+
+    def __getitem__(self, vrs) -> "_SbTarget":
+        if not isinstance(vrs, tuple):
+            vrs = (vrs,)
+        vrs = [self.emu._resolve_vr(vr) for vr in vrs]
+        return _SbTarget(self.emu, vrs, int(self))
+
+    def __repr__(self) -> str:
+        return f"0x{int(self):04X}"
+
+
+def parse_sections(index) -> int:
+    r"""Convert a Belex section index into a 16-bit section mask. Slices
+    mean all sections, masks are taken as-is, bare ints are single
+    sections, and strings are either hex masks ("0xFFFE") or lists of
+    hex-digit sections ("014589CD")."""
+    if isinstance(index, _Mask):
+        return int(index)
+    if isinstance(index, slice):
+        return 0xFFFF
+    if isinstance(index, (int, np.integer)):
+        if not 0 <= index < NSECTIONS:
+            raise EmulatorError(f"Section out of range: {index}")
+        return 1 << int(index)
+    if isinstance(index, str):
+        if index.lower().startswith("0x"):
+            return int(index, 16) & 0xFFFF
+        mask = 0x0000
+        for section in index:
+            mask |= 1 << int(section, 16)
+        return mask
+    raise EmulatorError(f"Unsupported section index: {index!r}")
+
+
+def _sections_of(mask: int) -> List[int]:
+    return [section for section in range(NSECTIONS) if (mask >> section) & 1]
+
+
+#  ___                       _
+# | __|_ ___ __ _ _ ___ _______(_)___ _ _  ___
+# | _|\ \ / '_ \ '_/ -_|_-<_-< / _ \ ' \(_-<
+# |___/_\_\ .__/_| \___/__/__/_\___/_||_/__/
+#         |_|
+
+
+class _Expr(ABC):
+    r"""Lazy right-hand side of a command. Evaluates to a (16, plats)
+    boolean array."""
+
+    def __and__(self, other) -> "_Expr":
+        return _BinOp(np.logical_and, self, _as_expr(other))
+
+    def __rand__(self, other) -> "_Expr":
+        return _BinOp(np.logical_and, _as_expr(other), self)
+
+    def __or__(self, other) -> "_Expr":
+        return _BinOp(np.logical_or, self, _as_expr(other))
+
+    def __ror__(self, other) -> "_Expr":
+        return _BinOp(np.logical_or, _as_expr(other), self)
+
+    def __xor__(self, other) -> "_Expr":
+        return _BinOp(np.logical_xor, self, _as_expr(other))
+
+    def __rxor__(self, other) -> "_Expr":
+        return _BinOp(np.logical_xor, _as_expr(other), self)
+
+    def __invert__(self) -> "_Expr":
+        return _Not(self)
+
+    @abstractmethod
+    def evaluate(self, emu: "Emulator") -> np.ndarray:
+        ...
+
+    def sources(self) -> List[str]:
+        r"""Names of the latches and SBs read by this expression (for
+        profiling)."""
+        return []
+
+
+class _Const(_Expr):
+
+    def __init__(self, bit: int) -> None:
+        if bit not in (0, 1):
+            raise EmulatorError(f"Only 0 and 1 may be assigned, not {bit}")
+        self.bit = bit
+
+    def evaluate(self, emu: "Emulator") -> np.ndarray:
+        if self.bit:
+            return emu._ones
+        return emu._zeros
+
+
+class _Not(_Expr):
+
+    def __init__(self, expr: _Expr) -> None:
+        self.expr = expr
+
+    def evaluate(self, emu: "Emulator") -> np.ndarray:
+        return ~self.expr.evaluate(emu)
+
+    def sources(self) -> List[str]:
+        return self.expr.sources()
+
+
+class _BinOp(_Expr):
+
+    def __init__(self, op: Callable, lhs: _Expr, rhs: _Expr) -> None:
+        self.op = op
+        self.lhs = lhs
+        self.rhs = rhs
+
+    def evaluate(self, emu: "Emulator") -> np.ndarray:
+        return self.op(self.lhs.evaluate(emu), self.rhs.evaluate(emu))
+
+    def sources(self) -> List[str]:
+        return self.lhs.sources() + self.rhs.sources()
+
+
+class _SbRead(_Expr):
+
+    def __init__(self, vr: "_VR") -> None:
+        self.vr = vr
+
+    def evaluate(self, emu: "Emulator") -> np.ndarray:
+        return self.vr.data
+
+    def sources(self) -> List[str]:
+        return ["SB"]
+
+
+class _Src(_Expr):
+    r"""One of the latches or shifted views of RL that may be read by
+    commands: RL, NRL, SRL, ERL, WRL, GL, GGL and RSP16, plus the RSP
+    levels that appear in RSP chains."""
+
+    def __init__(self, emu: "Emulator", kind: str) -> None:
+        self.emu = emu
+        self.kind = kind
+
+    def evaluate(self, emu: "Emulator") -> np.ndarray:
+        return emu._read_src(self.kind)
+
+    def sources(self) -> List[str]:
+        return [self.kind]
+
+    def __le__(self, other: "_Src") -> "_Src":
+        # RSP chains: RSP256() <= RSP16(), RSP16() <= RSP256(), etc.
+        if not isinstance(other, _Src) or not self.kind.startswith("RSP") \
+           or not other.kind.startswith("RSP"):
+            raise EmulatorError(
+                f"Unsupported assignment: {self.kind} <= {other!r}")
+        self.emu._record(_Special(f"{self.kind} <= {other.kind}",
+                                  self.emu._rsp_move(self.kind, other.kind)))
+        return self
+
+
+def _as_expr(value) -> _Expr:
+    if isinstance(value, _Expr):
+        return value
+    if isinstance(value, (int, np.integer)) and not isinstance(value, _Mask):
+        return _Const(int(value))
+    raise EmulatorError(f"Unsupported operand: {value!r}")
+
+
+#   ___                              _
+#  / __|___ _ __  _ __  __ _ _ _  __| |___
+# | (__/ _ \ '  \| '  \/ _` | ' \/ _` (_-<
+#  \___\___/_|_|_|_|_|_\__,_|_||_\__,_/__/
+
+
+_ASSIGN_OPS = {
+    "=": lambda old, new: new,
+    "&=": np.logical_and,
+    "|=": np.logical_or,
+    "^=": np.logical_xor,
+}
+
+
+@dataclass
+class _Command:
+    phase: str  # "WRITE", "READ", "BROADCAST" or "SPECIAL"
+    description: str
+
+
+@dataclass
+class _Write(_Command):
+    vrs: Sequence["_VR"] = ()
+    mask: int = 0
+    op: str = "="
+    rhs: Optional[_Expr] = None
+
+
+@dataclass
+class _Read(_Command):
+    mask: int = 0
+    op: str = "="
+    rhs: Optional[_Expr] = None
+
+
+@dataclass
+class _Broadcast(_Command):
+    latch: str = "GL"
+    mask: int = 0
+    rhs: Optional[_Expr] = None
+
+
+class _Special(_Command):
+
+    def __init__(self, description: str,
+                 action: Optional[Callable[[], None]] = None,
+                 external: bool = False) -> None:
+        super().__init__("SPECIAL", description)
+        self.action = action
+        self.external = external
+
+
+@dataclass
+class Instruction:
+    r"""One clock: the commands of an apl_commands block, or a single
+    command issued outside of one. The attribute is named
+    ``instructions`` to match what Belex exposes through
+    ``Belex.instructions[-1].instructions``."""
+    name: Optional[str] = None
+    instructions: List[Any] = field(default_factory=list)
+
+    def commands(self) -> List[_Command]:
+        commands = []
+        for command in self.instructions:
+            if isinstance(command, Instruction):
+                commands.extend(command.commands())
+            else:
+                commands.append(command)
+        return commands
+
+
+@dataclass
+class Dispatch:
+    r"""Record of a top-level fragment call: the fragment name, the
+    instructions it executed, and the number of temporary VRs it
+    allocated."""
+    name: str
+    instructions: List[Instruction]
+    temporaries: int = 0
+
+
+@dataclass
+class ArcCommand:
+    r"""Record of an ARC-side register assignment issued by a Python
+    driver (apl_set_rn_reg or apl_set_sm_reg)."""
+    name: str
+    register: str
+    value: int
+
+
+#  _____                  _
+# |_   _|_ _ _ _ __ _ ___| |_ ___
+#   | |/ _` | '_/ _` / -_)  _(_-<
+#   |_|\__,_|_| \__, \___|\__/__/
+#               |___/
+
+
+class _Target(ABC):
+
+    def __init__(self, emu: "Emulator") -> None:
+        self.emu = emu
+
+    @abstractmethod
+    def _assign(self, op: str, rhs) -> None:
+        ...
+
+    def __le__(self, rhs) -> "_Target":
+        self._assign("=", rhs)
+        return self
+
+    def __iand__(self, rhs) -> "_Target":
+        self._assign("&=", rhs)
+        return self
+
+    def __ior__(self, rhs) -> "_Target":
+        self._assign("|=", rhs)
+        return self
+
+    def __ixor__(self, rhs) -> "_Target":
+        self._assign("^=", rhs)
+        return self
+
+
+class _RlTarget(_Target):
+
+    def __init__(self, emu: "Emulator", mask: int) -> None:
+        super().__init__(emu)
+        self.mask = mask
+
+    def _assign(self, op: str, rhs) -> None:
+        self.emu._record(_Read("READ", f"RL[0x{self.mask:04X}] {op}",
+                               mask=self.mask, op=op, rhs=_as_expr(rhs)))
+
+
+class _SbTarget(_Target):
+
+    def __init__(self, emu: "Emulator", vrs: Sequence["_VR"],
+                 mask: int) -> None:
+        super().__init__(emu)
+        self.vrs = list(vrs)
+        self.mask = mask
+
+    def _assign(self, op: str, rhs) -> None:
+        self.emu._record(_Write("WRITE", f"SB[0x{self.mask:04X}] {op}",
+                                vrs=self.vrs, mask=self.mask, op=op,
+                                rhs=_as_expr(rhs)))
+
+
+class _BroadcastTarget(_Target):
+
+    def __init__(self, emu: "Emulator", latch: str, mask: int) -> None:
+        super().__init__(emu)
+        self.latch = latch
+        self.mask = mask
+
+    def _assign(self, op: str, rhs) -> None:
+        if op != "=":
+            raise EmulatorError(f"Unsupported broadcast: {self.latch} {op}")
+        self.emu._record(_Broadcast("BROADCAST",
+                                    f"{self.latch}[0x{self.mask:04X}] <=",
+                                    latch=self.latch, mask=self.mask,
+                                    rhs=_as_expr(rhs)))
+
+
+class _Latch:
+    r"""RL, GL, GGL or RSP16 as seen by fragments: indexing names a
+    target, calling names a source."""
+
+    def __init__(self, emu: "Emulator", kind: str) -> None:
+        self.emu = emu
+        self.kind = kind
+
+    def __call__(self) -> _Src:
+        return _Src(self.emu, self.kind)
+
+    def __getitem__(self, index) -> _Target:
+        mask = parse_sections(index)
+        if self.kind == "RL":
+            return _RlTarget(self.emu, mask)
+        return _BroadcastTarget(self.emu, self.kind, mask)
+
+    def __setitem__(self, index, value) -> None:
+        if not isinstance(value, _Target):
+            self[index] <= value
+
+
+class _VR:
+    r"""A VR (SB) as seen by fragments: calling it reads it, indexing it
+    names a write target."""
+
+    def __init__(self, emu: "Emulator", index: Optional[int],
+                 data: Optional[np.ndarray] = None) -> None:
+        self.emu = emu
+        self.index = index
+        self._data = data
+
+    @property
+    def data(self) -> np.ndarray:
+        if self.index is not None:
+            return self.emu.vrs[self.index]
+        return self._data
+
+    def __call__(self) -> _SbRead:
+        return _SbRead(self)
+
+    def __getitem__(self, index) -> _SbTarget:
+        return _SbTarget(self.emu, [self], parse_sections(index))
+
+    def __setitem__(self, index, value) -> None:
+        if not isinstance(value, _Target):
+            self[index] <= value
+
+    def __repr__(self) -> str:
+        if self.index is None:
+            return "VR(temporary)"
+        return f"VR({self.index})"
+
+
+class _Register:
+    r"""An RN_REG_* or SM_REG* literal. RN registers behave as the VR they
+    currently hold."""
+
+    def __init__(self, emu: "Emulator", name: str) -> None:
+        self.emu = emu
+        self.name = name
+
+    def _vr(self) -> _VR:
+        return self.emu._resolve_vr(self)
+
+    def __call__(self) -> _SbRead:
+        return self._vr()()
+
+    def __getitem__(self, index) -> _SbTarget:
+        return self._vr()[index]
+
+    def __setitem__(self, index, value) -> None:
+        self._vr()[index] = value
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+#  ___                      _            _   _
+# | _ \__ _ _ _ __ _ _ __  | |_ _  _ _ __(_)___ ___
+# |  _/ _` | '_/ _` | '  \ |  _| || | '_ \ / -_|_-<
+# |_| \__,_|_| \__,_|_|_|_| \__|\_, | .__/_\___/__/
+#                               |__/|_|
+
+
+class _ParamType:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+VR = _ParamType("VR")
+Mask = _ParamType("Mask")
+Section = _ParamType("Section")
+u16 = _ParamType("u16")
+L1 = _ParamType("L1")
+
+
+class _BelexContext:
+    r"""The ``Belex`` parameter of emulated fragments."""
+
+    def __init__(self, emu: "Emulator") -> None:
+        self.emu = emu
+
+    @property
+    def instructions(self) -> List[Instruction]:
+        return self.emu._frame.instructions
+
+    def VR(self, initial_value: Optional[int] = None) -> _VR:
+        emu = self.emu
+        vr = _VR(emu, None, np.zeros_like(emu._zeros))
+        emu._frame.temporaries += 1
+        if initial_value is not None:
+            value = int(initial_value) & 0xFFFF
+            instruction = Instruction("temporary", [
+                _Write("WRITE", "temporary <=", vrs=[vr], mask=value,
+                       op="=", rhs=_Const(1)),
+                _Write("WRITE", "temporary <=", vrs=[vr], mask=~value & 0xFFFF,
+                       op="=", rhs=_Const(0)),
+            ])
+            emu._frame.instructions.append(instruction)
+        return vr
+
+    def Section(self, section: int) -> _Mask:
+        return _Mask(1 << int(section), self.emu)
+
+    def Mask(self, mask) -> _Mask:
+        return _Mask(parse_sections(mask), self.emu)
+
+    def glass(self, *args, **kwargs) -> None:
+        # Rendering is not emulated; like belex-test, return None.
+        return None
+
+    def assert_true(self, *args, **kwargs) -> None:
+        # Assertions in fragments only compare glass output, which is not
+        # rendered by the emulator.
+        return None
+
+
+class _BelexLiteral:
+    r"""The ``Belex`` name importable from open_belex.literal."""
+
+    @staticmethod
+    def context():
+        return _BelexLiteralContext()
+
+
+class _BelexLiteralContext:
+    debug = False
+
+
+class _Unsupported:
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __call__(self, *args, **kwargs):
+        raise EmulatorError(f"{self.name} is not supported by the emulator")
+
+
+#  ___                              _
+# | __| _ __ _ __ _ _ __  ___ _ _ | |_ ___
+# | _| '_/ _` / _` | '  \/ -_) ' \|  _(_-<
+# |_||_| \__,_\__, |_|_|_\___|_||_|\__/__/
+#             |___/
+
+
+@dataclass
+class _Frame:
+    name: str
+    instructions: List[Instruction] = field(default_factory=list)
+    lane: Optional[Instruction] = None
+    temporaries: int = 0
+
+
+class _Fragment:
+    r"""Emulated counterpart of a @belex_apl fragment. Calls from Python
+    drivers dispatch the fragment; calls from within another fragment are
+    inlined into the caller, as Belex does."""
+
+    def __init__(self, emu: "Emulator", fn: Callable,
+                 external: bool = False) -> None:
+        self.emu = emu
+        self.fn = fn
+        self.external = external
+        self.__name__ = fn.__name__
+        self.__doc__ = fn.__doc__
+        self.signature = inspect.signature(fn)
+
+    def _coerce(self, annotation, value):
+        emu = self.emu
+        if value is None:
+            return None
+        if annotation is VR:
+            return emu._resolve_vr(value)
+        if annotation in (Mask, u16):
+            if isinstance(value, _Register):
+                return _Mask(emu._resolve_sm(value), emu)
+            if isinstance(value, str):
+                return _Mask(parse_sections(value), emu)
+            return _Mask(int(value), emu)
+        if annotation is Section:
+            if isinstance(value, _Mask):
+                return value
+            return _Mask(parse_sections(value), emu)
+        if annotation is L1:
+            return int(value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        emu = self.emu
+        belex = _BelexContext(emu)
+        bound = self.signature.bind(belex, *args, **kwargs)
+        parameters = list(self.signature.parameters.values())
+        for parameter in parameters[1:]:
+            if parameter.name in bound.arguments:
+                bound.arguments[parameter.name] = self._coerce(
+                    parameter.annotation, bound.arguments[parameter.name])
+        if emu._frame is not None:
+            return self.fn(*bound.args, **bound.kwargs)
+        emu._frame = _Frame(self.__name__)
+        try:
+            result = self.fn(*bound.args, **bound.kwargs)
+            frame = emu._frame
+        finally:
+            emu._frame = None
+        for instruction in frame.instructions:
+            emu._execute(instruction)
+        if emu.record_dispatches:
+            emu.dispatches.append(Dispatch(frame.name, frame.instructions,
+                                           frame.temporaries))
+        return result
+
+
+class _AplCommands:
+
+    def __init__(self, emu: "Emulator", name: Optional[str] = None) -> None:
+        self.emu = emu
+        self.name = name
+
+    def __enter__(self) -> Instruction:
+        frame = self.emu._frame
+        if frame is None:
+            raise EmulatorError("apl_commands used outside of a fragment")
+        if frame.lane is not None:
+            raise EmulatorError("apl_commands blocks may not be nested")
+        frame.lane = Instruction(self.name)
+        return frame.lane
+
+    def __exit__(self, *exc_info) -> None:
+        frame = self.emu._frame
+        lane, frame.lane = frame.lane, None
+        if lane.instructions:
+            frame.instructions.append(lane)
+
+
+#  ___           _      _
+# | __|_ __ _  _| |__ _| |_ ___ _ _
+# | _|| '  \ || | / _` |  _/ _ \ '_|
+# |___|_|_|_\_,_|_\__,_|\__\___/_|
+
+
+class Emulator:
+    r"""Vectorized model of one APU core: ``num_vrs`` VRs of 16 sections by
+    ``num_plats`` plats, RL, GL, GGL, the RSP chain and L1.
+
+    Library modules are loaded with ``load``, which returns a module whose
+    fragments and Python drivers execute against this emulator. RN and SM
+    registers programmed by drivers live in ``rn_regs`` and ``sm_regs``.
+    When ``record_dispatches`` is set, every top-level fragment call is
+    appended to ``dispatches`` and every register assignment issued by a
+    driver to ``arc_commands``."""
+
+    def __init__(self,
+                 num_plats: int = NPLATS,
+                 num_vrs: int = NVRS,
+                 plats_per_half_bank: int = NPLATS_PER_HALF_BANK,
+                 record_dispatches: bool = False) -> None:
+        if num_plats % plats_per_half_bank != 0:
+            raise EmulatorError(
+                f"num_plats ({num_plats}) must be a multiple of "
+                f"plats_per_half_bank ({plats_per_half_bank})")
+        self.num_plats = num_plats
+        self.num_vrs = num_vrs
+        self.plats_per_half_bank = plats_per_half_bank
+        self.record_dispatches = record_dispatches
+
+        shape = (NSECTIONS, num_plats)
+        self._zeros = np.zeros(shape, dtype=bool)
+        self._ones = np.ones(shape, dtype=bool)
+        self._zeros.flags.writeable = False
+        self._ones.flags.writeable = False
+
+        self.vrs = np.zeros((num_vrs,) + shape, dtype=bool)
+        self.rl = np.zeros(shape, dtype=bool)
+        self.gl = np.zeros(num_plats, dtype=bool)
+        self.ggl = np.zeros((NGROUPS, num_plats), dtype=bool)
+        self.rsp16 = np.zeros((NSECTIONS, num_plats // 16), dtype=bool)
+        self.rsp256 = np.zeros((NSECTIONS, num_plats // 256), dtype=bool)
+        self.rsp2k = np.zeros((NSECTIONS, num_plats // 2048), dtype=bool)
+        self.rsp32k = np.zeros((NSECTIONS, 1), dtype=bool)
+        self.l1: Dict[int, np.ndarray] = {}
+
+        self.rn_regs: Dict[str, int] = dict(DEFAULT_RN_REGS)
+        self.sm_regs: Dict[str, int] = {}
+        self.dispatches: List[Dispatch] = []
+        self.arc_commands: List[ArcCommand] = []
+
+        self._frame: Optional[_Frame] = None
+        self._modules: Dict[str, ModuleType] = {}
+        self._literals = self._make_literals()
+        self._externals = self._make_externals()
+
+    #  +-+-+-+-+-+-+-+-+-+-+-+-+
+    #   H o s t   a c c e s s
+    #  +-+-+-+-+-+-+-+-+-+-+-+-+
+
+    def write_u16(self, vr: int, values) -> None:
+        r"""Store one u16 per plat into VR ``vr`` (section i holds bit i)."""
+        values = np.broadcast_to(np.asarray(values, dtype=np.uint16),
+                                 (self.num_plats,))
+        shifts = np.arange(NSECTIONS, dtype=np.uint16)[:, None]
+        self.vrs[vr] = ((values[None, :] >> shifts) & 1).astype(bool)
+
+    def read_u16(self, vr: int) -> np.ndarray:
+        r"""Load the u16 of every plat of VR ``vr``."""
+        return self.bits_to_u16(self.vrs[vr])
+
+    def read_rl(self) -> np.ndarray:
+        return self.bits_to_u16(self.rl)
+
+    def read_rsp2k(self) -> np.ndarray:
+        r"""Load the u16 left in RSP2K for each half-bank, e.g. by
+        rsp_out."""
+        return self.bits_to_u16(self.rsp2k)
+
+    def read_rsp32k(self) -> int:
+        r"""Load the u16 left in RSP32K, e.g. by rsp_out."""
+        return int(self.bits_to_u16(self.rsp32k)[0])
+
+    @staticmethod
+    def bits_to_u16(bits: np.ndarray) -> np.ndarray:
+        weights = (np.uint16(1) << np.arange(NSECTIONS, dtype=np.uint16))
+        return (bits.astype(np.uint16) * weights[:, None]).sum(
+            axis=0, dtype=np.uint16)
+
+    def read_section(self, vr: int, section: int) -> np.ndarray:
+        r"""Load the wordline of a single section, e.g. a flag or a
+        marker section."""
+        return self.vrs[vr, section].copy()
+
+    def write_section(self, vr: int, section: int, bits) -> None:
+        self.vrs[vr, section] = np.broadcast_to(
+            np.asarray(bits, dtype=bool), (self.num_plats,))
+
+    def pack(self, vr: int) -> np.ndarray:
+        r"""VR ``vr`` as 16 wordlines of packed uint64 (plat 0 in the
+        least-significant bit of word 0)."""
+        return np.packbits(self.vrs[vr], axis=1, bitorder="little") \
+                 .view(np.uint64)
+
+    def unpack(self, vr: int, words: np.ndarray) -> None:
+        words = np.ascontiguousarray(words, dtype=np.uint64)
+        self.vrs[vr] = np.unpackbits(words.view(np.uint8), axis=1,
+                                     count=self.num_plats,
+                                     bitorder="little").astype(bool)
+
+    #  +-+-+-+-+-+-+-+
+    #   L o a d i n g
+    #  +-+-+-+-+-+-+-+
+
+    def load(self, module_name: str) -> ModuleType:
+        r"""Load an open_belex_libs module (e.g. "arithmetic" or
+        "open_belex_libs.arithmetic") from source, binding its Belex
+        imports to this emulator."""
+        if not module_name.startswith("open_belex_libs."):
+            module_name = f"open_belex_libs.{module_name}"
+        if module_name in self._modules:
+            return self._modules[module_name]
+
+        spec = importlib.util.find_spec(module_name)
+        if spec is None or spec.origin is None:
+            raise EmulatorError(f"Cannot find module {module_name}")
+        with open(spec.origin, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=spec.origin)
+
+        module = ModuleType(module_name)
+        module.__file__ = spec.origin
+        namespace = module.__dict__
+        self._modules[module_name] = module
+
+        fragments = []
+        body = []
+        for node in tree.body:
+            if isinstance(node, ast.ImportFrom) and node.module \
+               and node.module.split(".")[0] in ("open_belex",
+                                                 "open_belex_libs"):
+                self._bind_imports(node, namespace)
+                continue
+            if isinstance(node, ast.FunctionDef):
+                decorators = [decorator for decorator in node.decorator_list
+                              if not _is_belex_apl(decorator)]
+                if len(decorators) != len(node.decorator_list):
+                    fragments.append(node.name)
+                    node.decorator_list = decorators
+            body.append(node)
+        tree.body = body
+
+        exec(compile(tree, spec.origin, "exec"), namespace)
+        for name in fragments:
+            namespace[name] = _Fragment(self, namespace[name])
+        return module
+
+    def _bind_imports(self, node: ast.ImportFrom, namespace: dict) -> None:
+        if node.module.startswith("open_belex_libs"):
+            module = self.load(node.module)
+            for alias in node.names:
+                namespace[alias.asname or alias.name] = \
+                    getattr(module, alias.name)
+            return
+        for alias in node.names:
+            name = alias.name
+            if node.module == "open_belex.literal" and name in self._literals:
+                value = self._literals[name]
+            elif node.module == "open_belex.literal" \
+                    and re.fullmatch("SM_0X[0-9A-F]{4}", name):
+                value = _Mask(int(name[len("SM_"):], 16), self)
+            elif name in self._externals:
+                value = self._externals[name]
+            else:
+                value = _Unsupported(f"{node.module}.{name}")
+            namespace[alias.asname or name] = value
+
+    def _make_literals(self) -> Dict[str, Any]:
+        literals: Dict[str, Any] = {
+            "VR": VR, "Mask": Mask, "Section": Section, "u16": u16, "L1": L1,
+            "Belex": _BelexLiteral,
+            "belex_apl": lambda fn: fn,
+            "apl_commands": lambda name=None: _AplCommands(self, name),
+            "apl_set_rn_reg": self._apl_set_rn_reg,
+            "apl_set_sm_reg": self._apl_set_sm_reg,
+        }
+        for kind in ("RL", "GL", "GGL", "RSP16"):
+            literals[kind] = _Latch(self, kind)
+        for kind in ("NRL", "SRL", "ERL", "WRL", "RSP256", "RSP2K", "RSP32K",
+                     "INV_RL", "INV_NRL", "INV_SRL", "INV_ERL", "INV_WRL",
+                     "INV_GL", "INV_GGL", "INV_RSP16"):
+            literals[kind] = (lambda kind: lambda: _Src(self, kind))(kind)
+        for kind in ("NOOP", "RSP_END", "RSP_START_RET"):
+            literals[kind] = (lambda kind: lambda: self._special(kind))(kind)
+        for index in range(16):
+            literals[f"SM_REG{index}"] = _Register(self, f"SM_REG{index}")
+            literals[f"SM_REG_{index}"] = literals[f"SM_REG{index}"]
+        for name in ("FLAGS", "G0", "G1", "G2", "G3", "G4", "G5", "G6", "G7",
+                     "T0", "T1", "T2", "T3", "T4", "T5", "T6"):
+            literals[f"RN_REG_{name}"] = _Register(self, f"RN_REG_{name}")
+        return literals
+
+    def _make_externals(self) -> Dict[str, Any]:
+        r"""Emulated versions of the open_belex.kernel_libs fragments that
+        the library imports."""
+        lit = self._literals
+        RL, INV_RSP16, RSP16 = lit["RL"], lit["INV_RSP16"], lit["RSP16"]
+        apl_commands = lit["apl_commands"]
+        emu = self
+
+        def cpy_imm_16(Belex, tgt: VR, val: u16) -> None:
+            with apl_commands():
+                tgt[val] <= INV_RSP16()
+                tgt[~val] <= RSP16()
+
+        def cpy_imm_16_to_rl(Belex, val: u16) -> None:
+            with apl_commands():
+                RL[val] <= INV_RSP16()
+                RL[~val] <= RSP16()
+
+        def cpy_16(Belex, dst: VR, src: VR) -> None:
+            RL[:] <= src()
+            dst[:] <= RL()
+
+        def cpy_vr(Belex, dst: VR, src: VR) -> None:
+            RL[:] <= src()
+            dst[:] <= RL()
+
+        def load_16_t0(Belex, dst: VR, src: L1, parity_src: L1,
+                       parity_mask: Mask) -> None:
+            def action() -> None:
+                for row in range(4):
+                    data = emu.l1.get(src + row)
+                    if data is None:
+                        data = np.zeros((4, emu.num_plats), dtype=bool)
+                    dst.data[4 * row:4 * row + 4] = data
+            emu._record(_Special("load_16_t0", action, external=True),
+                        own_instruction=True)
+
+        def store_16_t0(Belex, dst: L1, parity_dst: L1, parity_mask: Mask,
+                        src: VR) -> None:
+            def action() -> None:
+                for row in range(4):
+                    emu.l1[dst + row] = src.data[4 * row:4 * row + 4].copy()
+            emu._record(_Special("store_16_t0", action, external=True),
+                        own_instruction=True)
+
+        externals = {}
+        for fn in (cpy_imm_16, cpy_imm_16_to_rl, cpy_16, cpy_vr,
+                   load_16_t0, store_16_t0):
+            externals[fn.__name__] = _Fragment(self, fn, external=True)
+        externals["FragmentCallerCall"] = object
+        return externals
+
+    #  +-+-+-+-+-+-+-+-+-+
+    #   R e g i s t e r s
+    #  +-+-+-+-+-+-+-+-+-+
+
+    def _apl_set_rn_reg(self, reg: _Register, value: int) -> None:
+        self.rn_regs[reg.name] = int(value)
+        if self.record_dispatches:
+            self.arc_commands.append(
+                ArcCommand("apl_set_rn_reg", reg.name, int(value)))
+
+    def _apl_set_sm_reg(self, reg: _Register, value: int) -> None:
+        self.sm_regs[reg.name] = int(value) & 0xFFFF
+        if self.record_dispatches:
+            self.arc_commands.append(
+                ArcCommand("apl_set_sm_reg", reg.name, int(value) & 0xFFFF))
+
+    def _resolve_vr(self, value) -> _VR:
+        if isinstance(value, _VR):
+            return value
+        if isinstance(value, _Register):
+            if value.name not in self.rn_regs:
+                raise EmulatorError(
+                    f"{value.name} is not set; call apl_set_rn_reg first")
+            return _VR(self, self.rn_regs[value.name])
+        if isinstance(value, (int, np.integer)):
+            if not 0 <= value < self.num_vrs:
+                raise EmulatorError(f"VR out of range: {value}")
+            return _VR(self, int(value))
+        raise EmulatorError(f"Not a VR: {value!r}")
+
+    def _resolve_sm(self, reg: _Register) -> int:
+        if reg.name not in self.sm_regs:
+            raise EmulatorError(
+                f"{reg.name} is not set; call apl_set_sm_reg first")
+        return self.sm_regs[reg.name]
+
+    #  +-+-+-+-+-+-+-+-+-+
+    #   R e c o r d i n g
+    #  +-+-+-+-+-+-+-+-+-+
+
+    def _record(self, command: _Command,
+                own_instruction: bool = False) -> None:
+        frame = self._frame
+        if frame is None:
+            raise EmulatorError("Commands may only be issued in fragments")
+        if frame.lane is not None and not own_instruction:
+            frame.lane.instructions.append(command)
+        else:
+            frame.instructions.append(Instruction(None, [command]))
+
+    def _special(self, kind: str) -> None:
+        if kind == "RSP_END":
+            action = self._rsp_end
+        else:
+            action = None
+        self._record(_Special(kind, action))
+
+    #  +-+-+-+-+-+-+-+-+-+
+    #   E x e c u t i o n
+    #  +-+-+-+-+-+-+-+-+-+
+
+    def _read_src(self, kind: str) -> np.ndarray:
+        inverted = kind.startswith("INV_")
+        if inverted:
+            kind = kind[len("INV_"):]
+        if kind == "RL":
+            value = self.rl
+        elif kind == "NRL":
+            value = np.zeros_like(self.rl)
+            value[1:] = self.rl[:-1]
+        elif kind == "SRL":
+            value = np.zeros_like(self.rl)
+            value[:-1] = self.rl[1:]
+        elif kind in ("ERL", "WRL"):
+            half_banks = self.rl.reshape(NSECTIONS, -1,
+                                         self.plats_per_half_bank)
+            value = np.zeros_like(half_banks)
+            if kind == "WRL":  # each plat reads its western neighbor
+                value[..., 1:] = half_banks[..., :-1]
+            else:  # each plat reads its eastern neighbor
+                value[..., :-1] = half_banks[..., 1:]
+            value = value.reshape(NSECTIONS, self.num_plats)
+        elif kind == "GL":
+            value = np.broadcast_to(self.gl, self.rl.shape)
+        elif kind == "GGL":
+            value = np.repeat(self.ggl, NSECTIONS_PER_GROUP, axis=0)
+        elif kind == "RSP16":
+            value = np.repeat(self.rsp16, 16, axis=1)
+        else:
+            raise EmulatorError(f"{kind} cannot be read by commands")
+        if inverted:
+            return ~value
+        return value
+
+    def _rsp_move(self, dst: str, src: str) -> Callable[[], None]:
+        levels = {"RSP16": 16, "RSP256": 256, "RSP2K": 2048,
+                  "RSP32K": self.num_plats}
+
+        def action() -> None:
+            src_value = getattr(self, src.lower())
+            ratio = levels[dst] // levels[src]
+            if ratio >= 1:  # up the chain: OR together
+                value = src_value.reshape(NSECTIONS, -1, ratio).any(axis=2)
+            else:  # back down the chain: replicate
+                value = np.repeat(src_value, levels[src] // levels[dst],
+                                  axis=1)
+            setattr(self, dst.lower(), value)
+
+        return action
+
+    def _rsp_end(self) -> None:
+        # The upper levels stay readable by the host (as by the ARC);
+        # only RSP16, which commands can read, is cleared.
+        self.rsp16 = np.zeros_like(self.rsp16)
+
+    def _execute(self, instruction: Instruction) -> None:
+        commands = instruction.commands()
+
+        for command in commands:
+            if command.phase == "SPECIAL" and command.action is not None:
+                command.action()
+
+        writes = [(command, command.rhs.evaluate(self))
+                  for command in commands if command.phase == "WRITE"]
+        for command, value in writes:
+            sections = _sections_of(command.mask)
+            op = _ASSIGN_OPS[command.op]
+            for vr in command.vrs:
+                data = vr.data
+                data[sections] = op(data[sections], value[sections])
+
+        reads = [(command, command.rhs.evaluate(self))
+                 for command in commands if command.phase == "READ"]
+        for command, value in reads:
+            sections = _sections_of(command.mask)
+            self.rl[sections] = _ASSIGN_OPS[command.op](self.rl[sections],
+                                                        value[sections])
+
+        broadcasts: Dict[str, int] = {}
+        for command in commands:
+            if command.phase == "BROADCAST":
+                broadcasts[command.latch] = \
+                    broadcasts.get(command.latch, 0) | command.mask
+                # Only RL may be broadcast, so the masks may be merged.
+                if not (isinstance(command.rhs, _Src)
+                        and command.rhs.kind == "RL"):
+                    raise EmulatorError(
+                        f"Only RL may be broadcast to {command.latch}")
+        for latch, mask in broadcasts.items():
+            sections = _sections_of(mask)
+            if latch == "GL":
+                self.gl = self.rl[sections].all(axis=0)
+            elif latch == "GGL":
+                ggl = np.ones_like(self.ggl)
+                for group in range(NGROUPS):
+                    in_group = [section for section in sections
+                                if section // NSECTIONS_PER_GROUP == group]
+                    if in_group:
+                        ggl[group] = self.rl[in_group].all(axis=0)
+                self.ggl = ggl
+            elif latch == "RSP16":
+                rsp16 = np.zeros_like(self.rsp16)
+                rsp16[sections] = self.rl[sections] \
+                    .reshape(len(sections), -1, 16).any(axis=2)
+                self.rsp16 = rsp16
+            else:
+                raise EmulatorError(f"Cannot broadcast to {latch}")
+
+
+def _is_belex_apl(decorator: ast.expr) -> bool:
+    return (isinstance(decorator, ast.Name) and decorator.id == "belex_apl") \
+        or (isinstance(decorator, ast.Attribute)
+            and decorator.attr == "belex_apl")
@@ -2,12 +2,18 @@ r"""
 By Dylon Edwards and Brian Beckman
 """
 
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (Any, Callable, Dict, List, Optional, Sequence, Set,
+                    Tuple)
+
 from open_belex.bleir.types import FragmentCallerCall
 from open_belex.kernel_libs.memory import load_16_t0, store_16_t0
 from open_belex.literal import (L1, RL, RN_REG_T0, SM_0XFFFF, VR, Mask,
                                 apl_commands, belex_apl)
 
 from open_belex_libs.constants import (APL_VM_ROWS_PER_U16, GSI_L1_VA_NUM_ROWS,
+                                       GSI_L1_VA_NUM_SETS,
                                        GSI_L1_VA_SET_ADDR_ROWS)
 
 # __   ____  __ ___     _    _
@@ -27,26 +33,45 @@ def belex_gal_vm_reg_to_set_ext(vm_reg: int) -> int:
     return parity_grp, parity_row, row
 
 
+# Two vm_regs (parity groups 0 and 1) per parity set.
+NUM_VM_REGS = 2 * int(GSI_L1_VA_NUM_SETS)
+
+# vm_reg -> (parity_grp, parity_row, row), as belex_gal_vm_reg_to_set_ext.
+VM_REG_TO_SET_EXT = tuple(belex_gal_vm_reg_to_set_ext(vm_reg)
+                          for vm_reg in range(NUM_VM_REGS))
+
+
 def load_16_parity_mask(parity_grp: int) -> int:
     return 0x0808 << parity_grp
 
 
+def _check_vm_reg(vm_reg: int) -> None:
+    if not 0 <= vm_reg < NUM_VM_REGS:
+        raise ValueError(f"vm_reg out of range: {vm_reg}")
+
+
+def _load_16_args(dst: int, vm_reg: int) -> Tuple[int, int, int, int]:
+    _check_vm_reg(vm_reg)
+    parity_grp, parity_src, src = VM_REG_TO_SET_EXT[vm_reg]
+    return dst, src, parity_src, load_16_parity_mask(parity_grp)
+
+
 def load_16(dst: int, vm_reg: int) -> FragmentCallerCall:
-    parity_grp, parity_src, src = \
-        belex_gal_vm_reg_to_set_ext(vm_reg)
-    parity_mask = load_16_parity_mask(parity_grp)
-    return load_16_t0(dst, src, parity_src, parity_mask)
+    return load_16_t0(*_load_16_args(dst, vm_reg))
 
 
 def store_16_parity_mask(parity_grp: int) -> int:
     return 0x0001 << (4 * parity_grp)
 
 
+def _store_16_args(vm_reg: int, src: int) -> Tuple[int, int, int, int]:
+    _check_vm_reg(vm_reg)
+    parity_grp, parity_dst, dst = VM_REG_TO_SET_EXT[vm_reg]
+    return dst, parity_dst, store_16_parity_mask(parity_grp), src
+
+
 def store_16(vm_reg: int, src: int) -> FragmentCallerCall:
-    parity_grp, parity_dst, dst = \
-        belex_gal_vm_reg_to_set_ext(vm_reg)
-    parity_mask = store_16_parity_mask(parity_grp)
-    return store_16_t0(dst, parity_dst, parity_mask, src)
+    return store_16_t0(*_store_16_args(vm_reg, src))
 
 
 @belex_apl
@@ -72,10 +97,313 @@ def swap_vr_vmr_16_t1(
 
 
 def swap_vr_vmr_16(vr: int, vmr: int) -> FragmentCallerCall:
-    parity_grp, parity_row, vmr_row = \
-        belex_gal_vm_reg_to_set_ext(vmr)
+    _check_vm_reg(vmr)
+    parity_grp, parity_row, vmr_row = VM_REG_TO_SET_EXT[vmr]
     load_parity_mask = load_16_parity_mask(parity_grp)
     store_parity_mask = store_16_parity_mask(parity_grp)
     return swap_vr_vmr_16_t1(vr, vmr_row, parity_row,
                              load_parity_mask,
                              store_parity_mask)
+
+
+#  ___       _      _
+# | _ ) __ _| |_ __| |_  ___ ___
+# | _ \/ _` |  _/ _| ' \/ -_|_-<
+# |___/\__,_|\__\__|_||_\___/__/
+
+# Spilling or restoring a working set one VR at a time costs a dispatch
+# per VR. The _x2 fragments inline two load_16_t0s or store_16_t0s into
+# one dispatch; load_16_many and store_16_many run a list of transfers
+# through them, two at a time, with the L1 addresses and parity masks
+# looked up in VM_REG_TO_SET_EXT. Two transfers take a VMR row and a
+# parity row each, which is all 4 L1 registers.
+
+
+@belex_apl
+def _load_16_x2_t0(Belex,
+                   dst0: VR, src0: L1, parity_src0: L1, parity_mask0: Mask,
+                   dst1: VR, src1: L1, parity_src1: L1, parity_mask1: Mask
+                   ) -> None:
+    load_16_t0(dst0, src0, parity_src0, parity_mask0)
+    load_16_t0(dst1, src1, parity_src1, parity_mask1)
+
+
+@belex_apl
+def _store_16_x2_t0(Belex,
+                    dst0: L1, parity_dst0: L1, parity_mask0: Mask, src0: VR,
+                    dst1: L1, parity_dst1: L1, parity_mask1: Mask, src1: VR
+                    ) -> None:
+    store_16_t0(dst0, parity_dst0, parity_mask0, src0)
+    store_16_t0(dst1, parity_dst1, parity_mask1, src1)
+
+
+def load_16_many(pairs: Sequence[Tuple[int, int]]
+                 ) -> List[FragmentCallerCall]:
+    r"""Load each (vr, vm_reg) of pairs, as load_16, in one dispatch per
+    two pairs. Pairs are loaded in order, so a VR listed twice ends up
+    with its last vm_reg."""
+    args = [_load_16_args(dst, vm_reg) for dst, vm_reg in pairs]
+    calls = []
+    for i in range(0, len(args) - 1, 2):
+        calls.append(_load_16_x2_t0(*args[i], *args[i + 1]))
+    if len(args) % 2 == 1:
+        calls.append(load_16_t0(*args[-1]))
+    return calls
+
+
+def store_16_many(pairs: Sequence[Tuple[int, int]]
+                  ) -> List[FragmentCallerCall]:
+    r"""Store each (vr, vm_reg) of pairs, as store_16, in one dispatch per
+    two pairs. Pairs are stored in order, so a vm_reg listed twice ends
+    up with its last VR."""
+    args = [_store_16_args(vm_reg, src) for src, vm_reg in pairs]
+    calls = []
+    for i in range(0, len(args) - 1, 2):
+        calls.append(_store_16_x2_t0(*args[i], *args[i + 1]))
+    if len(args) % 2 == 1:
+        calls.append(store_16_t0(*args[-1]))
+    return calls
+
+
+#  ___ _                      _
+# / __| |_ _ _ ___ __ _ _ __ (_)_ _  __ _
+# \__ \  _| '_/ -_) _` | '  \| | ' \/ _` |
+# |___/\__|_| \___\__,_|_|_|_|_|_||_\__, |
+#                                   |___/
+
+# Streaming a sequence of chunks through load_16, compute and store_16 one
+# at a time costs two transfer dispatches per chunk. stream_16 cycles the
+# chunks through two VR buffers instead: chunk i is computed in one buffer
+# with chunk i+1 already loaded into the other, and the buffer of chunk i
+# is then written back and refilled with chunk i+2 by a single
+# store_load_16_t0, which fuses the store and the load as
+# swap_vr_vmr_16_t1 does. Nothing runs concurrently: the instructions are
+# issued in order, and only the number of dispatches goes down.
+
+
+@belex_apl
+def store_load_16_t0(
+        Belex,
+        vr: VR,
+        dst: L1,
+        parity_dst: L1,
+        store_parity_msk: Mask,
+        src: L1,
+        parity_src: L1,
+        load_parity_msk: Mask
+        ) -> None:
+    store_16_t0(dst, parity_dst, store_parity_msk, vr)
+    load_16_t0(vr, src, parity_src, load_parity_msk)
+
+
+def store_load_16(vr: int, dst_vm_reg: int,
+                  src_vm_reg: int) -> FragmentCallerCall:
+    r"""Store vr to dst_vm_reg, then load src_vm_reg into vr, in one
+    dispatch."""
+    dst, parity_dst, store_parity_mask, _ = _store_16_args(dst_vm_reg, vr)
+    _, src, parity_src, load_parity_mask = _load_16_args(vr, src_vm_reg)
+    return store_load_16_t0(vr, dst, parity_dst, store_parity_mask,
+                            src, parity_src, load_parity_mask)
+
+
+def stream_16(compute: Callable[[int], Any],
+              vm_regs: Sequence[int],
+              buffers: Tuple[int, int],
+              out_vm_regs: Optional[Sequence[int]] = None) -> None:
+    r"""Run compute over the chunk of each vm_reg in vm_regs, in order.
+
+    compute is called with the VR holding the current chunk (one of the
+    two buffers) and must leave its result in that VR, e.g. a fragment
+    with its result and operand bound to the same VR. The result of chunk
+    i is stored to out_vm_regs[i], or back to vm_regs[i] if out_vm_regs is
+    None. Chunk i+1 is loaded before the result of chunk i is stored, but
+    chunk i+2 is loaded after it (in the same dispatch), so out_vm_regs[i]
+    may alias vm_regs[j] for j <= i + 1 but not for j >= i + 2.
+
+    The VRs of buffers are clobbered; compute may use any other VR."""
+    if out_vm_regs is None:
+        out_vm_regs = vm_regs
+    if len(out_vm_regs) != len(vm_regs):
+        raise ValueError(
+            f"Expected {len(vm_regs)} out_vm_regs, got {len(out_vm_regs)}")
+    if buffers[0] == buffers[1]:
+        raise ValueError(f"Expected two distinct buffers, got {buffers}")
+
+    num_chunks = len(vm_regs)
+    for i in range(min(2, num_chunks)):
+        load_16(buffers[i], vm_regs[i])
+    for i in range(num_chunks):
+        vr = buffers[i % 2]
+        compute(vr)
+        if i + 2 < num_chunks:
+            store_load_16(vr, out_vm_regs[i], vm_regs[i + 2])
+        else:
+            store_16(out_vm_regs[i], vr)
+
+
+#  ___      _ _ _ _
+# / __|_ __(_) | (_)_ _  __ _
+# \__ \ '_ \ | | | | ' \/ _` |
+# |___/ .__/_|_|_|_|_||_\__, |
+#     |_|               |___/
+
+# A kernel with more live temporaries than free VRs has had to be split
+# into fragments by hand (e.g. hdc_15_maj_const_vr_first_eight_sections and
+# hdc_15_maj_const_vr_last_seven_sections). SpillManager lets a Python
+# driver name its temporaries instead, and maps them onto a pool of VRs,
+# spilling the least recently used ones to a pool of reserved vm_regs.
+# When a spilled temporary is brought back into the VR of a dirty victim,
+# swap_vr_vmr_16 spills the one and restores the other in a single
+# dispatch; a victim whose VMR copy is still current is dropped without a
+# store.
+
+
+@dataclass
+class SpillTraffic:
+    r"""The transfers a SpillManager added. ``stores`` and ``loads`` count
+    VRs moved to and from VMRs (a swap counts as one of each), and
+    ``dispatches`` the load_16, store_16 and swap_vr_vmr_16 calls that
+    moved them."""
+    stores: int = 0
+    loads: int = 0
+    swaps: int = 0
+    dispatches: int = 0
+    peak_live: int = 0
+
+
+class SpillManager:
+    r"""Map named temporaries onto the VRs of ``vrs``, spilling to the
+    vm_regs of ``vm_regs`` when more are live than there are VRs.
+
+        spills = SpillManager(vrs=range(8), vm_regs=range(32, 48))
+        x, y, s = spills.acquire("x", "y", "s", written=["s"])
+        add_u16(s, x, y)
+        spills.release("x", "y")
+        print(spills.traffic)
+
+    The VRs returned by acquire hold the named temporaries until the next
+    call to acquire, which may spill any of them that it was not asked
+    for. A temporary acquired for the first time has undefined contents.
+    """
+
+    def __init__(self, vrs: Sequence[int], vm_regs: Sequence[int]) -> None:
+        self.free_vrs: List[int] = list(vrs)
+        self.free_vm_regs: List[int] = list(vm_regs)
+        self.num_vrs = len(self.free_vrs)
+        # name -> VR, least recently used first
+        self.resident: "OrderedDict[str, int]" = OrderedDict()
+        # name -> vm_reg holding a copy of (or, if spilled, all of) it
+        self.saved: Dict[str, int] = {}
+        # resident names whose VR differs from their saved copy
+        self.dirty: Set[str] = set()
+        self.traffic = SpillTraffic()
+
+    def _can_take_vm_reg(self) -> bool:
+        return bool(self.free_vm_regs) or any(
+            name in self.saved and name not in self.dirty
+            for name in self.resident)
+
+    def _take_vm_reg(self) -> int:
+        if not self.free_vm_regs:
+            # Reclaim the slot of a clean copy of a resident temporary.
+            for name in self.resident:
+                if name in self.saved and name not in self.dirty:
+                    self.dirty.add(name)
+                    return self.saved.pop(name)
+            raise RuntimeError("Out of vm_regs to spill to")
+        return self.free_vm_regs.pop()
+
+    def _victim(self, pinned: Set[str]) -> str:
+        for name in self.resident:
+            if name not in pinned:
+                return name
+        raise ValueError(
+            f"Cannot hold {len(pinned)} temporaries in {self.num_vrs} VRs")
+
+    def _store(self, name: str, vr: int) -> None:
+        if name not in self.dirty:
+            return
+        if name not in self.saved:
+            self.saved[name] = self._take_vm_reg()
+        self.dirty.discard(name)
+        store_16(self.saved[name], vr)
+        self.traffic.stores += 1
+        self.traffic.dispatches += 1
+
+    def _bring_in(self, name: str, pinned: Set[str]) -> int:
+        spilled = name in self.saved
+        if self.free_vrs:
+            vr = self.free_vrs.pop()
+            if spilled:
+                load_16(vr, self.saved[name])
+                self.traffic.loads += 1
+                self.traffic.dispatches += 1
+            return vr
+
+        # Check for a vm_reg to spill the victim to before it is evicted,
+        # so that running out leaves the manager as it was.
+        victim = self._victim(pinned)
+        swap = spilled and victim in self.dirty
+        if victim in self.dirty and not swap \
+           and not self._can_take_vm_reg():
+            raise RuntimeError("Out of vm_regs to spill to")
+        vr = self.resident.pop(victim)
+        if swap:
+            # Spill the victim into the slot of the restored temporary.
+            vm_reg = self.saved.pop(name)
+            swap_vr_vmr_16(vr, vm_reg)
+            self.saved[victim] = vm_reg
+            self.dirty.discard(victim)
+            self.dirty.add(name)
+            self.traffic.stores += 1
+            self.traffic.loads += 1
+            self.traffic.swaps += 1
+            self.traffic.dispatches += 1
+            return vr
+
+        self._store(victim, vr)
+        if spilled:
+            load_16(vr, self.saved[name])
+            self.traffic.loads += 1
+            self.traffic.dispatches += 1
+        return vr
+
+    def acquire(self, *names: str,
+                written: Optional[Sequence[str]] = None) -> Tuple[int, ...]:
+        r"""Return the VRs of names, restoring any that were spilled.
+        ``written`` lists the names the caller will write to (all of them
+        by default); the VMR copies of the others stay current, so they
+        need not be stored again when they are next spilled. ``written``
+        must be a subset of names."""
+        pinned = set(names)
+        if len(pinned) > self.num_vrs:
+            raise ValueError(
+                f"Cannot hold {len(pinned)} temporaries in "
+                f"{self.num_vrs} VRs")
+        if written is not None and not pinned.issuperset(written):
+            raise ValueError(
+                f"Expected written to be a subset of {names}, got "
+                f"{tuple(written)}")
+        vrs = []
+        for name in names:
+            if name in self.resident:
+                self.resident.move_to_end(name)
+            else:
+                self.resident[name] = self._bring_in(name, pinned)
+            vrs.append(self.resident[name])
+        for name in (names if written is None else written):
+            self.dirty.add(name)
+            if name in self.saved:
+                self.free_vm_regs.append(self.saved.pop(name))
+        live = len(self.resident.keys() | self.saved.keys())
+        self.traffic.peak_live = max(self.traffic.peak_live, live)
+        return tuple(vrs)
+
+    def release(self, *names: str) -> None:
+        r"""Forget names, freeing their VRs and vm_regs."""
+        for name in names:
+            if name in self.resident:
+                self.free_vrs.append(self.resident.pop(name))
+            if name in self.saved:
+                self.free_vm_regs.append(self.saved.pop(name))
+            self.dirty.discard(name)
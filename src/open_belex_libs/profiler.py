@@ -0,0 +1,358 @@
+r"""
+Static clock and instruction-count profiler for the fragments of
+open_belex_libs.
+
+Each kernel in KERNELS is lowered for a fixed set of parameters by running
+it on the emulator (see open_belex_libs.emulator) and counting what it
+issued. The counts do not depend on the data in the VRs, so profiling runs
+on a single half-bank.
+
+Run as a module to print the table for every kernel:
+
+    python -m open_belex_libs.profiler --format csv > profile.csv
+
+The columns are:
+
+    kernel              module.fragment
+    dispatches          top-level fragment calls (1 unless driven from Python)
+    instructions        clocks: apl_commands blocks plus unlaned commands
+    commands            commands over all instructions
+    laned_instructions  instructions holding more than one command
+    laned_commands      commands in laned instructions
+    gl_broadcasts       instructions broadcasting to GL
+    ggl_broadcasts      instructions broadcasting to GGL
+    rsp16_broadcasts    instructions broadcasting to RSP16
+    gl_reads            commands reading GL or INV_GL
+    ggl_reads           commands reading GGL or INV_GGL
+    temporaries         VRs allocated with Belex.VR()
+    external_calls      calls to open_belex.kernel_libs fragments whose
+                        instructions are not visible here (load_16_t0,
+                        store_16_t0)
+    arc_commands        apl_set_rn_reg and apl_set_sm_reg calls issued by
+                        Python drivers
+"""
+
+import argparse
+import contextlib
+import csv
+import json
+import sys
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Callable, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+from open_belex_libs.emulator import Dispatch, Emulator
+
+#  _  __                 _
+# | |/ /___ _ _ _ _  ___| |___
+# | ' </ -_) '_| ' \/ -_) (_-<
+# |_|\_\___|_| |_||_\___|_/__/
+
+
+@dataclass(frozen=True)
+class Kernel:
+    r"""A fragment (or Python driver) of the library with the parameters
+    to lower it with. ``setup`` may prepare the emulator first, e.g. by
+    writing markers; it is not profiled."""
+    module: str
+    name: str
+    args: Tuple[Any, ...] = ()
+    kwargs: Tuple[Tuple[str, Any], ...] = ()
+    setup: Optional[Callable[[Emulator], None]] = None
+
+    @property
+    def qualname(self) -> str:
+        return f"{self.module}.{self.name}"
+
+    def __call__(self, emu: Emulator) -> Any:
+        fn = getattr(emu.load(self.module), self.name)
+        return fn(*self.args, **dict(self.kwargs))
+
+
+# VRs 15 through 22 hold RN_REG_FLAGS and RN_REG_T0..T6, so kernels are
+# lowered on VRs 0 through 14.
+
+
+def _scan_index(emu: Emulator) -> None:
+    # The scans of open_belex_libs.scan (and reduce_sum_u16_hb) read the
+    # plat index from VR 3, and the whole-VR scans the half-bank index,
+    # which the host loads, from VR 4.
+    emu.load("scan").index_u16_hb(3)
+    emu.write_u16(4, np.arange(emu.num_plats) // 2048)
+
+
+KERNELS: Tuple[Kernel, ...] = (
+    # arithmetic
+    Kernel("arithmetic", "add_u16", (0, 1, 2)),
+    Kernel("arithmetic", "add_u16_literal_sections", (0, 1, 2)),
+    Kernel("arithmetic", "add_u16_lifted_rn_regs", (0, 1, 2, 3, 4, 5)),
+    Kernel("arithmetic", "add_u16_lifted_rn_regs_one_lifted_sm_reg",
+           (0, 1, 2, 3, 4, 5, 0x0001)),
+    Kernel("arithmetic", "add_u16_lifted_rn_regs_all_lifted_sm_regs",
+           (0, 1, 2, 3, 4, 5, 0x0001, 0xFFFF, 0x3333, 0x1111, 0x000F)),
+    Kernel("arithmetic", "sub_u16", (0, 1, 2)),
+    Kernel("arithmetic", "adc_u16", (0, 1, 2)),
+    Kernel("arithmetic", "sbb_u16", (0, 1, 2)),
+    Kernel("arithmetic", "add_u32", (0, 1, 2, 3, 4, 5)),
+    Kernel("arithmetic", "add_u64", (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11)),
+    Kernel("arithmetic", "sub_u32", (0, 1, 2, 3, 4, 5)),
+    Kernel("arithmetic", "sub_u64", (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11)),
+    Kernel("arithmetic", "mul_u16", (0, 1, 2)),
+    Kernel("arithmetic", "mul_u16_wide", (3, 0, 1, 2)),
+    Kernel("arithmetic", "mul_u16_imm", (0, 1, 10)),
+    Kernel("arithmetic", "mac_u16", (0, 1, 2)),
+    Kernel("arithmetic", "divmod_u16", (0, 1, 2, 3)),
+    Kernel("arithmetic", "div_u16", (0, 1, 2)),
+    Kernel("arithmetic", "mod_u16", (0, 1, 2)),
+    Kernel("arithmetic", "div_u16_imm", (0, 1, 10, 2, 3)),
+    Kernel("arithmetic", "mod_u16_imm", (0, 1, 10, 2, 3)),
+    Kernel("arithmetic", "recip_u16", (0, 1)),
+    Kernel("arithmetic", "isqrt_u16", (0, 1)),
+    Kernel("arithmetic", "lt_u16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "le_u16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "gt_u16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "ge_u16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "eq_u16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "ne_u16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "min_u16", (0, 1, 2)),
+    Kernel("arithmetic", "max_u16", (0, 1, 2)),
+    Kernel("arithmetic", "absdiff_u16", (0, 1, 2)),
+    Kernel("arithmetic", "add_u16_sat", (0, 1, 2)),
+    Kernel("arithmetic", "sub_u16_sat", (0, 1, 2)),
+    Kernel("arithmetic", "add_i16", (0, 1, 2)),
+    Kernel("arithmetic", "sub_i16", (0, 1, 2)),
+    Kernel("arithmetic", "mul_i16", (0, 1, 2, 3, 4)),
+    Kernel("arithmetic", "lt_i16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "le_i16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "gt_i16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "ge_i16", (0, 0, 1, 2)),
+    Kernel("arithmetic", "sra_i16", (0, 1, 5)),
+    Kernel("arithmetic", "mul_q", (0, 1, 2, 8, 3, 4)),
+    Kernel("arithmetic", "mul_q_sat", (0, 1, 2, 15, 3, 4)),
+    Kernel("arithmetic", "sum_k_u16", (0, tuple(range(15)))),
+    Kernel("arithmetic", "add_u8x2", (0, 1, 2)),
+    Kernel("arithmetic", "sub_u8x2", (0, 1, 2)),
+    Kernel("arithmetic", "lt_u8x2", (0, 1, 2)),
+    Kernel("arithmetic", "ge_u8x2", (0, 1, 2)),
+    Kernel("arithmetic", "eq_u8x2", (0, 1, 2)),
+    Kernel("arithmetic", "ne_u8x2", (0, 1, 2)),
+    Kernel("arithmetic", "add_u4x4", (0, 1, 2)),
+    Kernel("arithmetic", "sub_u4x4", (0, 1, 2)),
+    Kernel("arithmetic", "lt_u4x4", (0, 1, 2)),
+    Kernel("arithmetic", "ge_u4x4", (0, 1, 2)),
+    Kernel("arithmetic", "eq_u4x4", (0, 1, 2)),
+    Kernel("arithmetic", "ne_u4x4", (0, 1, 2)),
+    # scan
+    Kernel("scan", "index_u16_hb", (0,)),
+    Kernel("scan", "scan_u16_hb", (0, 1, 3), setup=_scan_index),
+    Kernel("scan", "exscan_u16_hb", (0, 1, 3), setup=_scan_index),
+    Kernel("scan", "seg_scan_u16_hb", (0, 1, 2, 7, 3), setup=_scan_index),
+    Kernel("scan", "seg_exscan_u16_hb", (0, 1, 2, 7, 3), setup=_scan_index),
+    Kernel("scan", "scan_u16", (0, 1, 3, 4), setup=_scan_index),
+    Kernel("scan", "exscan_u16", (0, 1, 3, 4), setup=_scan_index),
+    Kernel("scan", "seg_scan_u16", (0, 1, 2, 7, 3, 4), setup=_scan_index),
+    Kernel("scan", "seg_exscan_u16", (0, 1, 2, 7, 3, 4),
+           setup=_scan_index),
+    Kernel("scan", "reduce_sum_u16_hb", (0, 3), setup=_scan_index),
+    Kernel("scan", "reduce_min_u16", (0,)),
+    Kernel("scan", "reduce_max_u16", (0,)),
+    # bitwise
+    Kernel("bitwise", "shl_16", (0, 1, 2)),
+    Kernel("bitwise", "shr_16", (0, 1, 2)),
+    Kernel("bitwise", "rotl_16", (0, 1, 2)),
+    Kernel("bitwise", "rotr_16", (0, 1, 2)),
+    Kernel("bitwise", "popcnt_u16", (0, 1)),
+    Kernel("bitwise", "clz_u16", (0, 1)),
+    Kernel("bitwise", "ctz_u16", (0, 1)),
+    # memory
+    Kernel("memory", "load_16", (0, 0)),
+    Kernel("memory", "store_16", (0, 0)),
+    Kernel("memory", "load_16_many",
+           (tuple((vr, vr) for vr in range(8)),)),
+    Kernel("memory", "store_16_many",
+           (tuple((vr, vr) for vr in range(8)),)),
+    Kernel("memory", "store_load_16", (0, 0, 1)),
+    # tartan
+    Kernel("tartan", "write_to_marked", (0, 1, 2, 0x1234)),
+    Kernel("tartan", "read_from_marked", (0, 1, 2, 3)),
+    Kernel("tartan", "tartan_set_up_mask_matrix", (0, 0x00FF, 1, 2)),
+    Kernel("tartan", "tartan_imm_donor", (0, 0x1234)),
+    Kernel("tartan", "tartan_assign", (0, 0x00FF, 1, 2, 3, 4)),
+    Kernel("tartan", "tartan_xor_equals", (0, 0x00FF, 1, 2, 3, 4)),
+    Kernel("tartan", "tartan_and_equals", (0, 0x00FF, 1, 2, 3, 4)),
+    Kernel("tartan", "tartan_or_equals", (0, 0x00FF, 1, 2, 3, 4)),
+    Kernel("tartan", "walk_marks_eastward", (0, 2)),
+    Kernel("tartan", "write_markers_in_plats_matching_value",
+           (0, 0x1234, 1, 2)),
+    # hdc
+    Kernel("hdc", "hdc_cp", (0, 1, 2, 3)),
+    Kernel("hdc", "hdc_mul_const_vr", (0, 1, 2, 3, 4)),
+    Kernel("hdc", "hdc_mul_const_section", (0, 1, 2, 3)),
+    Kernel("hdc", "hdc_ternary_majority_const_section", (0, 1, 2, 3, 4)),
+    Kernel("hdc", "hdc_ternary_majority_groundpound_all_sections",
+           (0, 1, 2, 3)),
+    Kernel("hdc", "hdc_ternary_majority_const_vr", (0, 0, 1, 1, 2, 3)),
+    Kernel("hdc", "hdc_9_maj_via_3_const_section",
+           (9, 0, 1, 2, 3, 4, 5, 6, 7, 8, 8)),
+    Kernel("hdc", "hdc_9_maj_via_3_const_vr_precalc",
+           (0, 6, 7, 8, 9, 10, 11, 12, 13, 14, 1, 2)),
+    Kernel("hdc", "hdc_9_maj_via_3_const_vr", (0, 6, 1, 2)),
+    Kernel("hdc", "hdc_15_maj_const_vr", (0, 15, 1, 2)),
+    Kernel("hdc", "hdc_15_maj_const_vr_first_eight_sections", (0, 0, 1, 2)),
+    Kernel("hdc", "hdc_15_maj_const_vr_last_seven_sections", (0, 0, 1, 2)),
+    Kernel("hdc", "hdc_15_maj_const_vr_eight_explicit_sections",
+           (0, 0, 1, 2, 0, 1, 2, 3, 4, 5, 6, 7)),
+    Kernel("hdc", "hdc_15_maj_const_vr_seven_explicit_sections",
+           (0, 0, 1, 2, 8, 9, 10, 11, 12, 13, 14)),
+    Kernel("hdc", "hdc_ternary_fma_const_vr", (0, 4, 1, 0, 1, 2, 3)),
+    Kernel("hdc", "hdc_ternary_fma_const_section", (0, 1, 2, 3, 4, 5)),
+    Kernel("hdc", "hdc_hamming_prepare_input_for_writeback", (0, 1)),
+    Kernel("hdc", "hdc_combs_and_nocks_8x",
+           (0, 1, 2, 3, 4, 5, 6, 7, 8, 6, 0, 1, 9, 2, 3, 4, 5)),
+    Kernel("hdc", "hdc_hamming_sum", (0, 1, 2)),
+    Kernel("hdc", "hdc_hamming_sum_tuning", (0, 1, 2)),
+    # game_of_life
+    Kernel("game_of_life", "gosper_gun_write_initial_pattern", (0,)),
+    Kernel("game_of_life", "gosper_gun_moore_counts", (5, 0, 1, 2, 3)),
+    Kernel("game_of_life", "gosper_gun_evolve", (5, 0, 1, 2)),
+    Kernel("game_of_life", "gosper_gun_tick", (0, 1, 2, 3, 4)),
+    Kernel("game_of_life", "gosper_gun_one_period", (0,)),
+    Kernel("game_of_life", "gvrc_eq_imm_16_msk", (0, 0x0001, 1, 0x1234,
+                                                  0xEDCB)),
+    Kernel("game_of_life", "gol_in_section_refactored", (0,)),
+    Kernel("game_of_life", "gol_in_section_defactored", (0,)),
+    Kernel("game_of_life", "gol_in_section_danilan", (0,)),
+    Kernel("game_of_life",
+           "gol_in_section_danilan_2_manually_inlined_and_laned", (0,)),
+    Kernel("game_of_life", "gol_in_section_danilan_2", (0,)),
+)
+
+#  ___          __ _ _
+# | _ \_ _ ___ / _(_) |___ ___
+# |  _/ '_/ _ \  _| | / -_|_-<
+# |_| |_| \___/_| |_|_\___/__/
+
+
+@dataclass
+class Profile:
+    kernel: str
+    dispatches: int = 0
+    instructions: int = 0
+    commands: int = 0
+    laned_instructions: int = 0
+    laned_commands: int = 0
+    gl_broadcasts: int = 0
+    ggl_broadcasts: int = 0
+    rsp16_broadcasts: int = 0
+    gl_reads: int = 0
+    ggl_reads: int = 0
+    temporaries: int = 0
+    external_calls: int = 0
+    arc_commands: int = 0
+
+    def add_dispatch(self, dispatch: Dispatch) -> None:
+        self.dispatches += 1
+        self.temporaries += dispatch.temporaries
+        for instruction in dispatch.instructions:
+            commands = instruction.commands()
+            if any(getattr(command, "external", False)
+                   for command in commands):
+                self.external_calls += 1
+                commands = [command for command in commands
+                            if not getattr(command, "external", False)]
+                if not commands:
+                    continue
+            self.instructions += 1
+            self.commands += len(commands)
+            if len(commands) > 1:
+                self.laned_instructions += 1
+                self.laned_commands += len(commands)
+            latches = {command.latch for command in commands
+                       if command.phase == "BROADCAST"}
+            self.gl_broadcasts += "GL" in latches
+            self.ggl_broadcasts += "GGL" in latches
+            self.rsp16_broadcasts += "RSP16" in latches
+            for command in commands:
+                rhs = getattr(command, "rhs", None)
+                if rhs is None or command.phase == "BROADCAST":
+                    continue
+                sources = rhs.sources()
+                self.gl_reads += any(source in ("GL", "INV_GL")
+                                     for source in sources)
+                self.ggl_reads += any(source in ("GGL", "INV_GGL")
+                                      for source in sources)
+
+
+def profile(kernel: Kernel, emu: Optional[Emulator] = None) -> Profile:
+    r"""Lower ``kernel`` on the emulator and count what it issued."""
+    if emu is None:
+        emu = Emulator(num_plats=2048, record_dispatches=True)
+    emu.record_dispatches = True
+    if kernel.setup is not None:
+        kernel.setup(emu)
+    emu.dispatches.clear()
+    emu.arc_commands.clear()
+    # Some kernels print progress; keep it out of tables written to stdout.
+    with contextlib.redirect_stdout(sys.stderr):
+        kernel(emu)
+    result = Profile(kernel.qualname)
+    for dispatch in emu.dispatches:
+        result.add_dispatch(dispatch)
+    result.arc_commands = len(emu.arc_commands)
+    return result
+
+
+def profile_all(kernels: Sequence[Kernel] = KERNELS) -> List[Profile]:
+    emu = Emulator(num_plats=2048, record_dispatches=True)
+    return [profile(kernel, emu) for kernel in kernels]
+
+
+def write_table(profiles: Sequence[Profile], out: TextIO,
+                fmt: str = "csv") -> None:
+    r"""Write the profiles as CSV (one row per kernel) or as a JSON list
+    of objects. Both keep the order of ``profiles`` so that tables from
+    different releases diff line by line."""
+    rows = [asdict(result) for result in profiles]
+    if fmt == "csv":
+        writer = csv.DictWriter(out, [f.name for f in fields(Profile)],
+                                lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    elif fmt == "json":
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Instruction-count profile of open_belex_libs kernels")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--output", "-o", default="-",
+                        help="file to write the table to (default: stdout)")
+    parser.add_argument("kernels", nargs="*",
+                        help="kernels to profile, e.g. arithmetic.add_u16 "
+                             "(default: all)")
+    args = parser.parse_args(argv)
+
+    kernels = KERNELS
+    if args.kernels:
+        by_name = {kernel.qualname: kernel for kernel in KERNELS}
+        unknown = [name for name in args.kernels if name not in by_name]
+        if unknown:
+            parser.error(f"unknown kernels: {', '.join(unknown)}")
+        kernels = [by_name[name] for name in args.kernels]
+
+    profiles = profile_all(kernels)
+    if args.output == "-":
+        write_table(profiles, sys.stdout, args.format)
+    else:
+        with open(args.output, "w", encoding="utf-8") as out:
+            write_table(profiles, out, args.format)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
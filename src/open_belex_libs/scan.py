@@ -0,0 +1,655 @@
+r"""
+Prefix sums (scans) and reductions of u16 values across plats.
+"""
+
+from open_belex.literal import (GL, INV_GL, INV_RSP16, RL, RSP16, RSP256,
+                                RSP_END, RSP_START_RET, SM_0X000F, SM_0X0001,
+                                SM_0XFFFF, VR, WRL, Section, apl_commands,
+                                belex_apl)
+
+from open_belex_libs.arithmetic import add_u16, sub_u16
+from open_belex_libs.common import rsp32k_out_in, rsp_out
+
+# Prefix sums of u16 values across plats. WRL moves RL by one plat within a
+# half-bank of 2048 plats, so a scan that only shifted would spend ~2K
+# clocks moving values from one end of a half-bank to the other. These
+# scans shift across at most 16 elements per level instead:
+#
+#   1. Hillis-Steele over each run of 16 plats, shifting with WRL.
+#   2. Hillis-Steele over the 16 runs of 16 in each run of 256 plats. Each
+#      run is represented by its total, copied to all of its plats through
+#      RSP16, so shifting by one run is one WRL plus an RSP16 round trip.
+#   3. The same over the 8 runs of 256 in a half-bank, through RSP256.
+#
+# and then push the carries back down: the running total up to the end of
+# the previous run of 256 into each run of 16, and the running total up to
+# the end of the previous run of 16 into each plat.
+#
+# Each half-bank is scanned independently (hence the _hb suffix); its
+# total is the scan at its last plat. Running totals across the whole VR
+# also need the totals of the earlier half-banks, but no command tells one
+# half-bank from another: WRL stops at their boundaries and RSP2K -> RSP32K
+# only ORs them together. The whole-VR scans below therefore take the
+# index of each plat's half-bank from the host.
+#
+# The scans need the index of each plat within its half-bank, which
+# index_u16_hb computes once, in an idx VR that is passed to every scan.
+
+#  ___      _
+# / __| ___| |_ _  _ _ __
+# \__ \/ -_)  _| || | '_ \
+# |___/\___|\__|\_,_| .__/
+#                   |_|
+
+
+@belex_apl
+def index_u16_hb(Belex, dst: VR) -> None:
+    r"""dst = the index of each plat within its half-bank (0 to 2047).
+    This is the one scan that shifts across the whole half-bank (a
+    Hillis-Steele count of ones, about 2200 clocks), so compute it once
+    and keep it around."""
+    shifted = Belex.VR()
+
+    dst[SM_0XFFFF] <= RSP16()
+    dst[SM_0X0001] <= INV_RSP16()
+    for i in range(11):
+        RL[SM_0XFFFF] <= dst()
+        for _ in range(1 << i):
+            RL[SM_0XFFFF] <= WRL()
+        shifted[SM_0XFFFF] <= RL()
+        add_u16(dst, dst, shifted)
+    RL[SM_0XFFFF] <= dst()
+    dst[SM_0XFFFF] <= WRL()
+
+
+#  ___
+# | _ \_  _ _ _  ___
+# |   / || | ' \(_-<
+# |_|_\\_,_|_||_/__/
+
+
+@belex_apl
+def _first_of_16(Belex, first: VR, idx: VR) -> None:
+    r"""first = all ones in the first plat of every run of 16."""
+    with apl_commands():
+        RL[SM_0X000F] <= ~idx() & INV_RSP16()
+        GL[SM_0X000F] <= RL()
+    first[SM_0XFFFF] <= GL()
+
+
+@belex_apl
+def _first_of_256(Belex, first: VR, idx: VR) -> None:
+    r"""first = all ones in the first plat of every run of 256."""
+    with apl_commands():
+        RL[~(SM_0XFFFF << 8)] <= ~idx() & INV_RSP16()
+        GL[~(SM_0XFFFF << 8)] <= RL()
+    first[SM_0XFFFF] <= GL()
+
+
+@belex_apl
+def _spread_last_of_16(Belex, dst: VR, src: VR, idx: VR) -> None:
+    r"""Copy src at the last plat of every run of 16 to the whole run."""
+    with apl_commands():
+        RL[SM_0X000F] <= idx()
+        GL[SM_0X000F] <= RL()
+    with apl_commands():
+        RL[SM_0XFFFF] <= src() & GL()
+        RSP16[SM_0XFFFF] <= RL()
+    RL[SM_0XFFFF] <= RSP16()
+    RSP_END()
+    dst[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def _spread_last_of_256(Belex, dst: VR, src: VR, idx: VR) -> None:
+    r"""Copy src at the last plat of every run of 256 to the whole run."""
+    with apl_commands():
+        RL[~(SM_0XFFFF << 8)] <= idx()
+        GL[~(SM_0XFFFF << 8)] <= RL()
+    with apl_commands():
+        RL[SM_0XFFFF] <= src() & GL()
+        RSP16[SM_0XFFFF] <= RL()
+    RSP256() <= RSP16()
+    RSP_START_RET()
+    RSP16() <= RSP256()
+    RL[SM_0XFFFF] <= RSP16()
+    RSP_END()
+    dst[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def _shift_runs_of_16(Belex, first: VR) -> None:
+    r"""Shift RL, which holds one value per run of 16 plats, east by one
+    run: the first plat of each run takes the last plat of the run before
+    it (zero for the first run of a half-bank), and RSP16 copies it over
+    the run."""
+    with apl_commands():
+        RL[SM_0XFFFF] <= first() & WRL()
+        RSP16[SM_0XFFFF] <= RL()
+    RL[SM_0XFFFF] <= RSP16()
+    RSP_END()
+
+
+@belex_apl
+def _shift_runs_of_256(Belex, first: VR) -> None:
+    r"""As _shift_runs_of_16, for runs of 256 plats and RSP256."""
+    with apl_commands():
+        RL[SM_0XFFFF] <= first() & WRL()
+        RSP16[SM_0XFFFF] <= RL()
+    RSP256() <= RSP16()
+    RSP_START_RET()
+    RSP16() <= RSP256()
+    RL[SM_0XFFFF] <= RSP16()
+    RSP_END()
+
+
+#  ___
+# / __| __ __ _ _ _
+# \__ \/ _/ _` | ' \
+# |___/\__\__,_|_||_|
+
+# Step i of each level adds v shifted east by 2**i elements, except where
+# the shift crosses into the previous run: there the i high bits of the
+# element's digit of idx are zero, which GL picks out.
+
+
+@belex_apl
+def _scan_plats(Belex, v: VR, s: VR, idx: VR) -> None:
+    r"""Inclusive scan of v over each run of 16 plats."""
+    for i in range(4):
+        digit = SM_0X000F >> i << i
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            RL[SM_0XFFFF] <= WRL()
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[digit] <= ~idx() & INV_RSP16()
+            GL[digit] <= RL()
+        RL[SM_0XFFFF] <= s() & INV_GL()
+        s[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def _scan_runs_of_16(Belex, v: VR, s: VR, first: VR, idx: VR) -> None:
+    r"""Inclusive scan, over the runs of 16 in each run of 256 plats, of
+    the per-run values in v."""
+    for i in range(4):
+        digit = SM_0X000F >> i << (4 + i)
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            _shift_runs_of_16(first)
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[digit] <= ~idx() & INV_RSP16()
+            GL[digit] <= RL()
+        RL[SM_0XFFFF] <= s() & INV_GL()
+        s[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def _scan_runs_of_256(Belex, v: VR, s: VR, first: VR, idx: VR) -> None:
+    r"""Inclusive scan, over the 8 runs of 256 in each half-bank, of the
+    per-run values in v."""
+    for i in range(3):
+        digit = SM_0X000F >> (i + 1) << (8 + i)
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            _shift_runs_of_256(first)
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[digit] <= ~idx() & INV_RSP16()
+            GL[digit] <= RL()
+        RL[SM_0XFFFF] <= s() & INV_GL()
+        s[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def scan_u16_hb(Belex, res: VR, x: VR, idx: VR) -> None:
+    r"""res = the inclusive prefix sum (mod 2**16) of x over the plats of
+    each half-bank, where idx is as computed by index_u16_hb. res may
+    alias x or idx."""
+    v0 = Belex.VR()
+    v1 = Belex.VR()
+    v2 = Belex.VR()
+    s = Belex.VR()
+    first = Belex.VR()
+
+    RL[SM_0XFFFF] <= x()
+    v0[SM_0XFFFF] <= RL()
+    _scan_plats(v0, s, idx)
+
+    _spread_last_of_16(v1, v0, idx)
+    _first_of_16(first, idx)
+    _scan_runs_of_16(v1, s, first, idx)
+
+    _spread_last_of_256(v2, v1, idx)
+    _first_of_256(first, idx)
+    _scan_runs_of_256(v2, s, first, idx)
+
+    RL[SM_0XFFFF] <= v2()
+    _shift_runs_of_256(first)
+    s[SM_0XFFFF] <= RL()
+    add_u16(v1, v1, s)
+
+    _first_of_16(first, idx)
+    RL[SM_0XFFFF] <= v1()
+    _shift_runs_of_16(first)
+    s[SM_0XFFFF] <= RL()
+    add_u16(res, v0, s)
+
+
+@belex_apl
+def exscan_u16_hb(Belex, res: VR, x: VR, idx: VR) -> None:
+    r"""res = the exclusive prefix sum of x over each half-bank: the
+    inclusive one shifted east by one plat."""
+    scan_u16_hb(res, x, idx)
+    RL[SM_0XFFFF] <= res()
+    res[SM_0XFFFF] <= WRL()
+
+
+#  ___                         _          _   ___
+# / __| ___ __ _ _ __  ___ _ _| |_ ___ __| | / __| __ __ _ _ _
+# \__ \/ -_) _` | '  \/ -_) ' \  _/ -_) _` | \__ \/ _/ _` | ' \
+# |___/\___\__, |_|_|_\___|_||_\__\___\__,_| |___/\__\__,_|_||_|
+#          |___/
+
+# Segments start at the plats marked in section mrks of mrk (and at every
+# half-bank). Next to each partial sum v, nf is all ones in the elements
+# that have seen no segment start yet in their run; a shifted partial sum
+# is only added where nf is set, and nf is ANDed with its shifted self.
+
+
+@belex_apl
+def _seg_scan_plats(Belex, v: VR, nf: VR, s: VR, idx: VR) -> None:
+    r"""Segmented inclusive scan of v over each run of 16 plats."""
+    for i in range(4):
+        digit = SM_0X000F >> i << i
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            RL[SM_0XFFFF] <= WRL()
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[digit] <= ~idx() & INV_RSP16()
+            GL[digit] <= RL()
+        RL[SM_0XFFFF] <= s() & nf() & INV_GL()
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[SM_0XFFFF] <= nf()
+        for _ in range(1 << i):
+            RL[SM_0XFFFF] <= WRL()
+        RL[SM_0XFFFF] |= GL()
+        RL[SM_0XFFFF] &= nf()
+        nf[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def _seg_scan_runs_of_16(Belex, v: VR, nf: VR, s: VR, first: VR,
+                         idx: VR) -> None:
+    r"""Segmented inclusive scan, over the runs of 16 in each run of 256
+    plats, of the per-run values in v."""
+    for i in range(4):
+        digit = SM_0X000F >> i << (4 + i)
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            _shift_runs_of_16(first)
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[digit] <= ~idx() & INV_RSP16()
+            GL[digit] <= RL()
+        RL[SM_0XFFFF] <= s() & nf() & INV_GL()
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[SM_0XFFFF] <= nf()
+        for _ in range(1 << i):
+            _shift_runs_of_16(first)
+        RL[SM_0XFFFF] |= GL()
+        RL[SM_0XFFFF] &= nf()
+        nf[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def _seg_scan_runs_of_256(Belex, v: VR, nf: VR, s: VR, first: VR,
+                          idx: VR) -> None:
+    r"""Segmented inclusive scan, over the 8 runs of 256 in each
+    half-bank, of the per-run values in v."""
+    for i in range(3):
+        digit = SM_0X000F >> (i + 1) << (8 + i)
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            _shift_runs_of_256(first)
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[digit] <= ~idx() & INV_RSP16()
+            GL[digit] <= RL()
+        RL[SM_0XFFFF] <= s() & nf() & INV_GL()
+        with apl_commands():
+            s[SM_0XFFFF] <= RL()
+            RL[SM_0XFFFF] <= nf()
+        for _ in range(1 << i):
+            _shift_runs_of_256(first)
+        RL[SM_0XFFFF] |= GL()
+        RL[SM_0XFFFF] &= nf()
+        nf[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def seg_scan_u16_hb(Belex, res: VR, x: VR, mrk: VR, mrks: Section,
+                    idx: VR) -> None:
+    r"""res = the inclusive prefix sum of x over each segment, where the
+    segments start at the plats marked in section mrks of mrk and at the
+    start of every half-bank. res may alias any of x, mrk and idx."""
+    v0 = Belex.VR()
+    v1 = Belex.VR()
+    v2 = Belex.VR()
+    nf0 = Belex.VR()
+    nf1 = Belex.VR()
+    nf2 = Belex.VR()
+    s = Belex.VR()
+    first = Belex.VR()
+
+    RL[SM_0XFFFF] <= x()
+    with apl_commands():
+        v0[SM_0XFFFF] <= RL()
+        RL[mrks] <= mrk()
+        GL[mrks] <= RL()
+    nf0[SM_0XFFFF] <= INV_GL()
+    _seg_scan_plats(v0, nf0, s, idx)
+
+    _spread_last_of_16(v1, v0, idx)
+    _spread_last_of_16(nf1, nf0, idx)
+    _first_of_16(first, idx)
+    _seg_scan_runs_of_16(v1, nf1, s, first, idx)
+
+    _spread_last_of_256(v2, v1, idx)
+    _spread_last_of_256(nf2, nf1, idx)
+    _first_of_256(first, idx)
+    _seg_scan_runs_of_256(v2, nf2, s, first, idx)
+
+    RL[SM_0XFFFF] <= v2()
+    _shift_runs_of_256(first)
+    RL[SM_0XFFFF] &= nf1()
+    s[SM_0XFFFF] <= RL()
+    add_u16(v1, v1, s)
+
+    _first_of_16(first, idx)
+    RL[SM_0XFFFF] <= v1()
+    _shift_runs_of_16(first)
+    RL[SM_0XFFFF] &= nf0()
+    s[SM_0XFFFF] <= RL()
+    add_u16(res, v0, s)
+
+
+@belex_apl
+def seg_exscan_u16_hb(Belex, res: VR, x: VR, mrk: VR, mrks: Section,
+                      idx: VR) -> None:
+    r"""res = the exclusive prefix sum of x over each segment: zero at the
+    start of a segment. res may alias x or idx, but not mrk."""
+    seg_scan_u16_hb(res, x, mrk, mrks, idx)
+    with apl_commands():
+        RL[mrks] <= mrk()
+        GL[mrks] <= RL()
+    RL[SM_0XFFFF] <= res()
+    RL[SM_0XFFFF] <= WRL()
+    RL[SM_0XFFFF] &= INV_GL()
+    res[SM_0XFFFF] <= RL()
+
+
+# __      ___        _      __   _____
+# \ \    / / |_  ___| |___  \ \ / / _ \
+#  \ \/\/ /| ' \/ _ \ / -_)  \ V /|   /
+#   \_/\_/ |_||_\___/_\___|   \_/ |_|_\
+
+# Scans over all plats of the VR. These take, next to idx, an hb VR with
+# the index of each plat's half-bank (0 to 15). No command can compute hb,
+# so the host loads it once (e.g. into a VMR, for load_16) and keeps it
+# around, like idx. Each half-bank is scanned as above, and then the
+# carries go across the half-banks one at a time: the scan at the last
+# plat of half-bank h, which already includes the carries into h, goes up
+# to RSP32K and back down to every plat, and is added to half-bank h + 1.
+# The 15 carries cost about 410 clocks on top of the half-bank scan. A
+# segmented scan only adds the carry to the plats before the first
+# segment start of the half-bank, which it finds by counting the starts
+# with another half-bank scan (about 340 clocks more).
+
+
+def _nibble(value: int):
+    r"""Return the masks of the sections among 0 to 3 in which value has a
+    one and a zero (None for an empty mask)."""
+    ones = zeros = None
+    for i in range(4):
+        bit = SM_0X0001 << i
+        if value >> i & 1:
+            ones = bit if ones is None else ones | bit
+        else:
+            zeros = bit if zeros is None else zeros | bit
+    return ones, zeros
+
+
+@belex_apl
+def _carry_half_banks(Belex, v: VR, unmarked: VR, hb: VR, idx: VR) -> None:
+    r"""Add to the plats of each half-bank h > 0 that are set in unmarked
+    the value of v at the last plat of half-bank h - 1, for h in order."""
+    last = Belex.VR()
+    sel = Belex.VR()
+    s = Belex.VR()
+
+    with apl_commands():
+        RL[~(SM_0XFFFF << 11)] <= idx()
+        GL[~(SM_0XFFFF << 11)] <= RL()
+    last[SM_0XFFFF] <= GL()
+    for h in range(15):
+        # sel = the plats of half-bank h + 1 that are set in unmarked.
+        ones, zeros = _nibble(h + 1)
+        with apl_commands():
+            RL[ones] <= hb() & unmarked()
+            if zeros is not None:
+                RL[zeros] <= ~hb() & unmarked()
+            GL[SM_0X000F] <= RL()
+        sel[SM_0XFFFF] <= GL()
+        # GL = the last plat of half-bank h.
+        ones, zeros = _nibble(h)
+        with apl_commands():
+            if ones is not None:
+                RL[ones] <= hb() & last()
+            RL[zeros] <= ~hb() & last()
+            GL[SM_0X000F] <= RL()
+        RL[SM_0XFFFF] <= v() & GL()
+        rsp32k_out_in(SM_0XFFFF)
+        RL[SM_0XFFFF] <= sel() & RSP16()
+        RSP_END()
+        s[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def scan_u16(Belex, res: VR, x: VR, idx: VR, hb: VR) -> None:
+    r"""res = the inclusive prefix sum (mod 2**16) of x over all plats,
+    where idx is as computed by index_u16_hb and hb holds the index of
+    each plat's half-bank. res may alias any of x, idx and hb."""
+    v = Belex.VR()
+    unmarked = Belex.VR()
+
+    scan_u16_hb(v, x, idx)
+    unmarked[SM_0XFFFF] <= INV_RSP16()
+    _carry_half_banks(v, unmarked, hb, idx)
+    RL[SM_0XFFFF] <= v()
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def exscan_u16(Belex, res: VR, x: VR, idx: VR, hb: VR) -> None:
+    r"""res = the exclusive prefix sum of x over all plats: the inclusive
+    one minus x. res may alias any of x, idx and hb."""
+    v = Belex.VR()
+    scan_u16(v, x, idx, hb)
+    sub_u16(res, v, x)
+
+
+@belex_apl
+def seg_scan_u16(Belex, res: VR, x: VR, mrk: VR, mrks: Section, idx: VR,
+                 hb: VR) -> None:
+    r"""res = the inclusive prefix sum of x over each segment, where the
+    segments start at the plats marked in section mrks of mrk and at the
+    first plat of the VR. res may alias any of x, mrk, idx and hb."""
+    v = Belex.VR()
+    unmarked = Belex.VR()
+
+    # unmarked = all ones in the plats with no segment start at or before
+    # them in their half-bank: those that count no marks so far.
+    unmarked[SM_0XFFFF] <= RSP16()
+    with apl_commands():
+        RL[mrks] <= mrk()
+        GL[mrks] <= RL()
+    unmarked[SM_0X0001] <= GL()
+    scan_u16_hb(unmarked, unmarked, idx)
+    with apl_commands():
+        RL[SM_0XFFFF] <= ~unmarked() & INV_RSP16()
+        GL[SM_0XFFFF] <= RL()
+    unmarked[SM_0XFFFF] <= GL()
+
+    seg_scan_u16_hb(v, x, mrk, mrks, idx)
+    _carry_half_banks(v, unmarked, hb, idx)
+    RL[SM_0XFFFF] <= v()
+    res[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def seg_exscan_u16(Belex, res: VR, x: VR, mrk: VR, mrks: Section, idx: VR,
+                   hb: VR) -> None:
+    r"""res = the exclusive prefix sum of x over each segment: the
+    inclusive one minus x, which is zero at the start of a segment. res
+    may alias any of x, mrk, idx and hb."""
+    v = Belex.VR()
+    seg_scan_u16(v, x, mrk, mrks, idx, hb)
+    sub_u16(res, v, x)
+
+
+#  ___        _
+# | _ \___ __| |_  _ __ ___
+# |   / -_) _` | || / _/ -_)
+# |_|_\___\__,_|\_,_\__\___|
+
+# Reductions of a u16 VR, left in the RSP chain by rsp_out for the ARC to
+# read. RSP ORs, so the plats are first reduced down to the ones that hold
+# the result in the MMB, and the rest are zeroed:
+#
+#   reduce_sum_u16_hb  adds up the plats of each half-bank with the levels
+#                      of the scans, but as a tree: only the last element
+#                      of each run needs its total, and the elements that
+#                      feed it never cross into the previous run, so no
+#                      step masks with idx. The 16 half-bank sums are
+#                      left in RSP2K, for the ARC to add up (ORing them in
+#                      RSP32K would not).
+#   reduce_max_u16     search the bits of the whole VR from the top down,
+#   reduce_min_u16     keeping the plats whose bits match those of the
+#                      extremum so far; whether any candidate has a bit
+#                      set is an RSP32K round trip. Every remaining
+#                      candidate holds the extremum, so ORing them in
+#                      RSP32K gives it.
+
+
+@belex_apl
+def _reduce_plats(Belex, v: VR, s: VR) -> None:
+    r"""v = the total of each run of 16 plats, at its last plat."""
+    for i in range(4):
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            RL[SM_0XFFFF] <= WRL()
+        s[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def _reduce_runs_of_16(Belex, v: VR, s: VR, first: VR) -> None:
+    r"""v = the total of the per-run values in v over each run of 256
+    plats, in its last run of 16."""
+    for i in range(4):
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            _shift_runs_of_16(first)
+        s[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def _reduce_runs_of_256(Belex, v: VR, s: VR, first: VR) -> None:
+    r"""v = the total of the per-run values in v over each half-bank, in
+    its last run of 256."""
+    for i in range(3):
+        RL[SM_0XFFFF] <= v()
+        for _ in range(1 << i):
+            _shift_runs_of_256(first)
+        s[SM_0XFFFF] <= RL()
+        add_u16(v, v, s)
+
+
+@belex_apl
+def reduce_sum_u16_hb(Belex, x: VR, idx: VR) -> None:
+    r"""RSP2K = the sum (mod 2**16) of x over each half-bank, where idx
+    is as computed by index_u16_hb. The ARC adds up the half-bank sums."""
+    v = Belex.VR()
+    s = Belex.VR()
+    first = Belex.VR()
+
+    RL[SM_0XFFFF] <= x()
+    v[SM_0XFFFF] <= RL()
+    _reduce_plats(v, s)
+
+    _spread_last_of_16(v, v, idx)
+    _first_of_16(first, idx)
+    _reduce_runs_of_16(v, s, first)
+
+    _spread_last_of_256(v, v, idx)
+    _first_of_256(first, idx)
+    _reduce_runs_of_256(v, s, first)
+
+    with apl_commands():
+        RL[~(SM_0XFFFF << 11)] <= idx()
+        GL[~(SM_0XFFFF << 11)] <= RL()
+    RL[SM_0XFFFF] <= v() & GL()
+    rsp_out(SM_0XFFFF)
+
+
+@belex_apl
+def _max_candidates(Belex, cand: VR, x: VR) -> None:
+    r"""cand = all ones in the plats that hold the maximum of x."""
+    cand[SM_0XFFFF] <= INV_RSP16()
+    for i in reversed(range(16)):
+        bit = SM_0X0001 << i
+        RL[bit] <= cand() & x()
+        rsp32k_out_in(bit)
+        # Drop the candidates without bit i if any candidate has it.
+        with apl_commands():
+            RL[bit] <= ~x() & RSP16()
+            GL[bit] <= RL()
+        RSP_END()
+        RL[SM_0XFFFF] <= cand() & INV_GL()
+        cand[SM_0XFFFF] <= RL()
+
+
+@belex_apl
+def reduce_max_u16(Belex, x: VR) -> None:
+    r"""RSP32K = the maximum of x over all plats."""
+    cand = Belex.VR()
+    _max_candidates(cand, x)
+    RL[SM_0XFFFF] <= cand() & x()
+    rsp_out(SM_0XFFFF)
+
+
+@belex_apl
+def reduce_min_u16(Belex, x: VR) -> None:
+    r"""RSP32K = the minimum of x over all plats: the plats holding the
+    maximum of ~x."""
+    cand = Belex.VR()
+    inv_x = Belex.VR()
+    RL[SM_0XFFFF] <= ~x() & INV_RSP16()
+    inv_x[SM_0XFFFF] <= RL()
+    _max_candidates(cand, inv_x)
+    RL[SM_0XFFFF] <= cand() & x()
+    rsp_out(SM_0XFFFF)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from open_belex_libs.emulator import Emulator
+
+# Operands that exercise the carries, borrows and signs: every pair of
+# these is placed in the first plats of the x and y fixtures.
+EDGES = np.array([0x0000, 0x0001, 0x0002, 0x00FF, 0x7FFF, 0x8000, 0x8001,
+                  0xFFFE, 0xFFFF], dtype=np.uint16)
+
+
+@pytest.fixture(scope="module")
+def emu() -> Emulator:
+    return Emulator(num_plats=2048)
+
+
+@pytest.fixture(scope="module")
+def every_u16_emu() -> Emulator:
+    r"""An emulator with one plat per u16, for exhaustive sweeps."""
+    return Emulator(num_plats=1 << 16)
+
+
+@pytest.fixture
+def every_u16() -> np.ndarray:
+    return np.arange(1 << 16, dtype=np.uint16)
+
+
+@pytest.fixture
+def rng() -> np.random.Generator:
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def xy(emu, rng):
+    x = rng.integers(0, 1 << 16, emu.num_plats, dtype=np.uint16)
+    y = rng.integers(0, 1 << 16, emu.num_plats, dtype=np.uint16)
+    n = len(EDGES)
+    x[:n * n] = np.repeat(EDGES, n)
+    y[:n * n] = np.tile(EDGES, n)
+    y[n * n:200] = x[n * n:200]  # equal operands
+    return x, y
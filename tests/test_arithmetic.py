@@ -0,0 +1,407 @@
+import math
+import operator
+
+import numpy as np
+import pytest
+
+from open_belex_libs.emulator import Emulator
+
+FLAGS = 15
+C_FLAG = 0
+B_FLAG = 1
+OF_FLAG = 2  # Signed overflow flag
+
+
+@pytest.fixture(scope="module")
+def arithmetic(emu):
+    return emu.load("arithmetic")
+
+
+@pytest.fixture(scope="module")
+def arithmetic_every_u16(every_u16_emu):
+    return every_u16_emu.load("arithmetic")
+
+
+def signed(v: np.ndarray) -> np.ndarray:
+    return v.astype(np.int16).astype(np.int64)
+
+
+def wide(v: np.ndarray) -> np.ndarray:
+    return v.astype(np.int64)
+
+
+@pytest.mark.parametrize("res", [0, 1, 2])
+def test_add_sub_u16(emu, arithmetic, xy, res):
+    x, y = xy
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.add_u16(res, 1, 2)
+    assert (emu.read_u16(res) == x + y).all()
+    assert (emu.read_section(FLAGS, C_FLAG) == (wide(x) + y > 0xFFFF)).all()
+
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.sub_u16(res, 1, 2)
+    assert (emu.read_u16(res) == x - y).all()
+    assert (emu.read_section(FLAGS, B_FLAG) == (x < y)).all()
+
+
+def test_sub_u16_borrow_from_high_bits(emu, arithmetic, rng):
+    # Operands that differ only in bits 12 to 15: the borrow comes out of
+    # the top nibble alone.
+    low = rng.integers(0, 1 << 12, emu.num_plats, dtype=np.uint16)
+    x = low | (rng.integers(0, 16, emu.num_plats, dtype=np.uint16) << 12)
+    y = low | (rng.integers(0, 16, emu.num_plats, dtype=np.uint16) << 12)
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.sub_u16(0, 1, 2)
+    assert (emu.read_u16(0) == x - y).all()
+    assert (emu.read_section(FLAGS, B_FLAG) == (x < y)).all()
+
+
+def test_adc_sbb_u16(emu, arithmetic, xy, rng):
+    x, y = xy
+    carry = rng.integers(0, 2, emu.num_plats).astype(bool)
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    emu.write_section(FLAGS, C_FLAG, carry)
+    arithmetic.adc_u16(0, 1, 2)
+    total = wide(x) + y + carry
+    assert (emu.read_u16(0) == total & 0xFFFF).all()
+    assert (emu.read_section(FLAGS, C_FLAG) == (total > 0xFFFF)).all()
+
+    emu.write_section(FLAGS, B_FLAG, carry)
+    arithmetic.sbb_u16(0, 1, 2)
+    diff = wide(x) - y - carry
+    assert (emu.read_u16(0) == diff & 0xFFFF).all()
+    assert (emu.read_section(FLAGS, B_FLAG) == (diff < 0)).all()
+
+
+@pytest.mark.parametrize("num_limbs", [2, 4])
+def test_multi_limb_add_sub(emu, arithmetic, rng, num_limbs):
+    bits = 16 * num_limbs
+    x = [int(v) for v in rng.integers(0, 1 << 62, emu.num_plats)]
+    y = [int(v) for v in rng.integers(0, 1 << 62, emu.num_plats)]
+    x[:4] = [(1 << bits) - 1, 0, 1, 1 << (bits - 1)]
+    y[:4] = [1, 1, (1 << bits) - 1, 1 << (bits - 1)]
+    x = [v % (1 << bits) for v in x]
+    y = [v % (1 << bits) for v in y]
+
+    def limbs(values, base):
+        for k in range(num_limbs):
+            emu.write_u16(base + num_limbs - 1 - k,
+                          [(v >> (16 * k)) & 0xFFFF for v in values])
+
+    def value(base):
+        limbs = [emu.read_u16(base + num_limbs - 1 - k).astype(object)
+                 for k in range(num_limbs)]
+        return [sum(int(limb[p]) << (16 * k) for k, limb in enumerate(limbs))
+                for p in range(emu.num_plats)]
+
+    res, xs, ys = (tuple(range(base, base + num_limbs))
+                   for base in (0, 4, 8))
+    add, sub = {2: (arithmetic.add_u32, arithmetic.sub_u32),
+                4: (arithmetic.add_u64, arithmetic.sub_u64)}[num_limbs]
+
+    limbs(x, 4)
+    limbs(y, 8)
+    add(*res, *xs, *ys)
+    assert value(0) == [(a + b) % (1 << bits) for a, b in zip(x, y)]
+    assert (emu.read_section(FLAGS, C_FLAG)
+            == [a + b >= 1 << bits for a, b in zip(x, y)]).all()
+
+    sub(*res, *xs, *ys)
+    assert value(0) == [(a - b) % (1 << bits) for a, b in zip(x, y)]
+    assert (emu.read_section(FLAGS, B_FLAG)
+            == [a < b for a, b in zip(x, y)]).all()
+
+
+@pytest.mark.parametrize("res", [0, 1])
+def test_add_sub_u16_sat(emu, arithmetic, xy, res):
+    x, y = xy
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.add_u16_sat(res, 1, 2)
+    assert (emu.read_u16(res) == np.minimum(wide(x) + y, 0xFFFF)).all()
+
+    emu.write_u16(1, x)
+    arithmetic.sub_u16_sat(res, 1, 2)
+    assert (emu.read_u16(res) == np.maximum(wide(x) - y, 0)).all()
+
+
+@pytest.mark.parametrize("dst", [14, 0])
+@pytest.mark.parametrize("k", [0, 1, 2, 3, 7, 14])
+def test_sum_k_u16(emu, arithmetic, rng, k, dst):
+    data = rng.integers(0, 1 << 16, (14, emu.num_plats), dtype=np.uint16)
+    for vr, values in enumerate(data):
+        emu.write_u16(vr, values)
+    vrs = list(range(k))
+    if k >= 3:
+        vrs[2] = 0  # the same operand twice
+    arithmetic.sum_k_u16(dst, vrs)
+    expected = sum((wide(data[vr]) for vr in vrs), np.zeros(emu.num_plats,
+                                                            np.int64))
+    assert (emu.read_u16(dst) == expected & 0xFFFF).all()
+
+
+@pytest.mark.parametrize("res", [0, 1])
+def test_mul_u16(emu, arithmetic, xy, res):
+    x, y = xy
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.mul_u16(res, 1, 2)
+    product = wide(x) * y
+    assert (emu.read_u16(res) == product & 0xFFFF).all()
+    assert (emu.read_section(FLAGS, C_FLAG) == (product > 0xFFFF)).all()
+
+
+def test_mul_u16_is_one_dispatch():
+    emu = Emulator(num_plats=2048, record_dispatches=True)
+    emu.load("arithmetic").mul_u16(0, 1, 2)
+    assert len(emu.dispatches) == 1
+
+
+def test_mul_u16_wide(emu, arithmetic, xy):
+    x, y = xy
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.mul_u16_wide(3, 0, 1, 2)
+    product = wide(x) * y
+    assert (emu.read_u16(0) == product & 0xFFFF).all()
+    assert (emu.read_u16(3) == product >> 16).all()
+
+    arithmetic.mul_u16_wide(2, 1, 1, 2)  # res_hi, res_lo alias y, x
+    assert (emu.read_u16(1) == product & 0xFFFF).all()
+    assert (emu.read_u16(2) == product >> 16).all()
+
+
+@pytest.mark.parametrize("const", [0, 1, 2, 3, 7, 10, 255, 0x5555, 0x7FFF,
+                                   0x8000, 0x8001, 0x0810, 40503, 0xFFFF])
+@pytest.mark.parametrize("res", [0, 1])
+def test_mul_u16_imm(emu, arithmetic, xy, const, res):
+    x, _ = xy
+    emu.write_u16(1, x)
+    arithmetic.mul_u16_imm(res, 1, const)
+    assert (emu.read_u16(res) == wide(x) * const & 0xFFFF).all()
+
+
+@pytest.mark.parametrize("const, dispatches", [(10, 2), (0x5555, 7),
+                                               (0x8001, 2), (0x0810, 3)])
+def test_mul_u16_imm_dispatches(const, dispatches):
+    emu = Emulator(num_plats=2048, record_dispatches=True)
+    emu.load("arithmetic").mul_u16_imm(0, 1, const)
+    assert len(emu.dispatches) == dispatches
+
+
+def test_mac_u16(emu, arithmetic, xy, rng):
+    x, y = xy
+    acc = rng.integers(0, 1 << 16, emu.num_plats, dtype=np.uint16)
+    emu.write_u16(0, acc)
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    emu.write_u16(3, acc ^ x)
+    arithmetic.mac_u16(0, 1, 2)
+    assert (emu.read_u16(0) == (wide(x) * y + acc) & 0xFFFF).all()
+    assert (emu.read_u16(1) == x).all()
+    assert (emu.read_u16(2) == y).all()
+    assert (emu.read_u16(3) == acc ^ x).all()
+
+
+@pytest.mark.parametrize("frac_bits", [1, 7, 8, 12, 15])
+@pytest.mark.parametrize("rounding", [True, False])
+def test_mul_q(emu, arithmetic, xy, frac_bits, rounding):
+    x, y = xy
+    product = signed(x) * signed(y)
+    q = product >> frac_bits
+    if rounding:
+        q += (product >> (frac_bits - 1)) & 1
+
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.mul_q(0, 1, 2, frac_bits, 5, 6, rounding=rounding)
+    assert (emu.read_u16(0) == q & 0xFFFF).all()
+
+    arithmetic.mul_q_sat(0, 1, 2, frac_bits, 5, 6, rounding=rounding)
+    assert (emu.read_u16(0) == np.clip(q, -0x8000, 0x7FFF) & 0xFFFF).all()
+    assert (emu.read_section(FLAGS, OF_FLAG)
+            == ((q < -0x8000) | (q > 0x7FFF))).all()
+
+
+@pytest.mark.parametrize("rounding", [True, False])
+@pytest.mark.parametrize("res", [1, 2])
+def test_mul_q_res_aliases_operand(emu, arithmetic, xy, rounding, res):
+    x, y = xy
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    arithmetic.mul_q(0, 1, 2, 8, 5, 6, rounding=rounding)
+    arithmetic.mul_q(res, 1, 2, 8, 5, 6, rounding=rounding)
+    assert (emu.read_u16(res) == emu.read_u16(0)).all()
+
+
+@pytest.mark.parametrize("name, dispatches", [("mul_q", 1),
+                                              ("mul_q_sat", 2)])
+def test_mul_q_dispatches(name, dispatches):
+    emu = Emulator(num_plats=2048, record_dispatches=True)
+    getattr(emu.load("arithmetic"), name)(0, 1, 2, 8, 3, 4)
+    assert len(emu.dispatches) == dispatches
+
+
+@pytest.mark.parametrize("frac_bits", [0, 16])
+def test_mul_q_frac_bits_out_of_range(arithmetic, frac_bits):
+    with pytest.raises(ValueError):
+        arithmetic.mul_q(0, 1, 2, frac_bits, 5, 6)
+
+
+def test_divmod_u16(emu, arithmetic, xy, rng):
+    x, d = xy
+    d = d.copy()
+    d[1000:1500] = rng.integers(0, 300, 500)
+    emu.write_u16(1, x)
+    emu.write_u16(2, d)
+    arithmetic.divmod_u16(3, 4, 1, 2)
+    nz = d != 0
+    assert (emu.read_u16(3)[nz] == x[nz] // d[nz]).all()
+    assert (emu.read_u16(4)[nz] == x[nz] % d[nz]).all()
+    assert (emu.read_u16(3)[~nz] == 0xFFFF).all()
+    assert (emu.read_u16(4)[~nz] == x[~nz]).all()
+
+    arithmetic.div_u16(5, 1, 2)
+    arithmetic.mod_u16(6, 1, 2)
+    assert (emu.read_u16(5)[nz] == x[nz] // d[nz]).all()
+    assert (emu.read_u16(6)[nz] == x[nz] % d[nz]).all()
+
+
+@pytest.mark.parametrize("const", [1, 2, 3, 5, 6, 7, 10, 13, 16, 100, 641,
+                                   12345, 32768, 32769, 65535])
+def test_div_mod_u16_imm(every_u16_emu, arithmetic_every_u16, every_u16,
+                         const):
+    every_u16_emu.write_u16(1, every_u16)
+    arithmetic_every_u16.div_u16_imm(0, 1, const, 2, 3)
+    assert (every_u16_emu.read_u16(0) == every_u16 // const).all()
+    arithmetic_every_u16.mod_u16_imm(0, 1, const, 2, 3)
+    assert (every_u16_emu.read_u16(0) == every_u16 % const).all()
+
+
+def test_div_u16_imm_by_zero(arithmetic):
+    with pytest.raises(ValueError):
+        arithmetic.div_u16_imm(0, 1, 0, 2, 3)
+
+
+def test_recip_u16(every_u16_emu, arithmetic_every_u16, every_u16):
+    every_u16_emu.write_u16(1, every_u16)
+    arithmetic_every_u16.recip_u16(0, 1)
+    expected = [min(0xFFFF, 0x10000 // v) if v else 0xFFFF
+                for v in range(1 << 16)]
+    assert (every_u16_emu.read_u16(0) == expected).all()
+    assert (every_u16_emu.read_u16(1) == every_u16).all()
+
+
+@pytest.mark.parametrize("res", [0, 1])
+def test_isqrt_u16(every_u16_emu, arithmetic_every_u16, every_u16, res):
+    every_u16_emu.write_u16(1, every_u16)
+    arithmetic_every_u16.isqrt_u16(res, 1)
+    expected = [math.isqrt(v) for v in range(1 << 16)]
+    assert (every_u16_emu.read_u16(res) == expected).all()
+
+
+COMPARISONS = [("lt", operator.lt), ("le", operator.le), ("gt", operator.gt),
+               ("ge", operator.ge)]
+
+
+@pytest.mark.parametrize("name, op",
+                         COMPARISONS + [("eq", operator.eq),
+                                        ("ne", operator.ne)])
+def test_compare_u16(emu, arithmetic, xy, name, op):
+    x, y = xy
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    emu.write_u16(3, 0xA5A5)
+    getattr(arithmetic, f"{name}_u16")(3, 6, 1, 2)
+    assert (emu.read_section(3, 6) == op(x, y)).all()
+    assert (emu.read_u16(3) & ~np.uint16(1 << 6)
+            == 0xA5A5 & ~(1 << 6)).all()
+
+
+@pytest.mark.parametrize("name, op", COMPARISONS)
+def test_compare_i16(emu, arithmetic, xy, name, op):
+    x, y = xy
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    emu.write_u16(5, 0)
+    getattr(arithmetic, f"{name}_i16")(5, 3, 1, 2)
+    assert (emu.read_section(5, 3) == op(signed(x), signed(y))).all()
+    assert (emu.read_u16(5) & ~np.uint16(1 << 3) == 0).all()
+
+
+@pytest.mark.parametrize("res", [0, 1, 2])
+def test_min_max_absdiff_u16(emu, arithmetic, xy, res):
+    x, y = xy
+    for name, expected in (("min_u16", np.minimum(x, y)),
+                           ("max_u16", np.maximum(x, y)),
+                           ("absdiff_u16", np.abs(wide(x) - y))):
+        emu.write_u16(1, x)
+        emu.write_u16(2, y)
+        getattr(arithmetic, name)(res, 1, 2)
+        assert (emu.read_u16(res) == expected).all(), name
+
+
+@pytest.mark.parametrize("res", [0, 1, 2])
+def test_add_sub_mul_i16(emu, arithmetic, xy, res):
+    x, y = xy
+    for name, expected in (("add_i16", signed(x) + signed(y)),
+                           ("sub_i16", signed(x) - signed(y)),
+                           ("mul_i16", signed(x) * signed(y))):
+        emu.write_u16(1, x)
+        emu.write_u16(2, y)
+        if name == "mul_i16":
+            arithmetic.mul_i16(res, 1, 2, 3, 4)
+        else:
+            getattr(arithmetic, name)(res, 1, 2)
+        assert (emu.read_u16(res) == expected & 0xFFFF).all(), name
+        assert (emu.read_section(FLAGS, OF_FLAG)
+                == ((expected < -0x8000) | (expected > 0x7FFF))).all(), name
+
+
+@pytest.mark.parametrize("const", [0, 1, 5, 10, 15, 16])
+def test_sra_i16(emu, arithmetic, xy, const):
+    x, _ = xy
+    emu.write_u16(1, x)
+    arithmetic.sra_i16(6, 1, const)
+    assert (emu.read_u16(6) == (signed(x) >> min(const, 15)) & 0xFFFF).all()
+
+
+def test_sra_i16_is_one_dispatch():
+    emu = Emulator(num_plats=2048, record_dispatches=True)
+    emu.load("arithmetic").sra_i16(0, 1, 5)
+    assert len(emu.dispatches) == 1
+
+
+def _lanes(v: np.ndarray, width: int):
+    return [(wide(v) >> (width * i)) & ((1 << width) - 1)
+            for i in range(16 // width)]
+
+
+def _pack(lanes, width: int) -> np.ndarray:
+    return sum((lane & ((1 << width) - 1)) << (width * i)
+               for i, lane in enumerate(lanes)).astype(np.uint16)
+
+
+@pytest.mark.parametrize("width, suffix", [(8, "u8x2"), (4, "u4x4")])
+@pytest.mark.parametrize("name", ["add", "sub", "lt", "ge", "eq", "ne"])
+def test_packed(emu, arithmetic, xy, width, suffix, name):
+    x, y = xy
+    ones = (1 << width) - 1
+    ops = {
+        "add": lambda a, b: a + b,
+        "sub": lambda a, b: a - b,
+        "lt": lambda a, b: np.where(a < b, ones, 0),
+        "ge": lambda a, b: np.where(a >= b, ones, 0),
+        "eq": lambda a, b: np.where(a == b, ones, 0),
+        "ne": lambda a, b: np.where(a != b, ones, 0),
+    }
+    expected = _pack([ops[name](a, b) for a, b in
+                      zip(_lanes(x, width), _lanes(y, width))], width)
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    getattr(arithmetic, f"{name}_{suffix}")(0, 1, 2)
+    assert (emu.read_u16(0) == expected).all()
@@ -0,0 +1,42 @@
+from open_belex_libs.benchmark import BENCHMARKS, Result, compare, run
+
+
+def _result(**kwargs) -> Result:
+    fields = dict(kernel="arithmetic.add_u16", wall_time_min=1.0,
+                  wall_time_median=1.0, repeat=1, dispatches=1,
+                  instructions=10, commands=20)
+    fields.update(kwargs)
+    return Result(**fields)
+
+
+def _baseline(**kwargs):
+    result = _result(**kwargs)
+    return {"results": [result.__dict__]}
+
+
+def test_compare_counts():
+    baseline = _baseline()
+    assert compare([_result()], baseline) == []
+    assert compare([_result(instructions=9)], baseline) == []
+    regressions = compare([_result(instructions=11, dispatches=2)], baseline)
+    assert len(regressions) == 2
+
+
+def test_compare_wall_time_is_opt_in():
+    baseline = _baseline()
+    slower = _result(wall_time_min=10.0)
+    assert compare([slower], baseline) == []
+    assert len(compare([slower], baseline, time_tolerance=0.5)) == 1
+    assert compare([slower], baseline, time_tolerance=20.0) == []
+
+
+def test_compare_skips_new_kernels():
+    assert compare([_result(kernel="scan.scan_u16_hb")], _baseline()) == []
+
+
+def test_run_counts_instructions():
+    kernel = next(kernel for kernel in BENCHMARKS
+                  if kernel.qualname == "arithmetic.add_u16")
+    result = run(kernel, repeat=1, num_plats=2048)
+    assert result.dispatches == 1
+    assert result.instructions > 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def bitwise(emu):
+    return emu.load("bitwise")
+
+
+@pytest.fixture(scope="module")
+def bitwise_every_u16(every_u16_emu):
+    return every_u16_emu.load("bitwise")
+
+
+def _shift_amounts(emu, rng) -> np.ndarray:
+    y = rng.integers(0, 40, emu.num_plats).astype(np.uint16)
+    y[:64] = np.arange(64)
+    y[100:120] = rng.integers(0, 1 << 16, 20)
+    return y
+
+
+@pytest.mark.parametrize("name", ["shl_16", "shr_16", "rotl_16", "rotr_16"])
+@pytest.mark.parametrize("res", [0, 1, 2])
+def test_shifts(emu, bitwise, xy, rng, name, res):
+    x = xy[0].astype(np.int64)
+    y = _shift_amounts(emu, rng).astype(np.int64)
+    expected = {
+        "shl_16": np.where(y >= 16, 0, x << np.minimum(y, 15)),
+        "shr_16": np.where(y >= 16, 0, x >> np.minimum(y, 15)),
+        "rotl_16": (x << (y % 16)) | (x >> (16 - y % 16)),
+        "rotr_16": (x >> (y % 16)) | (x << (16 - y % 16)),
+    }[name] & 0xFFFF
+    emu.write_u16(1, x)
+    emu.write_u16(2, y)
+    getattr(bitwise, name)(res, 1, 2)
+    assert (emu.read_u16(res) == expected).all()
+
+
+def _popcnt(v: int) -> int:
+    return bin(v).count("1")
+
+
+def _clz(v: int) -> int:
+    return 16 - v.bit_length()
+
+
+def _ctz(v: int) -> int:
+    return 16 if v == 0 else (v & -v).bit_length() - 1
+
+
+@pytest.mark.parametrize("name, count", [("popcnt_u16", _popcnt),
+                                         ("clz_u16", _clz),
+                                         ("ctz_u16", _ctz)])
+@pytest.mark.parametrize("res", [0, 1])
+def test_bit_counts(every_u16_emu, bitwise_every_u16, every_u16, name,
+                    count, res):
+    every_u16_emu.write_u16(1, every_u16)
+    getattr(bitwise_every_u16, name)(res, 1)
+    expected = [count(v) for v in range(1 << 16)]
+    assert (every_u16_emu.read_u16(res) == expected).all()
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from open_belex_libs.emulator import Emulator, EmulatorError, _Expr, _Target
+
+
+def test_abstract_bases_cannot_be_instantiated(emu):
+    with pytest.raises(TypeError):
+        _Expr()
+    with pytest.raises(TypeError):
+        _Target(emu)
+
+
+def test_num_plats_must_fill_half_banks():
+    with pytest.raises(EmulatorError):
+        Emulator(num_plats=1000)
+
+
+def test_write_read_u16(emu, rng):
+    values = rng.integers(0, 1 << 16, emu.num_plats, dtype=np.uint16)
+    emu.write_u16(4, values)
+    assert (emu.read_u16(4) == values).all()
+    assert (emu.read_section(4, 3) == ((values >> 3) & 1).astype(bool)).all()
+
+
+def test_markers(emu, rng):
+    tartan = emu.load("tartan")
+    x, y = rng.integers(0, 1 << 16, (2, emu.num_plats), dtype=np.uint16)
+    marks = rng.integers(0, 2, emu.num_plats).astype(bool)
+    emu.write_u16(3, 0)
+    emu.write_section(3, 5, marks)
+
+    emu.write_u16(0, x)
+    tartan.write_to_marked(0, 3, 5, 0x1234)
+    assert (emu.read_u16(0) == np.where(marks, 0x1234, x)).all()
+
+    emu.write_u16(1, x)
+    emu.write_u16(4, y)
+    tartan.read_from_marked(4, 1, 3, 5)
+    assert (emu.read_u16(4) == np.where(marks, x, y)).all()
+
+
+def test_rsp_chain(emu):
+    common = emu.load("common")
+    emu.write_u16(1, 0)
+    emu.write_section(1, 3, np.arange(emu.num_plats) == 1000)
+    common.rl_from_sb(1)
+    common.rsp_out(0xFFFF)
+    assert emu.read_rsp32k() == 1 << 3
+    assert (emu.read_rsp2k() == 1 << 3).all()
+
+
+def test_game_of_life():
+    emu = Emulator()
+    game_of_life = emu.load("game_of_life")
+    game_of_life.gosper_gun_write_initial_pattern(10)
+    cells = emu.vrs[10].copy()
+
+    padded = np.pad(cells, 1).astype(int)
+    neighbours = sum(np.roll(np.roll(padded, dy, 0), dx, 1)
+                     for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                     if (dy, dx) != (0, 0))[1:-1, 1:-1]
+    expected = (cells & ((neighbours == 2) | (neighbours == 3))) \
+        | (~cells & (neighbours == 3))
+
+    game_of_life.gol_in_section_danilan_2(10)
+    assert (emu.vrs[10] == expected).all()
+
+
+def test_record_dispatches():
+    emu = Emulator(num_plats=2048, record_dispatches=True)
+    arithmetic = emu.load("arithmetic")
+    arithmetic.add_u16(0, 1, 2)
+    assert len(emu.dispatches) == 1
+    assert len(emu.dispatches[0].instructions) == 12
+    assert len(emu.arc_commands) == 0
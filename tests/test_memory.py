@@ -0,0 +1,168 @@
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="module")
+def memory(emu):
+    return emu.load("memory")
+
+
+@pytest.fixture(scope="module")
+def arithmetic(emu):
+    return emu.load("arithmetic")
+
+
+def _random(emu, rng, n=None):
+    shape = (emu.num_plats,) if n is None else (n, emu.num_plats)
+    return rng.integers(0, 1 << 16, shape, dtype=np.uint16)
+
+
+def test_load_store_every_vm_reg(emu, memory, rng):
+    data = _random(emu, rng, memory.NUM_VM_REGS)
+    for vm_reg, values in enumerate(data):
+        emu.write_u16(0, values)
+        memory.store_16(vm_reg, 0)
+    for vm_reg, values in enumerate(data):
+        memory.load_16(1, vm_reg)
+        assert (emu.read_u16(1) == values).all(), vm_reg
+
+
+def test_swap_vr_vmr_16(emu, memory, rng):
+    x, y = _random(emu, rng, 2)
+    emu.write_u16(0, x)
+    memory.store_16(3, 0)
+    emu.write_u16(8, y)
+    memory.swap_vr_vmr_16(8, 3)
+    assert (emu.read_u16(8) == x).all()
+    memory.load_16(9, 3)
+    assert (emu.read_u16(9) == y).all()
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 5, 8])
+def test_load_store_16_many(emu, memory, rng, n):
+    data = _random(emu, rng, n)
+    pairs = [(vr, 47 - 3 * vr) for vr in range(n)]
+    for vr, values in enumerate(data):
+        emu.write_u16(vr, values)
+    assert len(memory.store_16_many(pairs)) == (n + 1) // 2
+    for vr in range(n):
+        emu.write_u16(vr, 0)
+    assert len(memory.load_16_many(pairs)) == (n + 1) // 2
+    for vr, values in enumerate(data):
+        assert (emu.read_u16(vr) == values).all(), vr
+
+
+@pytest.mark.parametrize("vm_reg", [-1, 48])
+def test_vm_reg_out_of_range(memory, vm_reg):
+    with pytest.raises(ValueError):
+        memory.load_16(0, vm_reg)
+    with pytest.raises(ValueError):
+        memory.store_16(vm_reg, 0)
+    with pytest.raises(ValueError):
+        memory.swap_vr_vmr_16(0, vm_reg)
+    with pytest.raises(ValueError):
+        memory.store_16_many([(0, 1), (1, vm_reg)])
+
+
+def test_store_load_16(emu, memory, rng):
+    x, y = _random(emu, rng, 2)
+    emu.write_u16(0, y)
+    memory.store_16(5, 0)
+    emu.write_u16(1, x)
+    memory.store_load_16(1, 4, 5)
+    assert (emu.read_u16(1) == y).all()
+    memory.load_16(2, 4)
+    assert (emu.read_u16(2) == x).all()
+
+
+@pytest.mark.parametrize("num_chunks", [0, 1, 2, 3, 6])
+@pytest.mark.parametrize("out", ["in_place", "separate", "next_chunk"])
+def test_stream_16(emu, memory, arithmetic, rng, num_chunks, out):
+    vm_regs = list(range(1, 1 + num_chunks))
+    out_vm_regs = {
+        "in_place": None,
+        "separate": [40 - i for i in range(num_chunks)],
+        # out_vm_regs[i] may alias vm_regs[i + 1]
+        "next_chunk": (vm_regs[1:] + [20])[:num_chunks],
+    }[out]
+    data = _random(emu, rng, num_chunks)
+    increment = _random(emu, rng)
+    for vm_reg, values in zip(vm_regs, data):
+        emu.write_u16(0, values)
+        memory.store_16(vm_reg, 0)
+    emu.write_u16(5, increment)
+
+    memory.stream_16(lambda vr: arithmetic.add_u16(vr, vr, 5), vm_regs,
+                     (1, 2), out_vm_regs)
+    for i, values in enumerate(data):
+        memory.load_16(0, (out_vm_regs or vm_regs)[i])
+        assert (emu.read_u16(0) == values + increment).all(), i
+
+
+def test_stream_16_rejects_bad_arguments(memory):
+    with pytest.raises(ValueError):
+        memory.stream_16(print, [1, 2], (1, 1))
+    with pytest.raises(ValueError):
+        memory.stream_16(print, [1, 2], (1, 2), [3])
+
+
+@pytest.mark.parametrize("num_vm_regs", [8, 18])
+def test_spill_manager(emu, memory, arithmetic, rng, num_vm_regs):
+    spills = memory.SpillManager(vrs=range(4),
+                                 vm_regs=range(48 - num_vm_regs, 48))
+    names = [f"t{i}" for i in range(12)]
+    expected = {}
+    for name in names:
+        (vr,) = spills.acquire(name)
+        expected[name] = _random(emu, rng)
+        emu.write_u16(vr, expected[name])
+    for _ in range(60):
+        x, y, s = (names[i] for i in rng.choice(len(names), 3))
+        operands = list(dict.fromkeys([x, y, s]))
+        vrs = dict(zip(operands, spills.acquire(*operands, written=[s])))
+        arithmetic.add_u16(vrs[s], vrs[x], vrs[y])
+        expected[s] = expected[x] + expected[y]
+    for name in names:
+        (vr,) = spills.acquire(name, written=())
+        assert (emu.read_u16(vr) == expected[name]).all(), name
+
+    traffic = spills.traffic
+    assert traffic.peak_live == len(names)
+    assert traffic.dispatches == traffic.stores + traffic.loads \
+        - traffic.swaps
+    assert traffic.stores > 0 and traffic.loads > 0
+
+
+def test_spill_manager_out_of_vm_regs(emu, memory):
+    spills = memory.SpillManager(vrs=range(2), vm_regs=[40])
+    expected = {}
+    for value, name in enumerate("abc"):
+        (vr,) = spills.acquire(name)
+        expected[name] = value
+        emu.write_u16(vr, value)
+    with pytest.raises(RuntimeError):
+        spills.acquire("d")
+    for name in "bc":
+        (vr,) = spills.acquire(name, written=())
+        assert (emu.read_u16(vr) == expected[name]).all()
+    spills.release("c")
+    (vr,) = spills.acquire("a", written=())
+    assert (emu.read_u16(vr) == expected["a"]).all()
+
+
+def test_spill_manager_too_many_operands(memory):
+    spills = memory.SpillManager(vrs=range(2), vm_regs=range(40, 48))
+    with pytest.raises(ValueError):
+        spills.acquire("a", "b", "c")
+
+
+def test_spill_manager_written_must_be_acquired(emu, memory):
+    spills = memory.SpillManager(vrs=range(1), vm_regs=[40])
+    (vr,) = spills.acquire("a")
+    emu.write_u16(vr, 1234)
+    (vr,) = spills.acquire("b")  # spills a
+    emu.write_u16(vr, 5678)
+    with pytest.raises(ValueError):
+        spills.acquire("b", written=["a"])
+    (vr,) = spills.acquire("a", written=())
+    assert (emu.read_u16(vr) == 1234).all()
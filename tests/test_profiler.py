@@ -0,0 +1,50 @@
+import io
+import json
+
+import pytest
+
+from open_belex_libs.profiler import KERNELS, Kernel, profile, write_table
+
+
+def test_kernel_names_are_unique():
+    names = [kernel.qualname for kernel in KERNELS]
+    assert len(names) == len(set(names))
+
+
+def test_profile_add_u16():
+    result = profile(Kernel("arithmetic", "add_u16", (0, 1, 2)))
+    assert result.kernel == "arithmetic.add_u16"
+    assert result.dispatches == 1
+    assert result.instructions == 12
+    assert result.commands > result.instructions
+    assert result.arc_commands == 0
+
+
+def test_profile_excludes_setup():
+    def setup(emu):
+        emu.load("arithmetic").sub_u16(3, 4, 5)
+
+    kernel = Kernel("arithmetic", "add_u16", (0, 1, 2), setup=setup)
+    assert profile(kernel).dispatches == 1
+
+
+@pytest.mark.parametrize("fmt", ["csv", "json"])
+def test_write_table(fmt):
+    profiles = [profile(Kernel("arithmetic", name, (0, 1, 2)))
+                for name in ("add_u16", "sub_u16")]
+    out = io.StringIO()
+    write_table(profiles, out, fmt)
+    if fmt == "csv":
+        lines = out.getvalue().splitlines()
+        assert lines[0].startswith("kernel,dispatches,instructions,")
+        assert [line.split(",")[0] for line in lines[1:]] \
+            == ["arithmetic.add_u16", "arithmetic.sub_u16"]
+    else:
+        rows = json.loads(out.getvalue())
+        assert [row["kernel"] for row in rows] \
+            == ["arithmetic.add_u16", "arithmetic.sub_u16"]
+
+
+def test_write_table_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        write_table([], io.StringIO(), "xml")
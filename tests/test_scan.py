@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from open_belex_libs.emulator import Emulator
+
+HALF_BANK = 2048
+
+
+@pytest.fixture(scope="module")
+def emu() -> Emulator:
+    # Two half-banks, to check that they are scanned independently.
+    return Emulator(num_plats=2 * HALF_BANK)
+
+
+@pytest.fixture(scope="module")
+def scan(emu):
+    module = emu.load("scan")
+    module.index_u16_hb(3)
+    return module
+
+
+def _scan(x: np.ndarray, starts: np.ndarray, exclusive: bool,
+          per_half_bank: bool = True) -> np.ndarray:
+    out = np.zeros(len(x), dtype=np.int64)
+    acc = 0
+    for p, v in enumerate(x):
+        if (per_half_bank and p % HALF_BANK == 0) or starts[p]:
+            acc = 0
+        if exclusive:
+            out[p] = acc
+        acc += int(v)
+        if not exclusive:
+            out[p] = acc
+    return out & 0xFFFF
+
+
+def test_index_u16_hb(emu, scan):
+    assert (emu.read_u16(3) == np.arange(emu.num_plats) % HALF_BANK).all()
+
+
+@pytest.mark.parametrize("exclusive", [False, True])
+@pytest.mark.parametrize("segmented", [False, True])
+@pytest.mark.parametrize("res", [0, 1])
+def test_scans(emu, scan, rng, exclusive, segmented, res):
+    x = rng.integers(0, 1 << 16, emu.num_plats, dtype=np.uint16)
+    marks = rng.random(emu.num_plats) < 0.01
+    marks[500:600] = rng.random(100) < 0.5
+    if not segmented:
+        marks[:] = False
+    emu.write_u16(1, x)
+    emu.write_u16(2, 0)
+    emu.write_section(2, 7, marks)
+    name = ("seg_" if segmented else "") \
+        + ("exscan" if exclusive else "scan") + "_u16_hb"
+    args = (res, 1, 2, 7, 3) if segmented else (res, 1, 3)
+    getattr(scan, name)(*args)
+    assert (emu.read_u16(res) == _scan(x, marks, exclusive)).all()
+    assert (emu.read_u16(3) == np.arange(emu.num_plats) % HALF_BANK).all()
+
+
+# Segment starts for the whole-VR scans: none, a segment across the
+# half-bank boundary, and a segment that starts right at it.
+WHOLE_VR_MARKS = {"none": [], "across": [5, 1000, 3000, 3500],
+                  "at_boundary": [HALF_BANK]}
+
+
+@pytest.mark.parametrize("exclusive", [False, True])
+@pytest.mark.parametrize("marked", list(WHOLE_VR_MARKS))
+@pytest.mark.parametrize("res", [0, 1, 4])
+def test_whole_vr_scans(emu, scan, rng, exclusive, marked, res):
+    x = rng.integers(0, 1 << 16, emu.num_plats, dtype=np.uint16)
+    marks = np.zeros(emu.num_plats, dtype=bool)
+    marks[WHOLE_VR_MARKS[marked]] = True
+    emu.write_u16(1, x)
+    emu.write_u16(2, 0)
+    emu.write_section(2, 7, marks)
+    emu.write_u16(4, np.arange(emu.num_plats) // HALF_BANK)
+    segmented = marked != "none"
+    name = ("seg_" if segmented else "") \
+        + ("exscan" if exclusive else "scan") + "_u16"
+    args = (res, 1, 2, 7, 3, 4) if segmented else (res, 1, 3, 4)
+    getattr(scan, name)(*args)
+    expected = _scan(x, marks, exclusive, per_half_bank=False)
+    assert (emu.read_u16(res) == expected).all()
+    assert (emu.read_u16(3) == np.arange(emu.num_plats) % HALF_BANK).all()
+
+
+@pytest.mark.parametrize("low, high", [(0, 1 << 16), (0, 3), (7, 8)])
+def test_reductions(emu, scan, rng, low, high):
+    x = rng.integers(low, high, emu.num_plats, dtype=np.uint16)
+    emu.write_u16(1, x)
+    half_banks = x.reshape(-1, HALF_BANK).astype(np.int64)
+
+    scan.reduce_sum_u16_hb(1, 3)
+    assert (emu.read_rsp2k() == half_banks.sum(axis=1) & 0xFFFF).all()
+    scan.reduce_max_u16(1)
+    assert emu.read_rsp32k() == x.max()
+    scan.reduce_min_u16(1)
+    assert emu.read_rsp32k() == x.min()
+    assert (emu.read_u16(1) == x).all()
+
+
+def test_reduce_max_min_in_one_half_bank(emu, scan):
+    x = np.full(emu.num_plats, 100, dtype=np.uint16)
+    x[HALF_BANK + 17] = 60000
+    x[5] = 3
+    emu.write_u16(1, x)
+    scan.reduce_max_u16(1)
+    assert emu.read_rsp32k() == 60000
+    scan.reduce_min_u16(1)
+    assert emu.read_rsp32k() == 3